@@ -0,0 +1,170 @@
+"""
+Советы по расходам без ИИ: детерминированные правила по уже посчитанным итогам.
+
+Используются, когда Ollama недоступна (размыкатель в llm.py открыт) или не
+уложилась в LLM_ADVICE_BUDGET. Отвечают на те же вопросы, что и промпт ИИ:
+1. перерасход — доля категории в расходах выше ориентира (BASELINES), а при
+   инкрементальной загрузке — рост относительно собственного скользящего
+   среднего пользователя;
+2. советы — для каждой перерасходующей категории;
+3. экономия — перерасход необязательных категорий плюс DISCRETIONARY_CUT от
+   остальных необязательных трат, в пересчете на месяц.
+"""
+
+import os
+import re
+from typing import Optional
+
+# Какую долю необязательных трат в пределах ориентира реально сократить
+DISCRETIONARY_CUT = float(os.getenv("ADVICE_DISCRETIONARY_CUT", "0.15"))
+# Рост относительно своего среднего, после которого категория считается перерасходом
+GROWTH_THRESHOLD = float(os.getenv("ADVICE_GROWTH_THRESHOLD", "0.2"))
+TOP_CATEGORIES = 5
+
+# Ключевое слово названия категории -> (ориентир доли в расходах, необязательная, совет)
+BASELINES = [
+    (("продукт", "супермаркет", "grocer", "food"), 0.30, False,
+     "планируйте покупки по списку и сравнивайте цены в разных магазинах"),
+    (("коммун", "услуг", "телеком", "связь", "utilit"), 0.15, False,
+     "проверьте тарифы связи и коммунальных услуг, откажитесь от неиспользуемых подписок"),
+    (("транспорт", "такси", "бензин", "топлив", "taxi", "transport"), 0.12, False,
+     "сравните такси с проездным или каршерингом, объединяйте поездки"),
+    (("медицин", "аптек", "здоров", "health"), 0.08, False,
+     "уточните, какие расходы покрывает страховка, и покупайте аналоги лекарств"),
+    (("кафе", "ресторан", "кофе", "доставк", "restaurant", "cafe"), 0.08, True,
+     "ограничьте кафе и доставку фиксированной суммой в неделю"),
+    (("развлеч", "кино", "игр", "подписк", "entertain"), 0.08, True,
+     "задайте месячный лимит на развлечения и пересмотрите подписки"),
+    (("одежд", "обув", "cloth"), 0.07, True,
+     "откладывайте покупку одежды на неделю и покупайте в сезон распродаж"),
+    (("покупк", "магазин", "purchase", "shop", "market"), 0.10, True,
+     "проверяйте импульсивные покупки в маркетплейсах: корзина на сутки перед оплатой"),
+    (("наличн", "снятие", "cash"), 0.05, True,
+     "платите картой вместо наличных, чтобы видеть, на что уходят деньги"),
+]
+OTHER = (0.05, True, "проверьте мелкие регулярные траты в этой категории")
+# Переводы и пополнения — не расходы
+SKIP = ("перевод", "пополнение", "transfer", "deposit", "депозит")
+
+_ISO_MONTH = re.compile(r"^(\d{4})-(\d{2})")
+
+
+def category_profile(category: str) -> tuple:
+    """(ориентир доли, необязательная, совет) по названию категории"""
+    name = category.lower()
+    for keywords, share, discretionary, tip in BASELINES:
+        if any(k in name for k in keywords):
+            return share, discretionary, tip
+    return OTHER
+
+
+def _month(value: str) -> Optional[str]:
+    """"2024-03-15" -> "2024-03"; даты в by_date всегда ISO (analysis.aggregate)"""
+    m = _ISO_MONTH.match(value)
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+
+def count_months(by_date: list) -> int:
+    """Сколько календарных месяцев покрывает выписка (по by_date из analysis.aggregate)"""
+    months = {_month(str(item["date"])) for item in by_date}
+    months.discard(None)
+    return max(len(months), 1)
+
+
+def expenses(by_category: list) -> dict:
+    """Расходы по категориям как положительные суммы, без переводов.
+
+    Если выписка хранит расходы со знаком минус (больше денег в отрицательных
+    суммах), расходами считаются отрицательные суммы.
+    """
+    negative = -sum(item["amount"] for item in by_category if item["amount"] < 0)
+    positive = sum(item["amount"] for item in by_category if item["amount"] > 0)
+    sign = -1 if negative > positive else 1
+    result = {}
+    for item in by_category:
+        amount = item["amount"] * sign
+        category = str(item["category"])
+        if amount > 0 and not any(k in category.lower() for k in SKIP):
+            result[category] = result.get(category, 0.0) + amount
+    return result
+
+
+def _money(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def rule_advice(by_category: list, by_date: Optional[list] = None, diff: Optional[dict] = None) -> str:
+    """Текст совета по итогам выписки (by_category/by_date из analysis.aggregate).
+
+    diff — running_aggregates.period_diff: если есть предыдущие месяцы, перерасход
+    считается относительно собственного скользящего среднего пользователя.
+    """
+    if diff and diff["previous_months"]:
+        return _personal_advice(diff)
+
+    spent = expenses(by_category)
+    total = sum(spent.values())
+    if total <= 0:
+        return "Совет по правилам: в выписке не найдено расходов для анализа."
+    months = count_months(by_date or [])
+
+    overspent, savings = [], 0.0
+    for category, amount in sorted(spent.items(), key=lambda item: item[1], reverse=True):
+        share, discretionary, tip = category_profile(category)
+        excess = amount - share * total
+        if excess > 0 and amount / total > share * 1.1:
+            overspent.append((category, amount, share, excess, tip))
+        if discretionary:
+            savings += max(excess, 0.0) + DISCRETIONARY_CUT * min(amount, share * total)
+
+    lines = [f"Совет сформирован по правилам (без ИИ). Расходы: {_money(total)} за {months} мес."]
+    lines.append("1. Категории с перерасходом:")
+    if overspent:
+        for category, amount, share, _, _ in overspent[:TOP_CATEGORIES]:
+            lines.append(f"   - {category}: {_money(amount)} ({amount / total:.0%} расходов при ориентире {share:.0%})")
+    else:
+        lines.append("   - явного перерасхода нет, доли категорий в пределах ориентиров")
+    lines.append("2. Советы:")
+    tips = overspent[:TOP_CATEGORIES] or [
+        (category, 0, 0, 0, category_profile(category)[2])
+        for category in sorted(spent, key=spent.get, reverse=True)[:2]
+    ]
+    for category, _, _, _, tip in tips:
+        lines.append(f"   - {category}: {tip}")
+    lines.append(f"3. Можно сэкономить около {_money(savings / months)} в месяц.")
+    return "\n".join(lines)
+
+
+def _personal_advice(diff: dict) -> str:
+    """Перерасход относительно собственного среднего за предыдущие месяцы"""
+    grown, savings = [], 0.0
+    for row in diff["categories"]:
+        category = str(row["category"])
+        if any(k in category.lower() for k in SKIP):
+            continue
+        amount, baseline = abs(row["amount"]), abs(row["rolling_avg"])
+        _, discretionary, tip = category_profile(category)
+        if amount > baseline * (1 + GROWTH_THRESHOLD):
+            grown.append((category, amount, baseline, tip))
+            if discretionary:
+                savings += amount - baseline
+        elif discretionary:
+            savings += DISCRETIONARY_CUT * amount
+
+    period = ", ".join(diff["new_months"]) or "без дат"
+    lines = [f"Совет сформирован по правилам (без ИИ). Период: {period}, сравнение со средним "
+             f"за {', '.join(diff['previous_months'])}."]
+    lines.append("1. Категории, где расходы выросли:")
+    if grown:
+        for category, amount, baseline, _ in grown[:TOP_CATEGORIES]:
+            change = f"+{(amount - baseline) / baseline:.0%}" if baseline else "новая категория"
+            lines.append(f"   - {category}: {_money(amount)} в месяц против {_money(baseline)} ({change})")
+    else:
+        lines.append("   - заметного роста нет")
+    lines.append("2. Советы:")
+    for category, _, _, tip in grown[:TOP_CATEGORIES]:
+        lines.append(f"   - {category}: {tip}")
+    if not grown:
+        lines.append("   - сохраняйте текущий уровень расходов")
+    lines.append(f"3. Можно сэкономить около {_money(savings)} в месяц.")
+    return "\n".join(lines)
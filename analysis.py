@@ -0,0 +1,642 @@
+"""
+Парсинг выписок (.pdf/.csv/.xlsx) и агрегация расходов для графиков.
+
+Парсеры возвращают TransactionBatch (transaction_batch.py) — колоночное
+представление с категориями-кодами, float64 суммами и datetime64 датами;
+агрегации и промпты работают с ним.
+"""
+
+import csv
+import posixpath
+import re
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pdfplumber
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import from_excel, CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+import insights
+from statement_templates import detect_template, record_format
+from transaction_batch import TransactionBatch, labels, map_dates
+
+# Сколько строк Transaction вставляется одним executemany (iter_transaction_rows)
+TRANSACTION_CHUNK_ROWS = 10_000
+
+
+def load_statement(filename: str, content: bytes, deadline=None) -> TransactionBatch:
+    """Разбирает файл выписки в TransactionBatch (колонки приведены normalize_columns).
+
+    deadline (deadline.Deadline) — PDF и XLSX разбираются, пока он не истек:
+    остаток файла пропускается и отмечается в deadline.partial["parse"].
+    """
+    if filename.lower().endswith(".pdf"):
+        batch = parse_pdf(BytesIO(content), deadline)
+        if not len(batch):
+            raise ValueError("Файл не содержит данных")
+        return batch
+    return TransactionBatch.from_frame(normalize_columns(load_dataframe(filename, content, deadline)))
+
+
+def load_dataframe(filename: str, content: bytes, deadline=None) -> pd.DataFrame:
+    """Читает содержимое файла в DataFrame по расширению имени"""
+    filename = filename.lower()
+    if filename.endswith(".xlsx"):
+        df = read_xlsx(content, deadline)
+    elif filename.endswith(".csv"):
+        df = read_csv(content)
+    elif filename.endswith(".pdf"):
+        df = parse_pdf(BytesIO(content), deadline).to_frame()
+    else:
+        raise ValueError("Поддерживаются только .xlsx, .csv, .pdf")
+
+    if df.empty:
+        raise ValueError("Файл не содержит данных")
+    return df
+
+
+# Текстовые колонки CSV, которые сразу читаются как category (коды вместо строки на ячейку).
+# На маленьких файлах это только добавляет постоянные расходы, поэтому — от CSV_CATEGORY_MIN_BYTES
+CSV_CATEGORY_COLUMNS = ("date", "category", "description")
+CSV_CATEGORY_MIN_BYTES = 256 * 1024
+
+
+def read_csv(content: bytes) -> pd.DataFrame:
+    """pd.read_csv; в больших файлах date/category/description читаются как category —
+    повторяющиеся значения хранятся один раз, а даты потом разбираются по уникальным"""
+    if len(content) < CSV_CATEGORY_MIN_BYTES:
+        return pd.read_csv(BytesIO(content))
+    first_line = content.split(b"\n", 1)[0].decode("utf-8-sig", errors="replace")
+    header = next(csv.reader([first_line]), [])
+    dtype = {c: "category" for c in header if c.lower().strip() in CSV_CATEGORY_COLUMNS}
+    return pd.read_csv(BytesIO(content), dtype=dtype)
+
+
+# Стандартные колонки и их синонимы (сравниваются по началу имени,
+# чтобы "Дата операции" или "Сумма, KZT" тоже находились)
+COLUMN_SYNONYMS = {
+    "date": ("date", "дата"),
+    "category": ("category", "категория"),
+    "description": ("description", "описание"),
+    "amount": ("amount", "сумма"),
+}
+XLSX_HEADER_KEYWORDS = tuple(chain.from_iterable(COLUMN_SYNONYMS.values()))
+# Строка заголовка XLSX должна содержать хотя бы столько известных имен колонок:
+# одно совпадение — это обычно шапка ("Дата формирования: ...")
+XLSX_HEADER_MIN_MATCHES = 2
+XLSX_HEADER_SCAN_ROWS = 50
+# Как часто чтение XLSX проверяет дедлайн запроса (строк)
+XLSX_DEADLINE_CHECK_ROWS = 10_000
+
+
+def _is_needed_header(value) -> bool:
+    return isinstance(value, str) and value.strip().lower().startswith(XLSX_HEADER_KEYWORDS)
+
+
+def read_xlsx(content: bytes, deadline=None) -> pd.DataFrame:
+    """Потоковое чтение первого листа XLSX.
+
+    Строки над таблицей (название банка, период выписки) пропускаются:
+    заголовком считается первая строка, где не меньше XLSX_HEADER_MIN_MATCHES
+    известных имен колонок; если такой нет — как pd.read_excel: первая непустая
+    строка. Читаются все колонки, сопоставляет их normalize_columns.
+    Истекший deadline останавливает чтение — остаются первые строки.
+    """
+    rows = iter_xlsx_rows(content)
+
+    header = None
+    skipped = []
+    for row in rows:
+        if sum(_is_needed_header(v) for v in row) >= XLSX_HEADER_MIN_MATCHES:
+            header = row
+            break
+        skipped.append(row)
+        if len(skipped) >= XLSX_HEADER_SCAN_ROWS:
+            break
+
+    if header is None:
+        # Известных заголовков нет: первая непустая строка — заголовок
+        pending = iter(skipped)
+        header = next((r for r in pending if any(v is not None for v in r)), None)
+        if header is None:
+            return pd.DataFrame()
+        rows = chain(pending, rows)
+    wanted = range(len(header))
+
+    names = [
+        str(header[i]).strip() if header[i] is not None else f"Unnamed: {i}"
+        for i in wanted
+    ]
+    columns = [[] for _ in wanted]
+    for number, row in enumerate(rows):
+        if number and number % XLSX_DEADLINE_CHECK_ROWS == 0 and deadline is not None and deadline.expired():
+            deadline.cut("parse", rows_parsed=len(columns[0]) if columns else 0)
+            break
+        values = [row[i] if i < len(row) else None for i in wanted]
+        if all(v is None for v in values):
+            continue
+        for column, value in zip(columns, values):
+            column.append(value)
+
+    return pd.DataFrame(dict(zip(names, columns)), columns=names)
+
+
+# === Потоковый разбор XLSX ===
+# openpyxl даже в read-only режиме тратит на каждую ячейку несколько вызовов
+# (стили, типы, объекты ячеек); здесь лист разбирается напрямую через iterparse,
+# а от openpyxl берутся только таблица форматов дат и перевод дат Excel.
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_col_re = re.compile(r"[A-Z]+")
+
+
+def _column_index(ref: str) -> int:
+    """'C12' -> 2"""
+    index = 0
+    for ch in _col_re.match(ref).group():
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _string_text(el) -> str:
+    """Текст <si>/<is>: простой <t> или rich text <r><t> (подсказки <rPh> пропускаем)"""
+    if el is None:
+        return ""
+    parts = [el.findtext(_NS + "t") or ""]
+    parts += [r.findtext(_NS + "t") or "" for r in el.findall(_NS + "r")]
+    return "".join(parts)
+
+
+def _first_sheet_path(zf: zipfile.ZipFile) -> str:
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    sheet = workbook.find(f"{_NS}sheets/{_NS}sheet")
+    rel_id = sheet.get(_REL_NS + "id")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(_PKG_REL_NS + "Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath("xl/" + target)
+    raise ValueError("Не найден лист в XLSX")
+
+
+def _date_styles(zf: zipfile.ZipFile) -> set:
+    """Индексы стилей ячеек (cellXfs), у которых формат — дата/время"""
+    try:
+        styles = ET.fromstring(zf.read("xl/styles.xml"))
+    except KeyError:
+        return set()
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in styles.iter(_NS + "numFmt"):
+        formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+    cell_xfs = styles.find(_NS + "cellXfs")
+    if cell_xfs is None:
+        return set()
+    return {
+        i for i, xf in enumerate(cell_xfs.findall(_NS + "xf"))
+        if is_date_format(formats.get(int(xf.get("numFmtId", 0)), ""))
+    }
+
+
+def iter_xlsx_rows(content: bytes):
+    """Генератор строк первого листа (списки значений, пустые ячейки — None)"""
+    zf = zipfile.ZipFile(BytesIO(content))
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    pr = workbook.find(_NS + "workbookPr")
+    epoch = CALENDAR_MAC_1904 if pr is not None and pr.get("date1904") in ("1", "true") else CALENDAR_WINDOWS_1900
+
+    shared = []
+    if "xl/sharedStrings.xml" in zf.namelist():
+        for _, si in ET.iterparse(zf.open("xl/sharedStrings.xml")):
+            if si.tag == _NS + "si":
+                shared.append(_string_text(si))
+                si.clear()
+    date_styles = _date_styles(zf)
+
+    row_tag, cell_tag, v_tag, is_tag = _NS + "row", _NS + "c", _NS + "v", _NS + "is"
+    sheet_data = None
+    with zf.open(_first_sheet_path(zf)) as sheet:
+        for event, el in ET.iterparse(sheet, events=("start", "end")):
+            if event == "start":
+                if el.tag == _NS + "sheetData":
+                    sheet_data = el
+                continue
+            if el.tag != row_tag:
+                continue
+
+            row = []
+            for position, c in enumerate(el.iter(cell_tag)):
+                ref = c.get("r")
+                index = _column_index(ref) if ref else position
+                kind = c.get("t", "n")
+                if kind == "inlineStr":
+                    value = _string_text(c.find(is_tag))
+                else:
+                    v = c.findtext(v_tag)
+                    if not v:
+                        continue  # пустая ячейка или формула без сохраненного значения
+                    if kind == "s":
+                        value = shared[int(v)]
+                    elif kind in ("str", "d"):
+                        value = v
+                    elif kind == "b":
+                        value = v == "1"
+                    elif kind == "e":
+                        continue  # #N/A, #DIV/0! — как пустая ячейка (так делает pandas)
+                    elif int(c.get("s", 0)) in date_styles:
+                        value = from_excel(float(v), epoch)
+                    elif "." in v or "E" in v or "e" in v:
+                        value = float(v)
+                    else:
+                        value = int(v)
+                if index >= len(row):
+                    row.extend([None] * (index - len(row) + 1))
+                row[index] = value
+            yield row
+            # Освобождаем разобранные строки, чтобы дерево не росло
+            if sheet_data is not None:
+                sheet_data.clear()
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Приводит колонки к виду category/amount (и date, если есть)"""
+    df.columns = [str(col).lower().strip() for col in df.columns]
+    # "Дата операции" -> date, "Сумма, KZT" -> amount (если стандартной колонки еще нет)
+    for name, prefixes in COLUMN_SYNONYMS.items():
+        if name not in df.columns:
+            match = next((col for col in df.columns if col.startswith(prefixes)), None)
+            if match is not None:
+                df.rename(columns={match: name}, inplace=True)
+
+    if "category" not in df.columns:
+        if "description" in df.columns:
+            # Описание остается своей колонкой (поиск, регулярные платежи), категория — его копия
+            df["category"] = df["description"]
+        else:
+            df["category"] = "Не указано"
+
+    if "amount" not in df.columns:
+        for col in df.columns:
+            if df[col].apply(lambda x: isinstance(x, (int, float))).any():
+                df.rename(columns={col: "amount"}, inplace=True)
+                break
+
+    if "amount" not in df.columns:
+        raise ValueError("Не найдена колонка с суммой")
+    return df
+
+
+def build_prompt(batch: TransactionBatch, found: Optional[dict] = None) -> str:
+    """Промпт для ИИ по первым строкам выписки; found — insights.detect по всей выписке"""
+    sample_data = batch.head(20).records()
+    return f"""
+        Вот пример расходов пользователя:
+        {sample_data}
+
+        {insights.describe(found)}
+
+        Проанализируй траты и ответь:
+        1. Какие категории перерасходуют бюджет?
+        2. Какие советы по сокращению расходов?
+        3. Какую сумму можно было бы сэкономить ежемесячно?
+        """
+
+
+# Шаг by_date: day, week (с понедельника), month; auto — по длине периода выписки
+DATE_PERIODS = ("day", "week", "month", "auto")
+AUTO_DAY_SPAN_DAYS = 92
+AUTO_WEEK_SPAN_DAYS = 731
+
+
+def resolve_period(dates: np.ndarray, period: str) -> str:
+    """auto -> day/week/month, чтобы длинная история давала сотню-другую точек"""
+    if period != "auto":
+        return period
+    dated = dates[~np.isnat(dates)]
+    if not len(dated):
+        return "day"
+    span = (dated.max() - dated.min()).astype("timedelta64[D]").astype(np.int64)
+    if span <= AUTO_DAY_SPAN_DAYS:
+        return "day"
+    return "week" if span <= AUTO_WEEK_SPAN_DAYS else "month"
+
+
+def bucket_dates(dates: np.ndarray, period: str) -> np.ndarray:
+    """Начало дня/недели/месяца для каждой даты (datetime64[D], NaT остается NaT)"""
+    days = dates.astype("datetime64[D]")
+    if period == "week":
+        # 1970-01-05 — понедельник
+        weekday = (days - np.datetime64("1970-01-05")).astype(np.int64) % 7
+        return days - weekday.astype("timedelta64[D]")
+    if period == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    return days
+
+
+def aggregate(batch: TransactionBatch, period: str = "day") -> dict:
+    """Готовит данные для графиков: суммы по категориям, по датам и первые транзакции.
+
+    period — шаг by_date (DATE_PERIODS); дата точки — начало дня/недели/месяца.
+    """
+    amount = pd.Series(batch.amount)
+
+    # По категориям: группировка по кодам Categorical, без строк на каждую операцию
+    totals = amount.groupby(batch.category, observed=True).sum()
+    by_category = sorted(
+        ({"category": str(category), "amount": float(value)} for category, value in totals.items()),
+        key=lambda item: item["category"]
+    )
+
+    # По датам (в хронологическом порядке, YYYY-MM-DD); операции без даты не попадают
+    period = resolve_period(batch.date, period)
+    buckets = pd.Series(bucket_dates(batch.date, period))
+    totals = amount.groupby(buckets).sum()
+    by_date = [
+        {"date": str(day.date()), "amount": float(value)}
+        for day, value in totals.items()
+    ]
+
+    return {
+        "transactions": batch.head(100).records(),
+        "by_category": by_category,
+        "by_date": by_date,
+        "period": period,
+        "total_amount": float(batch.amount.sum()),
+        "transactions_count": len(batch),
+    }
+
+
+# === ПАКЕТНЫЙ АНАЛИЗ ===
+def parse_in_worker(filename: str, content: bytes, expires_at: Optional[float] = None):
+    """load_statement в процессе пула.
+
+    Возвращает (TransactionBatch, форматы разобранных PDF, что не успели разобрать
+    к expires_at по time.time() или None): статистику форматов учитывает основной
+    процесс (см. statement_templates.collect_formats). Колонки пакета передаются
+    обратно компактнее, чем DataFrame с object-колонками.
+    """
+    from deadline import Deadline
+    from statement_templates import collect_formats
+
+    deadline = None
+    if expires_at is not None:
+        # Уже истекший дедлайн: разбирается только первая страница (или пачка строк)
+        deadline = Deadline(max(expires_at - time.time(), 1e-3), reserve=0.0)
+    with collect_formats() as formats:
+        batch = load_statement(filename, content, deadline)
+    return batch, formats, deadline.partial.get("parse") if deadline is not None else None
+
+
+DEDUP_KEY = ["date", "category", "amount"]
+
+
+def merge_statements(batches: list):
+    """Склеивает выписки в один набор, убирая операции из пересечения периодов.
+
+    Выписки за соседние месяцы часто пересекаются на граничных днях.
+    Одинаковые (date, category, amount) внутри одного файла — разные операции
+    (два кофе за день), поэтому дубликатами считаются только повторы между
+    файлами: каждой операции остается столько, сколько ее в том файле, где
+    она встречается чаще. Строки без даты не сравниваются.
+    Возвращает (TransactionBatch, сколько строк удалено).
+    """
+    merged = TransactionBatch.concat(batches)
+    if len(batches) < 2:
+        return merged, 0
+
+    # Категория сравнивается по коду: после concat словарь у всех выписок общий
+    keys = pd.DataFrame({
+        "date": merged.date,
+        "category": merged.category.codes,
+        "amount": merged.amount,
+        "_file": np.repeat(np.arange(len(batches)), [len(b) for b in batches]),
+    })
+    dated = keys[keys["date"].notna()]
+    # Номер повтора операции внутри своего файла: 0, 1, 2...
+    occurrence = dated.groupby(DEDUP_KEY + ["_file"], sort=False).cumcount()
+    duplicated = dated.assign(_n=occurrence).duplicated(DEDUP_KEY + ["_n"])
+    keep = np.ones(len(merged), dtype=bool)
+    keep[duplicated.index[duplicated.to_numpy()]] = False
+    return merged.take(keep), int(duplicated.sum())
+
+
+def build_batch_prompt(stats: dict, files: list, found: Optional[dict] = None) -> str:
+    """Промпт для ИИ по сводке нескольких выписок: итоги по файлам и категориям
+    (found — insights.detect по объединенным выпискам)"""
+    files_summary = [
+        {"file": f["filename"], "transactions": f["transactions_count"], "total": f["total_amount"]}
+        for f in files
+    ]
+    top_categories = sorted(stats["by_category"], key=lambda c: abs(c["amount"]), reverse=True)[:20]
+    return f"""
+        Вот сводка расходов пользователя по {len(files)} выпискам:
+        {files_summary}
+
+        Суммы по категориям за весь период (всего {stats["transactions_count"]} операций,
+        итог {stats["total_amount"]:.2f}):
+        {top_categories}
+
+        {insights.describe(found)}
+
+        Проанализируй траты и ответь:
+        1. Какие категории перерасходуют бюджет?
+        2. Как менялись расходы между выписками?
+        3. Какие советы по сокращению расходов?
+        4. Какую сумму можно было бы сэкономить ежемесячно?
+        """
+
+
+# === ИНКРЕМЕНТАЛЬНЫЙ АНАЛИЗ ===
+def iter_transaction_rows(batch: TransactionBatch, chunk_rows: int = TRANSACTION_CHUNK_ROWS):
+    """Строки выписки для таблицы Transaction (operation_date, description, category,
+    amount) пачками по chunk_rows — в памяти не держится список на всю выписку"""
+    for start in range(0, len(batch), chunk_rows):
+        part = batch.take(slice(start, start + chunk_rows))
+        columns = {
+            "category": labels(part.category),
+            "amount": part.amount.tolist(),
+            "operation_date": map_dates(part.date, lambda day: day.item()),
+            "description": labels(part.description) if part.description is not None else [None] * len(part),
+        }
+        names = list(columns)
+        yield [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def period_delta(batch: TransactionBatch) -> dict:
+    """Дельта выписки для running_aggregates: суммы по месяцам и категориям"""
+    months = batch.date.astype("datetime64[M]")
+    dated = ~np.isnat(months)
+
+    monthly = {}
+    amount = pd.Series(batch.amount[dated])
+    totals = amount.groupby([months[dated], batch.category[dated]], observed=True).sum()
+    for (month, category), value in totals.items():
+        monthly.setdefault(month.strftime("%Y-%m"), {})[str(category)] = float(value)
+    monthly = dict(sorted(monthly.items()))
+    amount = pd.Series(batch.amount[~dated])
+    undated = {
+        str(category): float(value)
+        for category, value in amount.groupby(batch.category[~dated], observed=True).sum().items()
+    }
+
+    return {
+        "monthly": monthly,
+        "undated": undated,
+        "transactions_count": len(batch),
+        "total_amount": float(batch.amount.sum()),
+    }
+
+
+def build_diff_prompt(diff: dict, found: Optional[dict] = None) -> str:
+    """Промпт для ИИ только по изменениям нового периода относительно предыдущих месяцев
+    (found — insights.detect по новой выписке)"""
+    rows = [
+        {k: (round(v, 2) if isinstance(v, float) else v) for k, v in row.items()}
+        for row in diff["categories"]
+    ]
+    previous = ", ".join(diff["previous_months"]) or "нет данных"
+    return f"""
+        Пользователь загрузил выписку за период: {", ".join(diff["new_months"]) or "без дат"}.
+        Предыдущие месяцы: {previous}.
+
+        Изменения по категориям (amount — среднее в месяц за новый период,
+        previous — последний предыдущий месяц, rolling_avg — среднее за предыдущие месяцы):
+        {rows}
+
+        {insights.describe(found)}
+
+        Проанализируй изменения и ответь:
+        1. В каких категориях расходы выросли и почему это важно?
+        2. Какие советы по сокращению расходов?
+        3. Какую сумму можно было бы сэкономить ежемесячно?
+        """
+
+
+# === PDF ПАРСЕР ===
+date_re = re.compile(r"(\d{1,2}\.\d{1,2}\.\d{2,4})")
+# Сумма: знак, цифры с пробелами-разделителями тысяч ("12 500"), копейки через
+# точку/запятую, валюта. Целая часть — одна серия [\s\d], которая начинается и
+# заканчивается цифрой: откат возможен только по хвостовым пробелам, поэтому
+# поиск линеен (раньше \d{1,3} и [\s\d]* делили одни и те же цифры).
+amount_re = re.compile(
+    r"(?P<sign>[+-])?\s?(?P<int>\d(?:[\s\d]*\d)?)(?:[.,](?P<frac>\d{2}))?\s*(?:₸|KZT|т|тг|\$|₽)?"
+)
+
+
+def tokenize_line(line: str):
+    """Разбирает строку выписки на (дата, сумма, описание) или None.
+
+    Берется первая дата и первая сумма, начинающаяся не раньше конца даты
+    (иначе — последняя сумма в строке); описание — текст между ними, либо
+    после суммы, если между ними пусто. Поиск суммы останавливается на
+    первом подходящем совпадении.
+    """
+    date_match = date_re.search(line)
+    if not date_match:
+        return None
+    date_end = date_match.end()
+
+    chosen = None
+    for m in amount_re.finditer(line):
+        chosen = m
+        if m.start() >= date_end - 1:
+            break
+    if chosen is None:
+        return None
+
+    desc = line[date_end:chosen.start()].strip()
+    if not desc:
+        desc = line[chosen.end():].strip()
+
+    return date_match.group(1), _amount_value(chosen), desc
+
+
+def _amount_value(m) -> float:
+    """Число из совпадения amount_re: без пробелов-разделителей, копейки через точку"""
+    return float(
+        (m.group("sign") or "")
+        + "".join(m.group("int").split())
+        + ("." + m.group("frac") if m.group("frac") else "")
+    )
+
+
+def parse_pdf(file_obj, deadline=None) -> TransactionBatch:
+    """Извлекает строки с датой, суммой и описанием из PDF.
+
+    Известные банки (statement_templates) разбираются по колонкам таблицы,
+    остальные — построчно через tokenize_line. Значения собираются сразу в
+    колонки (списки), без словаря на строку. Истекший deadline останавливает
+    разбор на границе страницы — остаются первые страницы. Описание операции
+    сохраняется как есть (для поиска и регулярных платежей), категория — по нему.
+    """
+    dates, categories, amounts, descriptions = [], [], [], []
+    with pdfplumber.open(file_obj) as pdf:
+        if not pdf.pages:
+            return TransactionBatch.from_columns(dates, categories, amounts, descriptions)
+        first_text = pdf.pages[0].extract_text() or ""
+
+        template = detect_template(first_text)
+        if template is not None:
+            _template_rows(template, pdf, dates, categories, amounts, descriptions, deadline)
+            record_format(template.name if dates else f"{template.name}:fallback")
+            if dates:
+                return TransactionBatch.from_columns(dates, categories, amounts, descriptions)
+        else:
+            record_format("generic")
+
+        for i, page in enumerate(pdf.pages):
+            if i and deadline is not None and deadline.expired():
+                deadline.cut("parse", pages_parsed=i, pages_total=len(pdf.pages))
+                break
+            text = first_text if i == 0 else page.extract_text()
+            if not text:
+                continue
+            for raw_line in text.split("\n"):
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                token = tokenize_line(line)
+                if token is None:
+                    continue
+                date, amount, desc = token
+
+                dates.append(date)
+                categories.append(classify_description(desc))
+                amounts.append(amount)
+                descriptions.append(desc)
+    return TransactionBatch.from_columns(dates, categories, amounts, descriptions)
+
+
+def _template_rows(template, pdf, dates: list, categories: list, amounts: list, descriptions: list,
+                   deadline=None):
+    """Дописывает в колонки строки выписки по шаблону банка; ячейки без даты или суммы пропускаются"""
+    for cells in template.parse(pdf, deadline):
+        date_match = date_re.match(cells["date"])
+        amount_match = amount_re.search(cells["amount"])
+        if not date_match or not amount_match:
+            continue
+        dates.append(date_match.group(1))
+        categories.append(classify_description(cells["description"]))
+        amounts.append(_amount_value(amount_match))
+        descriptions.append(cells["description"])
+
+
+def classify_description(desc: str) -> str:
+    """Простая классификация транзакции по ключевым словам."""
+    d = desc.lower()
+    if any(k in d for k in ["перевод", "пополнение", "deposit", "депозит"]):
+        return "transfer/deposit"
+    if any(k in d for k in ["покупк", "магазин", "ozon", "market", "shop"]):
+        return "purchase"
+    if any(k in d for k in ["коммун", "телеком", "kazakhtelecom", "услуги"]):
+        return "utilities"
+    if any(k in d for k in ["аппарат", "банкомат", "снятие"]):
+        return "cash"
+    return desc if len(desc) <= 80 else desc[:77] + "..."
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Время /analyze-expenses, когда Ollama медленная или недоступна: ожидание ответа ИИ
+(как раньше) против бюджета LLM_ADVICE_BUDGET с советом по правилам и размыкателем.
+
+Использование:
+    python bench_advice.py                          # ИИ отвечает за 5 с, бюджет 1 с
+    python bench_advice.py --llm-latency 20 --uploads 20
+
+Сценарии (по --uploads загрузок подряд одной выписки):
+    slow/wait    — как раньше: бюджет больше задержки ИИ и размыкатель выключен,
+                   каждая загрузка ждет ответ модели;
+    slow/budget  — после LLM_ADVICE_BUDGET отвечает совет по правилам, ответ ИИ
+                   дописывается позже; медленные ответы (> LLM_SLOW_CALL_SECONDS)
+                   размыкают цепь, и следующие загрузки не ждут вовсе;
+    down/budget  — Ollama не запущена: раньше загрузка падала с 500.
+Также печатается время advice.rule_advice на итогах выписки.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from bench_startup import free_port, wait_until_up
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATEMENT = "date,category,amount\n" + "".join(
+    f"2024-0{1 + i % 3}-{1 + i % 28:02d},{c},{100 + i * 7}\n"
+    for i, c in enumerate(["Продукты", "Кафе", "Развлечения", "Транспорт", "Услуги", "Одежда"] * 50)
+)
+
+
+def run(scenario: str, budget: float, args) -> list:
+    tmp = tempfile.mkdtemp(prefix="bench_advice_")
+    llm_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}",
+        RATE_LIMITS="",
+        LLM_PROBE_INTERVAL="0",
+        OLLAMA_API=f"http://127.0.0.1:{llm_port}/api/generate",
+        LLM_ADVICE_BUDGET=str(budget),
+        LLM_SLOW_CALL_SECONDS=str(args.llm_latency / 2),
+        LLM_BREAKER_FAILURES="0" if budget > args.llm_latency else "3",
+    )
+    processes = []
+    if scenario == "slow":
+        processes.append(subprocess.Popen(
+            [sys.executable, "fake_ollama.py", "--port", str(llm_port), "--tokens-per-sec", "0",
+             "--latency-ms", str(args.llm_latency * 1000)],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        wait_until_up(f"http://127.0.0.1:{llm_port}/api/tags")
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ))
+    try:
+        base = f"http://127.0.0.1:{app_port}"
+        wait_until_up(base + "/health", timeout=60)
+        results = []
+        with httpx.Client(base_url=base, timeout=300) as client:
+            client.post("/register", json={"username": "bench", "email": "bench@bench.kz", "password": "bench"})
+            token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            for _ in range(args.uploads):
+                started = time.perf_counter()
+                response = client.post("/analyze-expenses", headers=headers,
+                                       files={"file": ("bench.csv", STATEMENT, "text/csv")})
+                source = response.json().get("advice_source", "-") if response.status_code == 200 else "-"
+                results.append((time.perf_counter() - started, response.status_code, source))
+        return results
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def time_rules(repeat: int = 1000) -> float:
+    import advice
+
+    by_category = [{"category": c, "amount": float(a)} for c, a in
+                   [("Продукты", 45000), ("Кафе", 21000), ("Развлечения", 35000), ("Транспорт", 18000),
+                    ("Услуги", 12000), ("Одежда", 15000), ("purchase", 9000), ("cash", 4000)]]
+    by_date = [{"date": f"2024-0{m}-{d:02d}", "amount": 100.0} for m in (1, 2, 3) for d in range(1, 29)]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        advice.rule_advice(by_category, by_date)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=5, help="секунд до ответа fake_ollama")
+    parser.add_argument("--budget", type=float, default=1, help="LLM_ADVICE_BUDGET, секунд")
+    parser.add_argument("--uploads", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"advice.rule_advice: {time_rules():.3f} мс")
+    print(f"{'scenario':<13}{'p50 s':>8}{'max s':>8}{'total s':>9}  statuses / advice_source")
+    for scenario, budget in (("slow", args.llm_latency * 3), ("slow", args.budget), ("down", args.budget)):
+        results = run(scenario, budget, args)
+        latencies = [r[0] for r in results]
+        label = f"{scenario}/{'wait' if budget > args.llm_latency else 'budget'}"
+        outcomes = Counter(f"{status}:{source}" for _, status, source in results)
+        print(f"{label:<13}{statistics.median(latencies):>8.2f}{max(latencies):>8.2f}{sum(latencies):>9.1f}  "
+              + ", ".join(f"{k}×{v}" for k, v in sorted(outcomes.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Время хода /chat по мере роста диалога: клиент пересылает всю историю
+против серверной сессии (context Ollama или скользящее окно истории).
+
+Использование:
+    python bench_chat_sessions.py                  # 20 ходов
+    python bench_chat_sessions.py --turns 40 --prompt-tokens-per-sec 100
+
+fake_ollama.py вычисляет промпт со скоростью --prompt-tokens-per-sec, поэтому
+время до ответа растет с числом токенов, которые модели пришлось вычислить заново.
+Режимы:
+    stateless — клиент каждый раз отправляет всю историю в message;
+    context   — session_id, сервер передает context предыдущего ответа;
+    window    — session_id, CHAT_CONTEXT_TOKENS=0: промпт из окна CHAT_HISTORY_TOKENS.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_startup import free_port, wait_until_up
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = {
+    "stateless": {},
+    "context": {},
+    "window": {"CHAT_CONTEXT_TOKENS": "0"},
+}
+QUESTION = "Как мне сократить расходы на кафе и такси в этом месяце, если зарплата приходит 10 числа? "
+
+
+def converse(base: str, mode: str, turns: int) -> list:
+    latencies = []
+    with httpx.Client(base_url=base, timeout=300) as client:
+        client.post("/register", json={"username": "bench", "email": "bench@bench.kz", "password": "bench"})
+        token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        history, session_id = [], None
+        for turn in range(turns):
+            question = f"{QUESTION}(вопрос {turn + 1})"
+            if mode == "stateless":
+                payload = {"message": "\n".join(history + [question])}
+            else:
+                payload = {"message": question, "session_id": session_id}
+            started = time.perf_counter()
+            response = client.post("/chat", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            body = response.json()
+            session_id = body.get("session_id")
+            history += [question, body["reply"]]
+    return latencies
+
+
+def run(mode: str, args) -> list:
+    tmp = tempfile.mkdtemp(prefix="bench_chat_")
+    llm_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}",
+        RATE_LIMITS="",
+        OLLAMA_API=f"http://127.0.0.1:{llm_port}/api/generate",
+        **MODES[mode],
+    )
+    fake = subprocess.Popen(
+        [sys.executable, "fake_ollama.py", "--port", str(llm_port), "--latency-ms", "20", "--tokens-per-sec", "0",
+         "--tokens", str(args.reply_tokens), "--prompt-tokens-per-sec", str(args.prompt_tokens_per_sec)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{llm_port}/api/tags")
+        base = f"http://127.0.0.1:{app_port}"
+        wait_until_up(base + "/", timeout=60)
+        return converse(base, mode, args.turns)
+    finally:
+        for process in (app, fake):
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=400)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    checkpoints = sorted({1, 2, 5, 10, 20, 40, args.turns} & set(range(1, args.turns + 1)))
+    print("Время хода, мс")
+    print(f"{'mode':<11}" + "".join(f"{'#' + str(t):>8}" for t in checkpoints) + f"{'total s':>9}")
+    for mode in MODES:
+        latencies = run(mode, args)
+        print(f"{mode:<11}" + "".join(f"{latencies[t - 1] * 1000:>8.0f}" for t in checkpoints)
+              + f"{sum(latencies):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Детерминированные генераторы синтетических выписок для бенчмарков
+"""
+
+import os
+import random
+from datetime import date, timedelta
+
+CACHE_DIR = os.getenv("BENCH_CACHE_DIR", "./.bench_cache")
+
+# Описания в ASCII: встроенный шрифт Helvetica в PDF не умеет кириллицу
+DESCRIPTIONS = [
+    "Pokupka shop Magnum",
+    "Market Small",
+    "Ozon order",
+    "Perevod deposit Kaspi",
+    "Kazakhtelecom internet",
+    "Snyatie ATM Halyk",
+    "Coffee Boom",
+    "Yandex Go taxi",
+    "Kino Chaplin",
+    "Apteka Sadyhan",
+]
+
+CATEGORIES = ["Продукты", "Транспорт", "Развлечения", "Услуги", "Одежда", "Медицина"]
+
+LINES_PER_PAGE = 50
+
+
+def _rows(n: int, seed: int):
+    """Поток (дата, описание, сумма) с фиксированным seed"""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    for _ in range(n):
+        day = start + timedelta(days=rng.randint(0, 729))
+        amount = round(rng.uniform(100, 250000), 2)
+        if rng.random() < 0.8:
+            amount = -amount
+        yield day, rng.choice(DESCRIPTIONS), amount
+
+
+def _format_amount(amount: float) -> str:
+    """Сумма в стиле банковских выписок: 12 500,00"""
+    sign = "-" if amount < 0 else "+"
+    whole, frac = f"{abs(amount):.2f}".split(".")
+    groups = []
+    while whole:
+        groups.insert(0, whole[-3:])
+        whole = whole[:-3]
+    return f"{sign}{' '.join(groups)},{frac}"
+
+
+def make_csv(n_rows: int, seed: int = 42) -> bytes:
+    """CSV с колонками date/description/value — сумма определяется по типу колонки"""
+    lines = ["date,description,value"]
+    for day, desc, amount in _rows(n_rows, seed):
+        lines.append(f"{day.strftime('%d.%m.%Y')},{desc},{amount}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_xlsx(n_rows: int, seed: int = 42, title_rows: bool = False) -> bytes:
+    """XLSX с колонками date/category/amount (title_rows — шапка банка над таблицей)"""
+    from io import BytesIO
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Выписка")
+    rng = random.Random(seed + 1)
+    if title_rows:
+        ws.append(["АО «Kaspi Bank»"])
+        ws.append(["Выписка по счету KZ00000000000000", None, None, "за период 01.01.2023 - 31.12.2024"])
+        ws.append([])
+    ws.append(["date", "category", "amount"])
+    for day, _, amount in _rows(n_rows, seed):
+        ws.append([day.strftime("%d.%m.%Y"), rng.choice(CATEGORIES), amount])
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def statement_lines(n_lines: int, seed: int = 42):
+    """Строки текстовой выписки: дата, описание, сумма с валютой"""
+    for day, desc, amount in _rows(n_lines, seed):
+        yield f"{day.strftime('%d.%m.%Y')} {desc} {_format_amount(amount)} KZT"
+
+
+def make_pdf(n_pages: int, seed: int = 42) -> bytes:
+    """Минимальный PDF (Helvetica, по LINES_PER_PAGE строк на страницу)"""
+    return pdf_from_lines(list(statement_lines(n_pages * LINES_PER_PAGE, seed)))
+
+
+def pdf_from_lines(lines: list) -> bytes:
+    """PDF с текстовыми строками (ASCII), по LINES_PER_PAGE на страницу"""
+    streams = []
+    for p in range(0, len(lines), LINES_PER_PAGE):
+        text = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        text += [f"({line}) Tj T*" for line in lines[p:p + LINES_PER_PAGE]]
+        text.append("ET")
+        streams.append("\n".join(text).encode("latin-1"))
+    return _assemble_pdf(streams)
+
+
+def _assemble_pdf(streams) -> bytes:
+    """Собирает PDF (объекты, xref, trailer) из content stream каждой страницы"""
+    n_pages = len(streams)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages — заполняется после страниц
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for stream in streams:
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % n_pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+KASPI_COLUMNS = ((40, "Date"), (95, "Amount"), (190, "Transaction"), (270, "Details"))
+
+
+def make_kaspi_pdf(n_pages: int, seed: int = 42) -> bytes:
+    """PDF в раскладке выписки Kaspi Gold (англ.): шапка и таблица с колонками по координатам"""
+    return kaspi_pdf_from_rows(list(_rows(n_pages * LINES_PER_PAGE, seed)))
+
+
+def kaspi_pdf_from_rows(rows: list) -> bytes:
+    """Выписка Kaspi Gold из строк (дата, описание, сумма), по LINES_PER_PAGE на страницу"""
+    kinds = {"Perevod": "Transfer", "Pokupka": "Purchase", "Snyatie": "Withdrawal"}
+    pages = []
+    for p in range(0, len(rows), LINES_PER_PAGE):
+        cells = [(40, 815, "Kaspi Gold statement"), (40, 803, "Period: 01.01.2023 - 31.12.2024")]
+        cells += [(x, 785, title) for x, title in KASPI_COLUMNS]
+        y = 770
+        for day, desc, amount in rows[p:p + LINES_PER_PAGE]:
+            first, _, rest = desc.partition(" ")
+            kind = kinds.get(first, "Purchase")
+            details = rest if first in kinds else desc
+            values = (day.strftime("%d.%m.%y"), _format_amount(amount) + " T", kind, details)
+            cells += [(x, y, v) for (x, _), v in zip(KASPI_COLUMNS, values)]
+            y -= 14
+        pages.append(cells)
+    return _build_pdf(pages)
+
+
+def _build_pdf(pages) -> bytes:
+    """PDF из страниц со списками (x, y, текст)"""
+    streams = []
+    for cells in pages:
+        ops = ["BT", "/F1 9 Tf"]
+        ops += [f"1 0 0 1 {x} {y} Tm ({text}) Tj" for x, y, text in cells]
+        ops.append("ET")
+        streams.append("\n".join(ops).encode("latin-1"))
+    return _assemble_pdf(streams)
+
+
+def cached(name: str, factory, *args) -> bytes:
+    """Генерирует файл один раз и кэширует на диске (1M строк XLSX — это минуты)"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, name)
+    if not os.path.exists(path):
+        data = factory(*args)
+        with open(path, "wb") as f:
+            f.write(data)
+        return data
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Нормализация дат и шаг by_date: прежний parse_dates (ISO8601, затем dd.mm.yyyy) против
+разбора по виду строки (transaction_batch.parse_dates), и размер
+by_date в ответе при period=day/week/month/auto.
+
+Использование:
+    python bench_dates.py                  # 1M строк
+    python bench_dates.py --rows 100000 --years 3
+
+Колонки дат:
+    dotted     — dd.mm.yyyy, несколько сотен разных дат (типичная выписка);
+    timestamps — dd.mm.yyyy HH:MM:SS, почти все значения разные;
+    mixed      — по трети dd.mm.yyyy, yyyy-mm-dd и dd/mm/yyyy (склеенные выписки разных банков).
+Для каждой печатается время, доля распознанных дат и сколько точек получилось бы
+в by_date по дням: раньше группировка шла по исходной строке.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_statement_memory import legacy_parse_dates
+
+
+def make_dates(n: int, years: int, seed: int = 42) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2020-01-01T00:00:00", "s")
+    seconds = rng.integers(0, years * 365 * 86400, n)
+    return pd.Series(start + seconds.astype("timedelta64[s]"))
+
+
+def columns(n: int, years: int) -> dict:
+    dates = make_dates(n, years)
+    third = n // 3
+    mixed = pd.concat([
+        dates[:third].dt.strftime("%d.%m.%Y"),
+        dates[third:2 * third].dt.strftime("%Y-%m-%d"),
+        dates[2 * third:].dt.strftime("%d/%m/%Y"),
+    ])
+    return {
+        "dotted": dates.dt.strftime("%d.%m.%Y").astype(object),
+        "timestamps": dates.dt.strftime("%d.%m.%Y %H:%M:%S").astype(object),
+        "mixed": mixed.astype(object).reset_index(drop=True),
+    }
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def bench_parsing(n: int, years: int):
+    from transaction_batch import _dates
+
+    print(f"{'column':<12}{'path':<8}{'time s':>8}{'parsed':>9}{'by_date points':>16}")
+    for name, values in columns(n, years).items():
+        legacy, legacy_s = timed(lambda: legacy_parse_dates(values))
+        new, new_s = timed(lambda: _dates(values.to_numpy()))
+        new = pd.Series(new)
+        rows = [
+            ("legacy", legacy_s, legacy.notna().mean(), values.nunique()),
+            ("new", new_s, new.notna().mean(), new.dt.normalize().nunique()),
+        ]
+        for path, seconds, parsed, points in rows:
+            print(f"{name:<12}{path:<8}{seconds:>8.2f}{parsed:>9.1%}{points:>16,}")
+
+
+def bench_payload(n: int, years: int):
+    from analysis import aggregate
+    from transaction_batch import TransactionBatch
+
+    rng = np.random.default_rng(7)
+    batch = TransactionBatch.from_columns(
+        make_dates(n, years).dt.strftime("%d.%m.%Y").tolist(),
+        rng.choice(["Продукты", "Транспорт", "Кафе"], n).tolist(),
+        rng.uniform(-250000, 0, n).round(2).tolist(),
+    )
+    print(f"\nby_date за {years} лет, {n:,} операций")
+    print(f"{'period':<8}{'resolved':<10}{'points':>8}{'JSON KB':>9}{'aggregate ms':>14}")
+    for period in ("day", "week", "month", "auto"):
+        stats, seconds = timed(lambda: aggregate(batch, period))
+        size = len(json.dumps(stats["by_date"]).encode()) / 1024
+        print(f"{period:<8}{stats['period']:<10}{len(stats['by_date']):>8}{size:>9.1f}{seconds * 1000:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--years", type=int, default=10, help="период, который покрывают даты")
+    args = parser.parse_args()
+
+    bench_parsing(args.rows, args.years)
+    bench_payload(args.rows, args.years)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка транзакций (export.iter_export) против чтения всего
+результата в pandas и DataFrame.to_parquet.
+
+Использование:
+    python bench_export.py                  # 100k и 1M строк
+    python bench_export.py --rows 5000000   # свой размер (можно несколько раз)
+
+Данные: отдельная SQLite база, заполненная bulk_seed (10 пользователей).
+Печатает строки/с, размер файла и пиковую память: Python-объекты по
+tracemalloc плюс буферы Arrow (max_memory пула pyarrow). Память меряется
+отдельным прогоном, чтобы трассировка не искажала время.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_export_"), "export.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+import bulk_seed  # noqa: E402
+import database_sqlite  # noqa: E402
+import export  # noqa: E402
+
+USERS = 10
+FILES = 10
+
+
+def fill(rows: int):
+    database_sqlite.engine.echo = False
+    SQLModel.metadata.drop_all(database_sqlite.engine)
+    SQLModel.metadata.create_all(database_sqlite.engine)
+    # bulk_seed переключает journal_mode — соединений приложения в этот момент быть не должно
+    database_sqlite.engine.dispose()
+    bulk_seed.bulk_seed(USERS, FILES, rows // (USERS * FILES))
+
+
+def run_streaming(fmt: str) -> int:
+    return sum(len(chunk) for chunk in export.iter_export(fmt))
+
+
+def run_pandas(fmt: str) -> int:
+    with database_sqlite.engine.connect() as conn:
+        df = pd.read_sql(f'SELECT {", ".join(export.COLUMNS)} FROM "transaction" ORDER BY id', conn)
+    if fmt == "parquet":
+        return len(df.to_parquet(compression=export.PARQUET_COMPRESSION))
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def measure(func, fmt: str):
+    started = time.perf_counter()
+    size = func(fmt)
+    elapsed = time.perf_counter() - started
+
+    pool = pa.default_memory_pool()
+    pool.release_unused()
+    arrow_before = pool.max_memory() or 0
+    tracemalloc.start()
+    func(fmt)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # max_memory пула не сбрасывается: берем прирост относительно прошлых прогонов
+    arrow_peak = max((pool.max_memory() or 0) - arrow_before, 0)
+    return elapsed, size, peak + arrow_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="строк в таблице (можно несколько раз)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'format':<8}{'method':<11}{'rows/s':>12}{'MB file':>9}{'peak MB':>9}")
+    for rows in args.rows or [100_000, 1_000_000]:
+        fill(rows)
+        for fmt in export.FORMATS:
+            for name, func in (("stream", run_streaming), ("pandas", run_pandas)):
+                elapsed, size, peak = measure(func, fmt)
+                print(f"{rows:>10,}  {fmt:<8}{name:<11}{rows / elapsed:>12,.0f}"
+                      f"{size / 1e6:>9.1f}{peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки горячих путей: парсинг PDF/CSV/XLSX, определение колонок,
+агрегация/сериализация и /admin/reports.
+
+Использование:
+    python bench_hot_paths.py                  # быстрые размеры, сравнение с baseline
+    python bench_hot_paths.py --full           # + 1M строк и 500 страниц PDF
+    python bench_hot_paths.py --save-baseline  # перезаписать bench_baseline.json
+    python bench_hot_paths.py --only pdf       # только кейсы, содержащие "pdf"
+
+Время — минимум из нескольких прогонов. Абсолютные миллисекунды зависят от
+машины и от того, как ее скорость плавает во время прогона (виртуалки, частота
+CPU), поэтому каждый прогон кейса чередуется с прогоном эталонной нагрузки
+(reference: интерпретатор и NumPy), а baseline хранит медиану отношений —
+время кейса в единицах эталона. Ожидаемое время = baseline * эталон сейчас. Кейс считается
+регрессией, если он медленнее ожидаемого больше чем на --threshold (по
+умолчанию 25%) и при повторном замере тоже; тогда скрипт завершается с кодом 1.
+Baseline обновляется (--save-baseline) в том же коммите, что меняет замеряемый код.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+
+import bench_data
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+QUICK_ROWS = [1_000, 100_000]
+FULL_ROWS = [1_000, 100_000, 1_000_000]
+QUICK_PAGES = [10]
+FULL_PAGES = [10, 500]
+
+
+def measure(func, repeat: int) -> float:
+    """Минимальное время из repeat прогонов (секунды)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _repeat_for(size: int) -> int:
+    return 5 if size <= 10_000 else 2 if size <= 100_000 else 1
+
+
+def make_reference():
+    """Эталонная нагрузка (~25 ms): строки в цикле Python и сортировка NumPy"""
+    words = [f"Pokupka shop {i}" for i in range(40_000)]
+    values = np.random.default_rng(0).random(200_000)
+
+    def work():
+        [w.lower().split() for w in words]
+        np.sort(values)
+    return work
+
+
+def measure_relative(func, reference, repeat: int) -> tuple:
+    """(время кейса, время в единицах эталона): прогоны кейса чередуются с эталоном,
+    отношение соседних прогонов не зависит от того, как плавает скорость машины"""
+    times, ratios = [], []
+    for _ in range(max(repeat, 3)):
+        reference_time = measure(reference, 3)
+        elapsed = measure(func, 1)
+        times.append(elapsed)
+        ratios.append(elapsed / reference_time)
+    return min(times), statistics.median(ratios)
+
+
+def build_cases(full: bool, only: str = ""):
+    """Список (имя, подготовка, число повторов); подготовка возвращает замеряемую функцию.
+    Данные готовятся только для кейсов, подходящих под only"""
+    from analysis import (
+        load_dataframe, load_statement, normalize_columns, aggregate, parse_pdf, classify_description
+    )
+    from transaction_batch import TransactionBatch
+
+    cases = []
+    rows = FULL_ROWS if full else QUICK_ROWS
+    pages = FULL_PAGES if full else QUICK_PAGES
+
+    def add(name: str, repeat: int, setup):
+        if only in name:
+            cases.append((name, setup, repeat))
+
+    def pdf_data(n_pages):
+        return bench_data.cached(f"statement_{n_pages}p.pdf", bench_data.make_pdf, n_pages)
+
+    def kaspi_data(n_pages):
+        return bench_data.cached(f"kaspi_{n_pages}p.pdf", bench_data.make_kaspi_pdf, n_pages)
+
+    def csv_data(n):
+        return bench_data.cached(f"statement_{n}.csv", bench_data.make_csv, n)
+
+    def xlsx_data(n):
+        return bench_data.cached(f"statement_{n}.xlsx", bench_data.make_xlsx, n)
+
+    def normalized(n):
+        return normalize_columns(load_dataframe("s.csv", csv_data(n)))
+
+    for n_pages in pages:
+        repeat = 3 if n_pages <= 10 else 1
+        add(f"parse_pdf[{n_pages}p]", repeat,
+            lambda n_pages=n_pages: lambda pdf=pdf_data(n_pages): parse_pdf(BytesIO(pdf)))
+        add(f"parse_pdf_kaspi[{n_pages}p]", repeat,
+            lambda n_pages=n_pages: lambda pdf=kaspi_data(n_pages): parse_pdf(BytesIO(pdf)))
+
+    for n in rows:
+        add(f"classify_description[{n}]", _repeat_for(n),
+            lambda n=n: lambda d=[line.split(" ", 1)[1] for line in bench_data.statement_lines(n)]:
+                [classify_description(x) for x in d])
+        add(f"load_csv[{n}]", _repeat_for(n),
+            lambda n=n: lambda c=csv_data(n): load_dataframe("s.csv", c))
+        # Весь путь загрузки CSV: чтение, колонки, TransactionBatch (load_csv — только чтение)
+        add(f"load_statement_csv[{n}]", _repeat_for(n),
+            lambda n=n: lambda c=csv_data(n): load_statement("s.csv", c))
+        add(f"load_xlsx[{n}]", 1 if n >= 100_000 else _repeat_for(n),
+            lambda n=n: lambda x=xlsx_data(n): load_dataframe("s.xlsx", x))
+        add(f"normalize_columns[{n}]", _repeat_for(n),
+            lambda n=n: lambda f=load_dataframe("s.csv", csv_data(n)): normalize_columns(f.copy()))
+        add(f"transaction_batch[{n}]", _repeat_for(n),
+            lambda n=n: lambda f=normalized(n): TransactionBatch.from_frame(f))
+        add(f"aggregate_serialize[{n}]", _repeat_for(n),
+            lambda n=n: lambda b=TransactionBatch.from_frame(normalized(n)):
+                json.dumps(aggregate(b), ensure_ascii=False))
+
+    users = [100, 1_000] if full else [100]
+    for n_users in users:
+        add(f"admin_reports[{n_users}u]", 3,
+            lambda n_users=n_users: _admin_reports_case(n_users, files_per_user=10))
+    return cases
+
+
+def _admin_reports_case(n_users: int, files_per_user: int):
+    """Готовит отдельную SQLite базу и возвращает замер get_admin_reports"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+
+    from sqlmodel import SQLModel, Session, create_engine
+    from models import User, UploadedFile, CategoryStat, UserRole
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        admin = User(username="admin", email="admin@bench", password_hash="x", role=UserRole.ADMIN)
+        session.add(admin)
+        for i in range(n_users):
+            session.add(User(username=f"user{i}", email=f"user{i}@bench", password_hash="x"))
+        session.commit()
+        for user_id in range(2, n_users + 2):
+            for j in range(files_per_user):
+                uploaded = UploadedFile(
+                    user_id=user_id, filename=f"statement_{j}.pdf",
+                    ai_analysis="Совет " * 200,
+                    total_amount=125000.0, transactions_count=45,
+                )
+                session.add(uploaded)
+                session.flush()
+                session.add_all(
+                    CategoryStat(file_id=uploaded.id, user_id=user_id, category=c, amount=1000.0)
+                    for c in bench_data.CATEGORIES
+                )
+        session.commit()
+        session.refresh(admin)
+
+    from fastapi import Request, Response
+    from main import get_admin_reports
+
+    def run():
+        with Session(engine) as session:
+            asyncio.run(get_admin_reports(request=Request({"type": "http", "headers": []}), response=Response(),
+                                          fields=None, view=None, current_user=admin, session=session))
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="большие размеры (1M строк, 500 страниц)")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление (доля)")
+    parser.add_argument("--only", default="", help="фильтр по подстроке имени кейса")
+    args = parser.parse_args()
+
+    # {"cases": {кейс: время в единицах эталонной нагрузки calibrate}}
+    baseline = {"cases": {}}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    reference = make_reference()
+    results = {}
+    regressions = []
+    print(f"{'case':<34}{'time, ms':>12}{'expected':>12}{'delta':>9}")
+    for name, setup, repeat in build_cases(args.full, args.only):
+        func = setup()
+        elapsed, units = measure_relative(func, reference, repeat)
+        base = baseline["cases"].get(name)
+        if base and units / base - 1 > args.threshold:
+            # Одиночный выброс (фоновая нагрузка) не считается: замеряем еще раз
+            elapsed, units = min((elapsed, units), measure_relative(func, reference, repeat), key=lambda m: m[1])
+        if base:
+            delta = units / base - 1
+            flag = "  REGRESSION" if delta > args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<34}{elapsed * 1000:>12.2f}{elapsed / (1 + delta) * 1000:>12.2f}{delta:>+9.0%}{flag}")
+        else:
+            print(f"{name:<34}{elapsed * 1000:>12.2f}{'—':>12}")
+        results[name] = round(units, 5)
+
+    if args.save_baseline:
+        baseline["cases"] = dict(sorted({**baseline["cases"], **results}.items()))
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline сохранен: {BASELINE_FILE}")
+
+    if regressions:
+        print(f"\n❌ Регрессии: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
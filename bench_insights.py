@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Поиск регулярных платежей и необычных операций (insights.py) на больших выписках.
+
+Использование:
+    python bench_insights.py                       # 100k и 1M строк
+    python bench_insights.py --rows 1000000 --subscriptions 50
+
+В синтетическую выписку (2 года, ~2000 продавцов, случайные суммы) подмешиваются
+подписки — одна сумма раз в неделю/месяц/квартал со сдвигом ±1–2 дня и
+пропусками — и крупные выбросы. Печатается время insights.recurring_payments и
+insights.anomalies, сколько подмешанного найдено и сколько найдено лишнего.
+Для сравнения — тот же поиск подписок циклом Python по строкам (словарь
+продавец/сумма -> даты), как его написали бы без сортировки массивов.
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import insights
+from transaction_batch import TransactionBatch, labels
+
+CATEGORIES = ["Продукты", "Транспорт", "Развлечения", "Услуги", "Одежда", "Кафе"]
+START = np.datetime64("2023-01-01")
+DAYS = 730
+
+
+def make_batch(n: int, subscriptions: int, outliers: int, seed: int = 42):
+    """(TransactionBatch, подмешанные подписки {продавец: период}, подмешанные выбросы)"""
+    rng = np.random.default_rng(seed)
+    merchants = [f"Shop {i:04d}" for i in range(2000)]
+    merchant = rng.integers(0, len(merchants), n)
+    category = merchant % len(CATEGORIES)
+    amount = -np.round(rng.lognormal(8, 0.6, n), 2)
+    day = rng.integers(0, DAYS, n)
+
+    expected = {}
+    extra = []
+    for i in range(subscriptions):
+        name = f"Subscription {i:03d}"
+        period = ("week", "month", "quarter")[i % 3]
+        step = insights.PERIODS[period][0]
+        days = np.arange(int(rng.integers(0, step)), DAYS, step)
+        days = days + rng.integers(-1, 2, len(days))                  # списание сдвигается на день
+        days = np.delete(days, rng.integers(0, len(days)))            # и один раз пропущено
+        price = -float(rng.choice([990, 2490, 4990, 15000]))
+        extra.append((name, i % len(CATEGORIES), price, days.clip(0, DAYS - 1)))
+        expected[name] = period
+
+    names = merchants + [name for name, *_ in extra]
+    codes = np.concatenate([merchant] + [np.full(len(d), len(merchants) + j) for j, (*_, d) in enumerate(extra)])
+    cats = np.concatenate([category] + [np.full(len(d), c) for _, c, _, d in extra])
+    amounts = np.concatenate([amount] + [np.full(len(d), p) for _, _, p, d in extra])
+    days = np.concatenate([day] + [d for *_, d in extra])
+
+    spikes = rng.choice(n, outliers, replace=False)
+    amounts[spikes] = amounts[spikes] * 40
+
+    batch = TransactionBatch(
+        START + days.astype("timedelta64[D]"),
+        pd.Categorical.from_codes(cats.astype(np.int8), categories=CATEGORIES),
+        amounts,
+        pd.Categorical.from_codes(codes.astype(np.int16), categories=names),
+    )
+    return batch, expected, set(spikes.tolist())
+
+
+def python_recurring(batch: TransactionBatch) -> list:
+    """Поиск подписок циклом по строкам — для сравнения"""
+    series = defaultdict(set)
+    for merchant, amount, day in zip(labels(batch.description), batch.amount.tolist(),
+                                     batch.date.astype("datetime64[D]").astype(np.int64).tolist()):
+        series[(merchant, round(amount, 2))].add(day)
+    found = []
+    for (merchant, amount), days in series.items():
+        if len(days) < insights.RECURRING_MIN_COUNT:
+            continue
+        days = sorted(days)
+        gaps = [b - a for a, b in zip(days, days[1:])]
+        median = statistics.median(gaps)
+        for name, (step, tolerance) in insights.PERIODS.items():
+            if abs(median - step) <= tolerance:
+                regular = sum(abs(g - step) <= tolerance for g in gaps) / len(gaps)
+                if regular >= insights.RECURRING_MIN_REGULARITY:
+                    found.append((merchant, amount, name))
+                break
+    return found
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="строк в выписке (можно несколько раз)")
+    parser.add_argument("--subscriptions", type=int, default=30)
+    parser.add_argument("--outliers", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'recurring s':>13}{'python s':>10}{'found':>8}{'extra':>7}"
+          f"{'anomalies s':>13}{'found':>8}{'flagged':>9}")
+    for n in args.rows or [100_000, 1_000_000]:
+        batch, expected, spikes = make_batch(n, args.subscriptions, args.outliers)
+        (recurring, _), recurring_s = timed(lambda: insights.recurring_payments(batch, top=len(batch)))
+        _, python_s = timed(lambda: python_recurring(batch))
+        (unusual, flagged), anomalies_s = timed(lambda: insights.anomalies(batch, top=len(batch)))
+
+        hits = sum(expected.get(item["merchant"]) == item["period"] for item in recurring)
+        extra = sum(item["merchant"] not in expected for item in recurring)
+        amounts = {float(a) for a in batch.amount[list(spikes)]}
+        spike_hits = sum(item["amount"] in amounts for item in unusual)
+        print(f"{len(batch):>10,}{recurring_s:>13.2f}{python_s:>10.2f}{f'{hits}/{len(expected)}':>8}{extra:>7}"
+              f"{anomalies_s:>13.2f}{f'{spike_hits}/{len(spikes)}':>8}{flagged:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Размер ответа и латентность /my-files и /admin/reports: полный ответ,
+view=list, fields=..., без сжатия / gzip / brotli.
+
+Использование:
+    python bench_payload.py                    # истории 20 и 200 файлов
+    python bench_payload.py --files 500 --runs 20
+
+Данные: отдельная SQLite база, у пользователя N файлов с анализом ИИ
+(~1.5 КБ случайных фраз) и 8 категориями; для /admin/reports — 20 таких пользователей.
+Размер — байты, пришедшие по сети (до распаковки); латентность — медиана
+через TestClient, включая сжатие.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_payload_"), "payload.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import bench_data  # noqa: E402
+import database_sqlite  # noqa: E402
+import main  # noqa: E402
+from models import CategoryStat, UploadedFile, User, UserRole  # noqa: E402
+
+# Анализ ИИ собирается из случайных фраз с числами, чтобы сжатие было реалистичным
+SENTENCES = [
+    "Перерасход в категории '{c}' составил {p}% относительно прошлого месяца.",
+    "Рекомендуем установить лимит {n} тенге на категорию '{c}'.",
+    "Расходы на '{c}' выросли на {n} тенге, в основном за счет крупных покупок.",
+    "Можно сэкономить до {n} тенге в месяц, если сократить траты на '{c}'.",
+    "Отличный результат: траты на '{c}' снизились на {p}%.",
+    "Проверьте подписки: {p} списаний по {n} тенге повторяются каждый месяц.",
+    "Стоит перенести часть покупок '{c}' на дни скидок, это даст около {n} тенге.",
+]
+
+
+def analysis_text(rng: random.Random) -> str:
+    return " ".join(
+        rng.choice(SENTENCES).format(c=rng.choice(bench_data.CATEGORIES), p=rng.randint(2, 60),
+                                     n=rng.randint(1_000, 90_000))
+        for _ in range(14)
+    )
+
+
+MODES = [
+    ("full", "", "identity"),
+    ("full", "", "gzip"),
+    ("full", "", "br"),
+    ("view=list", "view=list", "identity"),
+    ("view=list", "view=list", "gzip"),
+    ("fields=id,filename,total_amount", "fields=id,filename,total_amount", "identity"),
+]
+
+
+def fill(users: int, files: int):
+    engine = database_sqlite.engine
+    engine.echo = False
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(42)
+    with Session(engine) as session:
+        session.add(User(username="admin", email="admin@bench", password_hash="admin_hash", role=UserRole.ADMIN))
+        for i in range(users):
+            session.add(User(username=f"user{i}", email=f"user{i}@bench", password_hash="user_hash"))
+        session.commit()
+        for user_id in range(2, users + 2):
+            for j in range(files):
+                uploaded = UploadedFile(user_id=user_id, filename=f"statement_{j}.pdf", ai_analysis=analysis_text(rng),
+                                        total_amount=125000.0, transactions_count=45)
+                session.add(uploaded)
+                session.flush()
+                session.add_all(
+                    CategoryStat(file_id=uploaded.id, user_id=user_id, category=c, amount=1000.0 + j)
+                    for c in bench_data.CATEGORIES[:8]
+                )
+        session.commit()
+
+
+def measure(client, url: str, headers: dict, runs: int):
+    times, size = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        r = client.get(url, headers=headers)
+        times.append(time.perf_counter() - started)
+        r.raise_for_status()
+        size = r.num_bytes_downloaded
+        encoding = r.headers.get("content-encoding", "identity")
+    return size, statistics.median(times), encoding
+
+
+def login(client, username: str, password: str) -> dict:
+    token = client.post("/login", json={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, action="append", help="файлов в истории (можно несколько раз)")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<14}{'files':>6}  {'mode':<34}{'enc':<12}{'bytes':>10}{'ms':>9}")
+    for files in args.files or [20, 200]:
+        fill(users=20, files=files)
+        with TestClient(main.app) as client:
+            endpoints = [("/my-files", login(client, "user0", "user")),
+                         ("/admin/reports", login(client, "admin", "admin"))]
+            for path, auth in endpoints:
+                for label, query, encoding in MODES:
+                    url = f"{path}?{query}" if query else path
+                    size, latency, used = measure(client, url, dict(auth, **{"Accept-Encoding": encoding}), args.runs)
+                    if used != encoding:
+                        used = f"{encoding}: нет"  # brotli не установлен
+                    print(f"{path:<14}{files:>6}  {label:<34}{used:<12}{size:>10,}{latency * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main_bench()
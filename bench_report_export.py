@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+/admin/reports (весь список в памяти) против потоковой /admin/reports/export
+(NDJSON и CSV): время до первого байта, полное время, размер и пиковая память сервера.
+
+Использование:
+    python bench_report_export.py                      # 1k и 20k пользователей
+    python bench_report_export.py --users 100000       # свой размер (можно несколько раз)
+
+Данные: отдельная SQLite база (bulk_seed, 3 файла и по 5 категорий на пользователя)
+и демо-админ. Для каждого замера поднимается свой uvicorn (1 воркер), чтобы
+пиковый RSS процесса (VmHWM) относился только к этому запросу.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_startup import free_port, wait_until_up
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CASES = [
+    ("/admin/reports", ""),
+    ("/admin/reports/export", "format=ndjson"),
+    ("/admin/reports/export", "format=csv"),
+]
+
+
+def fill(env: dict, users: int):
+    script = (
+        "import bulk_seed, simple_seed; from database_sqlite import engine; "
+        "bulk_seed.create_db_and_tables(); simple_seed.create_simple_seed_data(); engine.dispose(); "
+        f"bulk_seed.bulk_seed({users}, 3, 0)"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=HERE, env=env, check=True, capture_output=True)
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(env: dict, path: str, query: str):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(base + "/", timeout=60)
+        with httpx.Client(base_url=base, timeout=600) as client:
+            token = client.post("/login", json={"username": "admin", "password": "admin123"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+            rss_before = peak_rss_mb(server.pid)
+            started = time.perf_counter()
+            first_byte, size = None, 0
+            with client.stream("GET", f"{path}?{query}", headers=headers) as response:
+                response.raise_for_status()
+                for chunk in response.iter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    size += len(chunk)
+            total = time.perf_counter() - started
+            return first_byte or total, total, size, peak_rss_mb(server.pid) - rss_before
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, action="append", help="пользователей в базе (можно несколько раз)")
+    args = parser.parse_args()
+
+    print(f"{'users':>8}  {'endpoint':<36}{'TTFB ms':>9}{'total s':>9}{'MB':>8}{'+RSS MB':>9}")
+    for users in args.users or [1_000, 20_000]:
+        tmp = tempfile.mkdtemp(prefix="bench_report_export_")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'reports.db')}", RATE_LIMITS="")
+        fill(env, users)
+        for path, query in CASES:
+            ttfb, total, size, rss = measure(env, path, query)
+            label = f"{path}?{query}" if query else path
+            print(f"{users:>8,}  {label:<36}{ttfb * 1000:>9.0f}{total:>9.2f}{size / 1e6:>8.1f}{rss:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
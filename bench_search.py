@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Полнотекстовый поиск (search.py, FTS5) против LIKE '%...%' по той же базе.
+
+Использование:
+    python bench_search.py                   # 1M транзакций, 20k файлов
+    python bench_search.py --rows 3000000    # свой размер (можно несколько раз)
+
+Данные: отдельная SQLite база, заполненная bulk_seed (1000 пользователей по 20
+файлов). Сначала база заполняется без индекса поиска, затем с ним — видно, во
+сколько обходится индексирование при вставке (search.index_transactions).
+Запросы: частое слово (каждое ~11-е описание), оно же как начало слова (kasp*),
+редкое (десяток строк), текст анализов; первая и далекая страница по 20 строк. Печатается медиана времени запроса.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "search.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import bulk_seed  # noqa: E402
+import database_sqlite  # noqa: E402
+import search  # noqa: E402
+
+USERS = 1000
+FILES = 20
+PAGE = 20
+REPEAT = 20
+
+QUERIES = [
+    ("common", "transactions", "kaspi"),
+    ("prefix", "transactions", "kasp*"),
+    ("rare", "transactions", "airbnb"),
+    ("analysis", "files", "медицина"),
+]
+
+LIKE_SQL = {
+    "transactions": """
+        SELECT t.id, t.file_id, t.user_id, u.username, t.operation_date, t.description, t.category, t.amount
+        FROM "transaction" t JOIN "user" u ON u.id = t.user_id
+        WHERE t.description LIKE :pattern
+        ORDER BY t.id DESC LIMIT :limit OFFSET :offset
+    """,
+    "files": """
+        SELECT f.id, f.user_id, u.username, f.filename, f.upload_date, f.batch_id
+        FROM uploadedfile f JOIN "user" u ON u.id = f.user_id
+        WHERE f.filename LIKE :pattern OR f.ai_analysis LIKE :pattern
+        ORDER BY f.id DESC LIMIT :limit OFFSET :offset
+    """,
+}
+
+
+def fill(rows: int, indexed: bool) -> float:
+    """Заполняет базу заново; возвращает время bulk_seed"""
+    engine = database_sqlite.engine
+    engine.echo = False
+    with engine.begin() as conn:
+        for fts in search.FTS_TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+    SQLModel.metadata.drop_all(engine)
+    if indexed:
+        database_sqlite.create_db_and_tables()
+    else:
+        SQLModel.metadata.create_all(engine)
+    # bulk_seed переключает journal_mode — соединений приложения в этот момент быть не должно
+    engine.dispose()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bulk_seed.bulk_seed(USERS, FILES, max(rows // (USERS * FILES), 1))
+    elapsed = time.perf_counter() - started
+    with engine.begin() as conn:
+        # Редкое слово: десяток строк с новыми id
+        last_id = conn.execute(text('SELECT max(id) FROM "transaction"')).scalar()
+        conn.execute(text(
+            'INSERT INTO "transaction" (file_id, user_id, operation_date, description, category, amount) '
+            "SELECT file_id, user_id, operation_date, 'Airbnb booking ' || id, category, amount "
+            'FROM "transaction" WHERE id % 100003 = 0'
+        ))
+        if indexed:
+            conn.execute(text(
+                'INSERT INTO transaction_fts(rowid, description) SELECT id, description FROM "transaction" '
+                "WHERE id > :last_id"
+            ), {"last_id": last_id})
+    return elapsed
+
+
+def median_ms(func) -> float:
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def run_fts(session, scope: str, query: str, offset: int) -> list:
+    find = search.search_files if scope == "files" else search.search_transactions
+    return find(session.connection(), search.query_terms(query), PAGE, offset)
+
+
+def run_like(session, scope: str, query: str, offset: int) -> list:
+    params = {"pattern": f"%{query.rstrip('*')}%", "limit": PAGE, "offset": offset}
+    return session.execute(text(LIKE_SQL[scope]), params).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="транзакций в базе (можно несколько раз)")
+    args = parser.parse_args()
+
+    for rows in args.rows or [1_000_000]:
+        plain_s = fill(rows, indexed=False)
+        indexed_s = fill(rows, indexed=True)
+        print(f"\n{rows:,} транзакций, {USERS * FILES:,} файлов: bulk_seed без индекса {plain_s:.1f} с, "
+              f"с FTS5 {indexed_s:.1f} с, база {os.path.getsize(DB_PATH) / 2**20:.0f} MB")
+        print(f"{'query':<10}{'scope':<14}{'offset':>7}{'FTS ms':>9}{'LIKE ms':>9}{'rows':>6}")
+        with Session(database_sqlite.engine) as session:
+            for label, scope, query in QUERIES:
+                for offset in (0, 1000):
+                    found = run_fts(session, scope, query, offset)
+                    fts_ms = median_ms(lambda: run_fts(session, scope, query, offset))
+                    like_ms = median_ms(lambda: run_like(session, scope, query, offset))
+                    print(f"{label:<10}{scope:<14}{offset:>7}{fts_ms:>9.2f}{like_ms:>9.2f}{len(found):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного старта: импорт main.py и латентность первых запросов.
+
+Использование:
+    python bench_startup.py            # 5 прогонов импорта + запуск uvicorn
+    python bench_startup.py --runs 10
+
+Измеряет в свежем интерпретаторе:
+- import main (по умолчанию и с PRELOAD_PARSERS=1);
+- время от запуска uvicorn до первого ответа GET /;
+- латентность первой и второй загрузки CSV (первая включает ленивый импорт
+  pandas/pdfplumber). Ollama подменяется fake_ollama.py без задержек.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+CSV = "date,category,amount\n2024-01-01,Продукты,5000\n2024-01-02,Транспорт,2000\n"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(runs: int, env: dict) -> list:
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=HERE, env=env,
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def wait_until_up(url: str, timeout: float = 30) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} не ответил за {timeout} с")
+
+
+def measure_first_requests(env: dict) -> dict:
+    """Запускает fake Ollama и uvicorn, замеряет первый ответ и первые загрузки"""
+    llm_port, app_port = free_port(), free_port()
+    env = dict(env, OLLAMA_API=f"http://127.0.0.1:{llm_port}/api/generate")
+    fake = subprocess.Popen(
+        [sys.executable, "fake_ollama.py", "--port", str(llm_port),
+         "--latency-ms", "0", "--tokens-per-sec", "0", "--tokens", "5"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{llm_port}/api/tags")
+        started = time.perf_counter()
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{app_port}"
+            wait_until_up(base + "/")
+            result = {"time_to_first_response": time.perf_counter() - started}
+
+            with httpx.Client(base_url=base, timeout=60) as client:
+                client.post("/register", json={"username": "bench", "email": "b@b.kz", "password": "bench"})
+                token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+                for key in ("first_upload", "second_upload"):
+                    t = time.perf_counter()
+                    r = client.post("/analyze-expenses", headers=headers,
+                                    files={"file": ("s.csv", CSV.encode(), "text/csv")})
+                    r.raise_for_status()
+                    result[key] = time.perf_counter() - t
+            return result
+        finally:
+            app.terminate()
+            app.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+
+    for label, extra in (("lazy", {}), ("PRELOAD_PARSERS=1", {"PRELOAD_PARSERS": "1"})):
+        times = measure_import(args.runs, dict(env, **extra))
+        print(f"import main [{label}]: median {statistics.median(times) * 1000:.0f} ms, "
+              f"min {min(times) * 1000:.0f} ms")
+
+    result = measure_first_requests(env)
+    for key, value in result.items():
+        print(f"{key}: {value * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Память разобранной выписки: прежний путь (DataFrame с object-колонками, список
+словарей для Transaction) против TransactionBatch (transaction_batch.py).
+
+Использование:
+    python bench_statement_memory.py                     # CSV 100k и 1M строк, XLSX 100k
+    python bench_statement_memory.py --rows 1000000 --formats csv,xlsx
+
+Каждый замер — в отдельном процессе: файл читается, агрегируется (aggregate,
+period_delta) и превращается в строки Transaction, как при загрузке. Печатается
+размер удерживаемого представления (DataFrame deep memory_usage / batch.nbytes),
+прирост пикового RSS процесса (VmHWM) и время.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import bench_data
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FACTORIES = {"csv": bench_data.make_csv, "xlsx": bench_data.make_xlsx}
+
+
+def rss_mb(field: str) -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# === Прежний путь (до TransactionBatch) ===
+def legacy_parse_dates(values):
+    """Разбор дат до TransactionBatch: ISO8601, затем dd.mm.yyyy / dd.mm.yy"""
+    import pandas as pd
+
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    for fmt in ("%d.%m.%Y", "%d.%m.%y"):
+        missing = parsed.isna() & values.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing].astype(str), errors="coerce", format=fmt)
+    return parsed
+
+
+def legacy_pipeline(filename: str, content: bytes):
+    from io import BytesIO
+
+    import pandas as pd
+
+    from analysis import normalize_columns, read_xlsx
+
+    df = pd.read_csv(BytesIO(content)) if filename.endswith(".csv") else read_xlsx(content)
+    df = normalize_columns(df)
+    held = df.memory_usage(deep=True).sum()
+
+    # aggregate
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
+    clean = df.dropna(subset=["amount"])
+    by_category = clean.groupby("category")["amount"].sum()
+    by_date = clean.groupby("date")["amount"].sum() if "date" in clean.columns else None
+    transactions = clean.head(100).to_dict(orient="records")
+
+    # period_delta
+    frame = pd.DataFrame({"category": df["category"], "amount": df["amount"]})
+    frame["month"] = legacy_parse_dates(df["date"]).dt.strftime("%Y-%m")
+    frame = frame.dropna(subset=["amount", "category"])
+    monthly = frame.groupby(["month", "category"])["amount"].sum()
+
+    # transaction_rows
+    frame = pd.DataFrame({"category": df["category"].fillna("Не указано").astype(str), "amount": df["amount"]})
+    dates = legacy_parse_dates(df["date"])
+    frame["operation_date"] = dates.dt.date.astype(object).where(dates.notna(), None)
+    frame["description"] = None
+    columns = list(frame.columns)
+    rows = [dict(zip(columns, values)) for values in zip(*(frame[c].tolist() for c in columns))]
+    return held, (by_category, by_date, transactions, monthly, len(rows))
+
+
+def batch_pipeline(filename: str, content: bytes):
+    import analysis
+
+    batch = analysis.load_statement(filename, content)
+    held = batch.nbytes
+    stats = analysis.aggregate(batch)
+    delta = analysis.period_delta(batch)
+    rows = sum(len(chunk) for chunk in analysis.iter_transaction_rows(batch))
+    return held, (stats, delta, rows)
+
+
+def child(path: str, filename: str, data_file: str):
+    with open(data_file, "rb") as f:
+        content = f.read()
+    import analysis  # noqa: F401 — импорт pandas/pdfplumber не входит в замер
+
+    base = rss_mb("VmRSS")
+    started = time.perf_counter()
+    held, _ = (legacy_pipeline if path == "legacy" else batch_pipeline)(filename, content)
+    print(json.dumps({
+        "held_mb": held / 2**20,
+        "peak_mb": rss_mb("VmHWM") - base,
+        "seconds": time.perf_counter() - started,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="строк в выписке (можно несколько раз)")
+    parser.add_argument("--formats", default="", help="csv,xlsx (по умолчанию CSV 100k/1M и XLSX 100k)")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    if args.rows or args.formats:
+        formats = (args.formats or "csv").split(",")
+        cases = [(fmt, n) for fmt in formats for n in (args.rows or [100_000, 1_000_000])]
+    else:
+        cases = [("csv", 100_000), ("csv", 1_000_000), ("xlsx", 100_000)]
+
+    print(f"{'case':<16}{'path':<8}{'held MB':>9}{'+peak MB':>10}{'time s':>8}")
+    for fmt, n in cases:
+        bench_data.cached(f"statement_{n}.{fmt}", FACTORIES[fmt], n)
+        data_file = os.path.join(bench_data.CACHE_DIR, f"statement_{n}.{fmt}")
+        for path in ("legacy", "batch"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", path, f"s.{fmt}", data_file],
+                cwd=HERE, check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(f"{fmt + '[' + format(n, ',') + ']':<16}{path:<8}{r['held_mb']:>9.1f}{r['peak_mb']:>10.1f}"
+                  f"{r['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
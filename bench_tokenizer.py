@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк токенизатора строк выписки (analysis.tokenize_line).
+
+Использование:
+    python bench_tokenizer.py
+
+Здесь же прежняя реализация на регулярках (legacy_tokenize) и генератор
+случайных строк (random_line): tests/test_tokenize_line.py сравнивает на них
+tokenize_line с legacy_tokenize с фиксированным seed.
+
+Бенчмарк: обычные строки выписки и «злые» строки (длинные серии цифр и
+пробелов, точек, знаков) — время на строку для обеих реализаций.
+"""
+
+import argparse
+import random
+import re
+import time
+
+import bench_data
+from analysis import tokenize_line
+
+# === Прежняя реализация (из parse_pdf до выделения tokenize_line) ===
+legacy_date_re = re.compile(r"(\d{1,2}\.\d{1,2}\.\d{2,4})")
+legacy_amount_re = re.compile(
+    r"([+-]?\s?\d{1,3}(?:[\s\d]{0,}\d)?(?:[.,]\d{2})?)\s*(?:₸|KZT|т|тг|\$|₽)?"
+)
+
+
+def legacy_tokenize(line: str):
+    date_match = legacy_date_re.search(line)
+    amount_match = list(legacy_amount_re.finditer(line))
+    if not date_match or not amount_match:
+        return None
+
+    date = date_match.group(1)
+    date_end = date_match.end()
+
+    chosen_amount = None
+    chosen_amount_span = None
+    for m in amount_match:
+        if m.start() >= date_end - 1:
+            chosen_amount = m.group(1)
+            chosen_amount_span = (m.start(), m.end())
+            break
+    if not chosen_amount:
+        chosen_amount = amount_match[-1].group(1)
+        chosen_amount_span = (amount_match[-1].start(), amount_match[-1].end())
+
+    desc = line[date_end: chosen_amount_span[0]].strip()
+    if not desc:
+        desc = line[chosen_amount_span[1]:].strip()
+
+    amt_str = chosen_amount.replace(" ", "").replace(",", ".")
+    amt_str = re.sub(r"[^\d\-\+\.]", "", amt_str)
+    try:
+        amount = float(amt_str)
+    except ValueError:
+        return None
+    return date, amount, desc
+
+
+# === Генератор строк ===
+WORDS = ["Покупка", "Magnum", "перевод", "Kaspi", "ТОО", "снятие", "банкомат", "Ozon",
+         "№", "счет", "KZ12", "ИП", "-", "/", "(", ")", "*", "оплата", "Coffee"]
+SUFFIXES = ["", "", " ₸", "₸", " KZT", " т", " тг", " $", "$", " ₽"]
+SPACES = [" ", " ", "  ", " ", "\t"]
+
+
+def random_amount(rng: random.Random) -> str:
+    whole = str(rng.randint(0, 10 ** rng.randint(1, 9)))
+    if rng.random() < 0.6:
+        sep = rng.choice(SPACES)
+        groups = []
+        while whole:
+            groups.insert(0, whole[-3:])
+            whole = whole[:-3]
+        whole = sep.join(groups)
+    frac = rng.choice(["", f",{rng.randint(0, 99):02d}", f".{rng.randint(0, 99):02d}", f",{rng.randint(0, 9)}"])
+    sign = rng.choice(["", "", "-", "+", "- ", "+ "])
+    return sign + whole + frac + rng.choice(SUFFIXES)
+
+
+def random_date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 31):0{rng.choice([1, 2])}d}.{rng.randint(1, 12):02d}.{rng.choice(['24', '2024', '2023', '202'])}"
+
+
+def random_line(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        kind = rng.random()
+        if kind < 0.25:
+            parts.append(random_date(rng))
+        elif kind < 0.55:
+            parts.append(random_amount(rng))
+        elif kind < 0.9:
+            parts.append(rng.choice(WORDS))
+        else:
+            parts.append("".join(rng.choice("0123456789 .,+-₸") for _ in range(rng.randint(1, 12))))
+    return rng.choice(SPACES).join(parts).strip()
+
+
+def bench(lines, repeat: int = 3):
+    results = {}
+    for name, func in (("legacy", legacy_tokenize), ("tokenize_line", tokenize_line)):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for line in lines:
+                func(line)
+            best = min(best, time.perf_counter() - started)
+        results[name] = best / len(lines)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    cases = {
+        "statement lines": list(bench_data.statement_lines(50_000)),
+        "digits+spaces 10k": ["01.01.2024 " + "1 " * 5_000 + "x"] * 20,
+        "digits+double spaces 10k": ["01.01.2024 " + "12  " * 2_500 + "x"] * 20,
+        "dots 10k": ["01.01.2024 " + "1." * 5_000] * 20,
+        "signs+spaces 10k": ["01.01.2024 " + "- " * 5_000 + "1"] * 20,
+        "digit + 10k spaces": ["01.01.2024 1" + " " * 10_000 + "x"] * 20,
+    }
+    print(f"\n{'case':<28}{'legacy µs/line':>16}{'new µs/line':>14}")
+    for name, lines in cases.items():
+        r = bench(lines)
+        print(f"{name:<28}{r['legacy'] * 1e6:>16.2f}{r['tokenize_line'] * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
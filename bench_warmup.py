@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Первый /chat после старта и после простоя: без прогрева модели и с llm_lifecycle.
+
+Использование:
+    python bench_warmup.py                       # загрузка модели 3 с, keep_alive 5s, простой 8 с
+    python bench_warmup.py --load-ms 10000 --idle 20
+
+fake_ollama.py «загружает» модель --load-ms миллисекунд при первом запросе и
+после истечения keep_alive. Режимы:
+    cold   — LLM_PROBE_INTERVAL=0: модель загружается на первом запросе пользователя
+             и выгружается после простоя дольше keep_alive;
+    warm   — прогрев при старте и проверки раз в --probe-interval секунд, которые
+             продлевают keep_alive; запрос ждет готовности (/ready) вместо загрузки.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_startup import free_port, wait_until_up
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def chat_ms(client: httpx.Client, headers: dict) -> float:
+    started = time.perf_counter()
+    client.post("/chat", json={"message": "Как сэкономить?"}, headers=headers).raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(mode: str, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench_warmup_")
+    llm_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}",
+        RATE_LIMITS="",
+        OLLAMA_API=f"http://127.0.0.1:{llm_port}/api/generate",
+        OLLAMA_KEEP_ALIVE=args.keep_alive,
+        LLM_PROBE_INTERVAL=str(args.probe_interval if mode == "warm" else 0),
+    )
+    fake = subprocess.Popen(
+        [sys.executable, "fake_ollama.py", "--port", str(llm_port), "--latency-ms", "50", "--tokens-per-sec", "0",
+         "--tokens", "20", "--load-ms", str(args.load_ms)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_until_up(f"http://127.0.0.1:{llm_port}/api/tags")
+    started = time.perf_counter()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{app_port}"
+        result = {"up_s": wait_until_up(base + "/health", timeout=60)}
+        result["ready_s"] = wait_until_up(base + "/ready", timeout=60) + result["up_s"]
+        with httpx.Client(base_url=base, timeout=120) as client:
+            client.post("/register", json={"username": "bench", "email": "bench@bench.kz", "password": "bench"})
+            token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            result["first_ms"] = chat_ms(client, headers)
+            result["second_ms"] = chat_ms(client, headers)
+            time.sleep(args.idle)
+            result["after_idle_ms"] = chat_ms(client, headers)
+        result["total_s"] = time.perf_counter() - started
+        return result
+    finally:
+        for process in (app, fake):
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load-ms", type=float, default=3000)
+    parser.add_argument("--keep-alive", default="5s")
+    parser.add_argument("--idle", type=float, default=8, help="секунд простоя перед последним запросом")
+    parser.add_argument("--probe-interval", type=float, default=2)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'up s':>7}{'ready s':>9}{'1st ms':>9}{'2nd ms':>9}{'idle ms':>9}")
+    for mode in ("cold", "warm"):
+        r = run(mode, args)
+        print(f"{mode:<6}{r['up_s']:>7.2f}{r['ready_s']:>9.2f}{r['first_ms']:>9.0f}"
+              f"{r['second_ms']:>9.0f}{r['after_idle_ms']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
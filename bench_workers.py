@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Масштабирование пропускной способности от 1 до N воркеров uvicorn.
+
+Использование:
+    python bench_workers.py                              # 1, 2, 4 воркера, смесь запросов
+    python bench_workers.py --workers 1,2,4,8 --concurrency 32 --duration 20
+    python bench_workers.py --scenario analyze           # только загрузки CSV (упор в CPU)
+
+Для каждого числа воркеров поднимается fake_ollama.py (задержка --llm-latency-ms)
+и uvicorn main:app --workers N с общей SQLite базой (WAL) и SHARED_STORE=sqlite.
+Лимиты частоты выключены. Нагрузка — closed-loop: --concurrency клиентов
+отправляют запросы подряд в течение --duration секунд.
+
+Сценарии: chat (ожидание LLM), analyze (разбор CSV на --rows строк + LLM),
+my-files (чтение из БД), mix — все три по очереди.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import bench_data
+from bench_startup import free_port, wait_until_up
+from load_test import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = {
+    "chat": ["chat"],
+    "analyze": ["analyze"],
+    "my-files": ["my-files"],
+    "mix": ["chat", "analyze", "my-files"],
+}
+
+
+def request(client: httpx.AsyncClient, name: str, headers: dict, statement: bytes):
+    if name == "chat":
+        return client.post("/chat", headers=headers, json={"message": "Как сократить расходы?"})
+    if name == "analyze":
+        return client.post("/analyze-expenses", headers=headers,
+                           files={"file": ("statement.csv", statement, "text/csv")})
+    return client.get("/my-files", headers=headers, params={"view": "list"})
+
+
+async def drive(base: str, scenario: list, concurrency: int, duration: float, statement: bytes):
+    latencies, errors = [], 0
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        await client.post("/register", json={"username": "bench", "email": "bench@bench.kz", "password": "bench"})
+        token = (await client.post("/login", json={"username": "bench", "password": "bench"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        deadline = time.perf_counter() + duration
+
+        async def worker(i: int):
+            nonlocal errors
+            n = i
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    r = await request(client, scenario[n % len(scenario)], headers, statement)
+                    if r.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                n += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+    return len(latencies) / wall, sorted(latencies), errors
+
+
+def run(workers: int, args, statement: bytes) -> tuple:
+    tmp = tempfile.mkdtemp(prefix="bench_workers_")
+    llm_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}",
+        SHARED_STORE="sqlite",
+        SHARED_STORE_PATH=os.path.join(tmp, "shared_state.db"),
+        RATE_LIMITS="",
+        OLLAMA_API=f"http://127.0.0.1:{llm_port}/api/generate",
+    )
+    fake = subprocess.Popen(
+        [sys.executable, "fake_ollama.py", "--port", str(llm_port), "--latency-ms", str(args.llm_latency_ms),
+         "--tokens-per-sec", "0", "--tokens", "20"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{llm_port}/api/tags")
+        # Таблицы создаем заранее, чтобы воркеры не создавали их одновременно
+        subprocess.run([sys.executable, "-c", "import models, database_sqlite; database_sqlite.create_db_and_tables()"],
+                       cwd=HERE, env=env, check=True, capture_output=True)
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{app_port}"
+            wait_until_up(base + "/", timeout=60)
+            return asyncio.run(drive(base, SCENARIOS[args.scenario], args.concurrency, args.duration, statement))
+        finally:
+            app.terminate()
+            app.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="числа воркеров через запятую")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mix")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--rows", type=int, default=2_000, help="строк в загружаемом CSV")
+    args = parser.parse_args()
+
+    statement = bench_data.make_csv(args.rows)
+    print(f"CPU: {os.cpu_count()}, сценарий: {args.scenario}, клиентов: {args.concurrency}")
+    print(f"{'workers':>8}{'req/s':>10}{'x1':>8}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        rps, latencies, errors = run(workers, args, statement)
+        baseline = baseline or rps
+        print(f"{workers:>8}{rps:>10.1f}{rps / baseline:>8.2f}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
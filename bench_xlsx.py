@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Сравнение чтения XLSX: pd.read_excel против потокового analysis.read_xlsx.
+
+Использование:
+    python bench_xlsx.py           # 1k и 100k строк
+    python bench_xlsx.py --full    # + 1M строк
+
+Печатает строки/с (лучший из прогонов) и пиковую память по tracemalloc
+(отдельным прогоном, чтобы трассировка не искажала время).
+"""
+
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+import bench_data
+from analysis import read_xlsx
+
+
+def run_read_excel(content: bytes):
+    return pd.read_excel(BytesIO(content))
+
+
+def run_streaming(content: bytes):
+    return read_xlsx(content)
+
+
+def measure(func, content: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = func(content)
+        best = min(best, time.perf_counter() - started)
+    del df
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="добавить 1M строк")
+    args = parser.parse_args()
+
+    sizes = [1_000, 100_000] + ([1_000_000] if args.full else [])
+    print(f"{'rows':>10}  {'loader':<14}{'rows/s':>12}{'peak MiB':>10}")
+    for n in sizes:
+        content = bench_data.cached(f"statement_{n}.xlsx", bench_data.make_xlsx, n)
+        repeat = 3 if n <= 10_000 else 1
+        for name, func in (("read_excel", run_read_excel), ("read_xlsx", run_streaming)):
+            elapsed, peak = measure(func, content, repeat)
+            print(f"{n:>10}  {name:<14}{n / elapsed:>12,.0f}{peak / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Seed данных: демо-аккаунты и массовая генерация для нагрузочных тестов.
+
+Использование:
+    python bulk_seed.py                                   # только демо-аккаунты (admin, alex_kazakh, ...)
+    python bulk_seed.py --users 10000 --files 10          # + N пользователей по M файлов
+    python bulk_seed.py --users 1000 --files 10 --transactions 100   # + строки транзакций
+
+Все строки вставляются пачками (executemany) в одной транзакции, генерация
+детерминирована (--seed). Пароль сгенерированных пользователей — password123.
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlmodel import create_engine, select
+
+import search
+from database_sqlite import DATABASE_URL, create_db_and_tables
+from models import User, UploadedFile, Transaction, CategoryStat, UserRole
+
+CATEGORIES = [
+    "Продукты", "Транспорт", "Развлечения", "Услуги", "Одежда",
+    "Медицина", "Образование", "transfer/deposit", "purchase", "cash",
+]
+MERCHANTS = [
+    "Magnum", "Small", "Kaspi Магазин", "Ozon", "Kazakhtelecom", "Yandex Go",
+    "Chocofood", "Halyk банкомат", "Kinopark", "Sadyhan аптека", "Technodom",
+]
+
+
+def _insert(conn, table, columns, rows):
+    """Пакетная вставка кортежей через executemany драйвера"""
+    if not rows:
+        return
+    sql = (
+        f'INSERT INTO "{table.name}" ({", ".join(columns)}) '
+        f'VALUES ({", ".join("?" if conn.dialect.paramstyle == "qmark" else "%s" for _ in columns)})'
+    )
+    conn.exec_driver_sql(sql, rows)
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def bulk_seed(users: int, files: int, transactions: int, seed: int = 42, batch_size: int = 50_000):
+    """Генерирует users пользователей по files файлов и по transactions транзакций в файле"""
+    rng = random.Random(seed)
+    engine = create_engine(DATABASE_URL)
+    base_date = datetime(2024, 1, 1)
+    user_cols = ["id", "username", "email", "password_hash", "role", "created_at"]
+    file_cols = ["id", "user_id", "filename", "upload_date",
+                 "ai_analysis", "total_amount", "transactions_count"]
+    stat_cols = ["file_id", "user_id", "category", "amount"]
+    tx_cols = ["file_id", "user_id", "operation_date", "description", "category", "amount"]
+    users_table = User.__table__
+    files_table = UploadedFile.__table__
+    stats_table = CategoryStat.__table__
+    tx_table = Transaction.__table__
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # Ускоряем загрузку: журнал в памяти, без fsync на каждую страницу
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+
+        user_id = _next_id(conn, User)
+        file_id = first_file_id = _next_id(conn, UploadedFile)
+        # Суффикс из первого id, чтобы повторный запуск не конфликтовал по username
+        prefix = f"seed{user_id}_"
+
+        user_rows, file_rows, stat_rows, tx_rows = [], [], [], []
+        total_tx = 0
+        descriptions = [f"Покупка {m}" for m in MERCHANTS]
+        month_days = [
+            [(date(2024, 1, 1) + timedelta(days=30 * m + d)).isoformat() for d in range(30)]
+            for m in range(12)
+        ]
+
+        def flush(force=False):
+            nonlocal user_rows, file_rows, stat_rows, tx_rows
+            if force or len(user_rows) + len(file_rows) + len(stat_rows) + len(tx_rows) >= batch_size:
+                _insert(conn, users_table, user_cols, user_rows)
+                _insert(conn, files_table, file_cols, file_rows)
+                _insert(conn, stats_table, stat_cols, stat_rows)
+                _insert(conn, tx_table, tx_cols, tx_rows)
+                user_rows, file_rows, stat_rows, tx_rows = [], [], [], []
+
+        for u in range(users):
+            uid = user_id + u
+            username = f"{prefix}{u}"
+            user_rows.append((uid, username, f"{username}@example.com", "password123_hash",
+                              UserRole.USER.name,
+                              (base_date - timedelta(days=rng.randint(0, 365))).isoformat(" ")))
+
+            for f in range(files):
+                month_start = date(2024, 1, 1) + timedelta(days=30 * (f % 12))
+                if transactions:
+                    # Пачкой через choices(k=...) — в разы быстрее поштучных вызовов rng
+                    days = rng.choices(month_days[f % 12], k=transactions)
+                    descs = rng.choices(descriptions, k=transactions)
+                    categories = rng.choices(CATEGORIES, k=transactions)
+                    amounts = [round(200 + 59_800 * rng.random(), 2) for _ in range(transactions)]
+                    totals = dict.fromkeys(categories, 0.0)
+                    for category, amount in zip(categories, amounts):
+                        totals[category] += amount
+                    tx_rows.extend(zip([file_id] * transactions, [uid] * transactions,
+                                       days, descs, categories, amounts))
+                    count = transactions
+                else:
+                    totals = {c: round(rng.uniform(5_000, 60_000), 2) for c in rng.sample(CATEGORIES, 5)}
+                    count = rng.randint(20, 120)
+                stat_rows.extend((file_id, uid, c, round(a, 2)) for c, a in totals.items())
+                file_rows.append((
+                    file_id, uid, f"statement_{month_start:%Y_%m}.csv",
+                    f"{month_start + timedelta(days=31)} 00:00:00",
+                    f"Основные расходы: {max(totals, key=totals.get)}. Рекомендуем установить лимит.",
+                    round(sum(totals.values()), 2), count,
+                ))
+                file_id += 1
+                total_tx += transactions
+                flush()
+        flush(force=True)
+        if total_tx:
+            # Описания — в индекс поиска одним запросом (триггеров на transaction нет)
+            search.index_transactions(conn, first_file_id, file_id - 1)
+
+    elapsed = time.perf_counter() - started
+    rows = users + users * files + total_tx
+    print(f"✅ Создано: пользователей {users}, файлов {users * files}, транзакций {total_tx}")
+    print(f"⏱  {elapsed:.2f} с ({rows / elapsed if elapsed else 0:,.0f} строк/с)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=0, help="сколько пользователей сгенерировать")
+    parser.add_argument("--files", type=int, default=3, help="файлов на пользователя")
+    parser.add_argument("--transactions", type=int, default=0, help="транзакций на файл (0 — без строк)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--no-demo", action="store_true", help="не создавать демо-аккаунты")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    if not args.no_demo:
+        from simple_seed import create_simple_seed_data
+        create_simple_seed_data()
+    if args.users:
+        bulk_seed(args.users, args.files, args.transactions, args.seed, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Сессии /chat: история диалога хранится на сервере, а не пересылается клиентом.
+
+Пока Ollama возвращает context (токены уже вычисленного диалога), следующий
+ход отправляет только новое сообщение вместе с ним — модель не вычисляет
+историю заново. Когда context длиннее CHAT_CONTEXT_TOKENS (или его нет), ход
+собирается из скользящего окна последних реплик на CHAT_HISTORY_TOKENS
+токенов, поэтому промпт не растет вместе с диалогом.
+
+Сессии лежат в shared_store (видны всем воркерам при SHARED_STORE=sqlite):
+неактивная дольше CHAT_SESSION_TTL секунд удаляется, а при создании новой
+сверх CHAT_MAX_SESSIONS у пользователя вытесняется самая старая.
+"""
+
+import os
+import time
+import uuid
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from shared_store import get_store
+
+load_dotenv()
+
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "20"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "4096"))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "1024"))
+
+ROLES = {"user": "Пользователь", "assistant": "Ассистент"}
+
+
+def _ns(user_id: int) -> str:
+    return f"chat:{user_id}"
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 символа на токен, как в llm.generate_with_usage"""
+    return len(text) // 4 + 1
+
+
+def create(user_id: int) -> Tuple[str, dict]:
+    """Новая сессия; самые старые сессии пользователя сверх лимита удаляются"""
+    store = get_store()
+    sessions = store.items(_ns(user_id))
+    if len(sessions) >= CHAT_MAX_SESSIONS:
+        by_age = sorted(sessions, key=lambda sid: sessions[sid]["updated"])
+        for session_id in by_age[:len(sessions) - CHAT_MAX_SESSIONS + 1]:
+            store.delete(_ns(user_id), session_id)
+    now = time.time()
+    return uuid.uuid4().hex, {"history": [], "context": None, "turns": 0, "created": now, "updated": now}
+
+
+def load(user_id: int, session_id: str) -> Optional[dict]:
+    return get_store().get(_ns(user_id), session_id)
+
+
+def delete(user_id: int, session_id: str):
+    get_store().delete(_ns(user_id), session_id)
+
+
+def list_sessions(user_id: int) -> list:
+    sessions = get_store().items(_ns(user_id))
+    return sorted(
+        (
+            {"session_id": sid, "turns": s["turns"], "created": s["created"], "updated": s["updated"]}
+            for sid, s in sessions.items()
+        ),
+        key=lambda s: s["updated"],
+        reverse=True,
+    )
+
+
+def _window(history: list, budget: int) -> list:
+    """Последние реплики, которые помещаются в budget токенов"""
+    window, used = [], 0
+    for role, text in reversed(history):
+        used += estimate_tokens(text)
+        if used > budget:
+            break
+        window.append((role, text))
+    return window[::-1]
+
+
+def prepare(state: dict, message: str) -> Tuple[str, Optional[list]]:
+    """Промпт и context для очередного хода"""
+    context = state.get("context")
+    if context and len(context) <= CHAT_CONTEXT_TOKENS:
+        return message, context
+    window = _window(state["history"], CHAT_HISTORY_TOKENS)
+    if not window:
+        return message, None
+    lines = [f"{ROLES[role]}: {text}" for role, text in window]
+    return "Предыдущий диалог:\n" + "\n".join(lines) + f"\n\n{ROLES['user']}: {message}", None
+
+
+def save(user_id: int, session_id: str, state: dict, message: str, reply: str, context: Optional[list]):
+    """Дописывает ход в историю (обрезанную до окна) и сохраняет сессию с новым TTL"""
+    history = state["history"] + [("user", message), ("assistant", reply)]
+    state["history"] = _window(history, CHAT_HISTORY_TOKENS)
+    state["context"] = context
+    state["turns"] += 1
+    state["updated"] = time.time()
+    get_store().set(_ns(user_id), session_id, state, ttl=CHAT_SESSION_TTL)
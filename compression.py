@@ -0,0 +1,143 @@
+"""
+Сжатие ответов: brotli (если установлен пакет brotli) или gzip.
+
+Ответ сжимается, если клиент прислал подходящий Accept-Encoding, тело
+больше COMPRESS_MIN_SIZE байт и тип содержимого не сжат заранее
+(бинарные файлы, картинки, архивы). Потоковые ответы сжимаются по частям.
+"""
+
+import os
+import zlib
+
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него — только gzip
+    brotli = None
+
+load_dotenv()
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Уже сжатые или потоковые форматы, которые сжимать бессмысленно
+SKIP_CONTENT_TYPES = ("application/octet-stream", "application/zip", "application/gzip",
+                      "application/vnd.apache.parquet", "image/", "text/event-stream")
+
+
+def accepted_encodings(header: str) -> set:
+    """Кодировки из Accept-Encoding с q > 0"""
+    result = set()
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            result.add(name)
+    return result
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 — формат gzip
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.finish()
+
+
+class CompressionMiddleware:
+    """ASGI middleware: brotli/gzip для ответов больше minimum_size"""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def _choose_encoder(self, scope):
+        header = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encodings = accepted_encodings(header)
+        if brotli is not None and "br" in encodings:
+            return _BrotliEncoder
+        if "gzip" in encodings:
+            return _GzipEncoder
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoder_class = self._choose_encoder(scope) if scope["type"] == "http" else None
+        if encoder_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None  # None — ответ идет без сжатия
+        decided = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, decided
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if not decided:
+                decided = True
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                compressible = (
+                    "content-encoding" not in headers
+                    and not content_type.startswith(SKIP_CONTENT_TYPES)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if compressible:
+                    encoder = encoder_class()
+                    headers["Content-Encoding"] = encoder.name
+                    headers.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        body = encoder.compress(body) + encoder.flush()
+                        headers["Content-Length"] = str(len(body))
+                        await send(start_message)
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                await send(start_message)
+
+            if encoder is None:
+                await send(message)
+                return
+
+            chunk = encoder.compress(body)
+            if not more_body:
+                chunk += encoder.flush()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
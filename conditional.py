@@ -0,0 +1,63 @@
+"""
+Условные GET-запросы: ETag / Last-Modified и ответ 304 Not Modified.
+
+Валидаторы считаются по дешевым счетчикам (User.files_version и время
+последней загрузки), поэтому при совпадении тяжелые запросы списка файлов
+не выполняются. ETag слабый (W/): тело может отличаться сжатием.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Браузер и фронтенд всегда переспрашивают сервер, но могут получить 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> datetime:
+    """Время в UTC с точностью до секунды (как в заголовке)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-None-Match (приоритетнее) или If-Modified-Since совпадают с текущими валидаторами"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _http_date(last_modified) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    # Last-Modified с точностью до секунды: если изменение было в текущую секунду,
+    # следующая загрузка в ту же секунду не поменяет его — такой валидатор не отдаем
+    if last_modified is not None and _http_date(last_modified) < _http_date(datetime.now(timezone.utc)):
+        response.headers["Last-Modified"] = format_datetime(_http_date(last_modified), usegmt=True)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -1,5 +1,6 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import create_engine, Session
 from dotenv import load_dotenv
+import schema
 import os
 
 load_dotenv()
@@ -12,8 +13,8 @@ engine = create_engine(DATABASE_URL, echo=True)
 
 
 def create_db_and_tables():
-    """Создает таблицы в базе данных"""
-    SQLModel.metadata.create_all(engine)
+    """Создает недостающие таблицы и колонки (schema.create_db_and_tables)"""
+    schema.create_db_and_tables(engine)
 
 
 def get_session():
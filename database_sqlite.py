@@ -1,5 +1,7 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event
+from sqlmodel import create_engine, Session
 from dotenv import load_dotenv
+import schema
 import os
 
 load_dotenv()
@@ -10,10 +12,20 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_bank.db")
 # Создание движка базы данных
 engine = create_engine(DATABASE_URL, echo=True)
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL: чтение не блокируется записью, несколько воркеров работают с одним файлом;
+        busy_timeout: при занятой записи ждем, а не падаем с 'database is locked'"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
 
 def create_db_and_tables():
-    """Создает таблицы в базе данных"""
-    SQLModel.metadata.create_all(engine)
+    """Создает недостающие таблицы и колонки (schema.create_db_and_tables)"""
+    schema.create_db_and_tables(engine)
 
 
 def get_session():
@@ -0,0 +1,78 @@
+"""
+Сквозной дедлайн загрузки выписки.
+
+Запрос получает бюджет времени: REQUEST_DEADLINE секунд или меньше, если клиент
+прислал заголовок X-Request-Deadline (увеличить бюджет заголовком нельзя).
+Объект Deadline передается по этапам: разбор PDF/XLSX проверяет его между
+страницами и пачками строк, ИИ ждет не дольше оставшегося времени, запись строк
+Transaction останавливается между пачками. Что не успели — пропускается и
+отмечается в Deadline.partial; ответ приходит с тем, что готово, и флагом partial.
+
+Разбор и ИИ останавливаются за DEADLINE_RESERVE секунд до дедлайна — это время
+остается на агрегацию и запись в базу.
+"""
+
+import math
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+load_dotenv()
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))  # 0 — без дедлайна
+DEADLINE_RESERVE = float(os.getenv("DEADLINE_RESERVE", "1"))
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+class Deadline:
+    """Момент, к которому запрос должен ответить, и список пропущенной работы.
+
+    expired() — пора прекращать разбор и не ждать ИИ (с учетом резерва),
+    passed() — дедлайн наступил, дальше не пишем в базу. Без seconds дедлайна нет.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, reserve: float = DEADLINE_RESERVE):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reserve = min(reserve, seconds / 2) if seconds else 0.0
+        self.partial = {}
+
+    def remaining(self) -> float:
+        """Секунд до остановки разбора и ИИ (inf без дедлайна)"""
+        if self.expires_at is None:
+            return math.inf
+        return max(self.expires_at - self.reserve - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def passed(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def cut(self, stage: str, **details):
+        """Отмечает, что этап stage не доделан (details — сколько успели)"""
+        self.partial.setdefault(stage, {}).update(details)
+
+    def report(self) -> dict:
+        """Поля ответа: partial и, если что-то пропущено, partial_details"""
+        if not self.partial:
+            return {"partial": False}
+        return {"partial": True, "partial_details": self.partial, "deadline_seconds": self.seconds}
+
+
+def request_deadline(request: Request) -> Deadline:
+    """Зависимость FastAPI: дедлайн из REQUEST_DEADLINE и заголовка X-Request-Deadline"""
+    seconds = REQUEST_DEADLINE or None
+    header = request.headers.get(DEADLINE_HEADER)
+    if header is not None:
+        try:
+            requested = float(header)
+        except ValueError:
+            requested = math.nan
+        if not requested > 0:
+            raise HTTPException(400, f"{DEADLINE_HEADER} — число секунд больше нуля")
+        seconds = min(requested, seconds) if seconds else requested
+    return Deadline(seconds)
@@ -0,0 +1,144 @@
+"""
+Потоковая выгрузка транзакций в Parquet или Arrow IPC (stream).
+
+Строки читаются курсором базы пачками по EXPORT_BATCH_ROWS (в PostgreSQL —
+серверный курсор), каждая пачка сразу превращается в RecordBatch и
+отдается клиенту. В памяти одновременно живет одна пачка,
+поэтому выгрузка миллионов строк идет с постоянной памятью.
+
+Нужен пакет pyarrow (есть в requirements.txt); без него эндпоинты выгрузки отвечают 503.
+"""
+
+import os
+from typing import Iterator, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from database_sqlite import engine
+from models import Transaction
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow необязателен, без него выгрузка недоступна
+    pa = pq = None
+
+load_dotenv()
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+# snappy — быстро и поддерживается везде; zstd — меньше, но медленнее
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "snappy")
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+COLUMNS = ("id", "file_id", "user_id", "operation_date", "description", "category", "amount")
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("file_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("operation_date", pa.date32()),
+        ("description", pa.string()),
+        ("category", pa.string()),
+        ("amount", pa.float64()),
+    ])
+
+
+class _ChunkSink:
+    """Файлоподобный приемник: писатель pyarrow складывает байты, генератор их забирает"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _record_batches(user_id: Optional[int], batch_rows: int):
+    """Пачки RecordBatch прямо из курсора базы"""
+    table = Transaction.__table__
+    statement = select(*(table.c[name] for name in COLUMNS)).order_by(table.c.id)
+    if user_id is not None:
+        statement = statement.where(table.c.user_id == user_id)
+
+    arrow_schema = schema()
+    compiled = statement.compile(dialect=engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup] if compiled.positional else compiled.params
+    with engine.connect() as conn:
+        # Строки берем прямо из курсора драйвера: объекты Row и обработчики типов
+        # SQLAlchemy стоят больше, чем сама выборка. Курсор свой, а не result.cursor:
+        # при stream_results SQLAlchemy заранее забирает из курсора первую строку в
+        # свой буфер, и она терялась. Даты приходят как date (PostgreSQL) или строкой
+        # 'YYYY-MM-DD' (SQLite) — в date32 их приводит pyarrow.
+        cursor = _streaming_cursor(conn)
+        try:
+            cursor.execute(str(compiled), params)
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(values).cast(field.type) for values, field in zip(columns, arrow_schema)],
+                    schema=arrow_schema,
+                )
+        finally:
+            cursor.close()
+
+
+def _streaming_cursor(conn):
+    """Курсор драйвера, отдающий строки по мере чтения: в PostgreSQL — именованный
+    (серверный), курсор sqlite3 и так читает результат постепенно"""
+    dbapi_connection = conn.connection.dbapi_connection
+    if conn.dialect.name == "postgresql":
+        return dbapi_connection.cursor(name="transactions_export")
+    return dbapi_connection.cursor()
+
+
+def iter_export(fmt: str, user_id: Optional[int] = None, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """Байты файла выгрузки по частям; user_id=None — транзакции всех пользователей"""
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema(), compression=PARQUET_COMPRESSION)
+        write = writer.write_batch  # каждая пачка — отдельная row group
+    else:
+        writer = pa.ipc.new_stream(sink, schema())
+        write = writer.write_batch
+
+    for batch in _record_batches(user_id, batch_rows):
+        write(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    # Пустая выгрузка — тоже корректный файл со схемой
+    writer.close()
+    yield sink.drain()
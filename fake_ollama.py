@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Локальная замена Ollama для нагрузочного тестирования без GPU.
+
+Отвечает на POST /api/generate так же, как Ollama: NDJSON-поток
+{"model","created_at","response","done":false} по токену и финальная строка
+с "done":true, "context" и метриками *_duration (в наносекундах).
+При "stream": false возвращает один JSON-объект.
+
+Модель «загружается» --load-ms миллисекунд при первом запросе и после
+того, как истек keep_alive (по умолчанию 5m, как в Ollama); пустой промпт
+только загружает модель. GET /api/ps — загруженные модели.
+
+Использование:
+    python fake_ollama.py --port 11434 --tokens-per-sec 40 --latency-ms 300 --error-rate 0.02
+    OLLAMA_API=http://localhost:11434/api/generate uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Настройки читаются из окружения, CLI перезаписывает их перед запуском
+TOKENS_PER_SEC = float(os.getenv("FAKE_OLLAMA_TOKENS_PER_SEC", "40"))
+LATENCY_MS = float(os.getenv("FAKE_OLLAMA_LATENCY_MS", "300"))
+ERROR_RATE = float(os.getenv("FAKE_OLLAMA_ERROR_RATE", "0"))
+RESPONSE_TOKENS = int(os.getenv("FAKE_OLLAMA_RESPONSE_TOKENS", "60"))
+# Скорость вычисления промпта (токенов/с, 0 — мгновенно): время до первого токена растет с длиной промпта
+PROMPT_TOKENS_PER_SEC = float(os.getenv("FAKE_OLLAMA_PROMPT_TOKENS_PER_SEC", "0"))
+# Время загрузки «холодной» модели в память
+LOAD_MS = float(os.getenv("FAKE_OLLAMA_LOAD_MS", "0"))
+DEFAULT_KEEP_ALIVE = 300
+
+ANSWER = (
+    "Основная доля расходов приходится на категории Продукты и Развлечения. "
+    "Рекомендую установить месячный лимит на рестораны и кафе, отказаться от "
+    "неиспользуемых подписок и планировать покупки продуктов на неделю вперед. "
+    "Ежемесячная экономия может составить от 15 000 до 25 000 тенге. "
+)
+
+app = FastAPI(title="Fake Ollama")
+
+_loaded_until = {}  # модель -> time.monotonic(), когда она выгрузится
+_load_lock = asyncio.Lock()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _line(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _tokens(n: int):
+    words = ANSWER.split(" ")
+    for i in range(n):
+        yield words[i % len(words)] + " "
+
+
+def _prompt_tokens(prompt: str) -> int:
+    return max(1, len(prompt) // 4)
+
+
+def _keep_alive_seconds(value) -> float:
+    """keep_alive Ollama: секунды числом или "30s" / "5m" / "1h"; отрицательное — навсегда"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, str):
+        units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        number = value.rstrip("mshMSH")
+        value = float(number) * units.get(value[len(number):].lower(), 1)
+    return float("inf") if value < 0 else float(value)
+
+
+async def _ensure_loaded(model: str, keep_alive) -> int:
+    """Загружает модель, если она выгружена; возвращает load_duration в наносекундах"""
+    started = time.perf_counter()
+    if _loaded_until.get(model, 0) <= time.monotonic():
+        async with _load_lock:
+            if _loaded_until.get(model, 0) <= time.monotonic():
+                await asyncio.sleep(LOAD_MS / 1000)
+                _loaded_until[model] = time.monotonic() + DEFAULT_KEEP_ALIVE
+    load_duration = int((time.perf_counter() - started) * 1e9)
+    _loaded_until[model] = time.monotonic() + _keep_alive_seconds(keep_alive)
+    return load_duration
+
+
+def _final(model: str, prompt: str, context: list, started: float, first_token_at: float, n_tokens: int,
+           load_duration: int = 0) -> dict:
+    now = time.perf_counter()
+    prompt_tokens = _prompt_tokens(prompt)
+    return {
+        "model": model,
+        "created_at": _now(),
+        "response": "",
+        "done": True,
+        "done_reason": "stop",
+        # Как в Ollama: переданный context + токены нового промпта и ответа
+        "context": context + list(range(len(context), len(context) + prompt_tokens + n_tokens)),
+        "total_duration": int((now - started) * 1e9),
+        "load_duration": load_duration,
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": int((first_token_at - started) * 1e9),
+        "eval_count": n_tokens,
+        "eval_duration": int((now - first_token_at) * 1e9),
+    }
+
+
+@app.get("/api/tags")
+async def tags():
+    """Список моделей (используется для проверки доступности)"""
+    return {"models": [{"name": "mistral:latest", "model": "mistral:latest"}]}
+
+
+@app.get("/api/ps")
+async def ps():
+    """Загруженные в память модели"""
+    now = time.monotonic()
+    return {"models": [
+        {"name": f"{model}:latest", "model": f"{model}:latest",
+         "expires_in": None if until == float("inf") else round(until - now, 1)}
+        for model, until in _loaded_until.items() if until > now
+    ]}
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    model = body.get("model", "mistral")
+    prompt = body.get("prompt", "")
+    context = body.get("context") or []
+    stream = body.get("stream", True)
+    n_tokens = int(body.get("options", {}).get("num_predict", RESPONSE_TOKENS))
+    if n_tokens < 0:
+        n_tokens = RESPONSE_TOKENS
+
+    if random.random() < ERROR_RATE:
+        return JSONResponse({"error": "fake ollama: injected failure"}, status_code=500)
+
+    started = time.perf_counter()
+    load_duration = await _ensure_loaded(model, body.get("keep_alive"))
+    if not prompt:
+        # Пустой промпт — только загрузка модели
+        return JSONResponse({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "load", "load_duration": load_duration})
+
+    # Вычисляется только новый промпт: история уже в context
+    prompt_eval = _prompt_tokens(prompt) / PROMPT_TOKENS_PER_SEC if PROMPT_TOKENS_PER_SEC > 0 else 0
+    await asyncio.sleep(LATENCY_MS / 1000 + prompt_eval)
+    first_token_at = time.perf_counter()
+    delay = 1 / TOKENS_PER_SEC if TOKENS_PER_SEC > 0 else 0
+
+    if not stream:
+        await asyncio.sleep(delay * n_tokens)
+        final = _final(model, prompt, context, started, first_token_at, n_tokens, load_duration)
+        final["response"] = "".join(_tokens(n_tokens))
+        return JSONResponse(final)
+
+    async def body_iter():
+        for token in _tokens(n_tokens):
+            await asyncio.sleep(delay)
+            yield _line({"model": model, "created_at": _now(), "response": token, "done": False})
+        yield _line(_final(model, prompt, context, started, first_token_at, n_tokens, load_duration))
+
+    return StreamingResponse(body_iter(), media_type="application/x-ndjson")
+
+
+def main():
+    global TOKENS_PER_SEC, LATENCY_MS, ERROR_RATE, RESPONSE_TOKENS, PROMPT_TOKENS_PER_SEC, LOAD_MS
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-sec", type=float, default=TOKENS_PER_SEC)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS, help="задержка до первого токена")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="доля ответов 500")
+    parser.add_argument("--tokens", type=int, default=RESPONSE_TOKENS, help="токенов в ответе")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=PROMPT_TOKENS_PER_SEC,
+                        help="скорость вычисления промпта (0 — мгновенно)")
+    parser.add_argument("--load-ms", type=float, default=LOAD_MS, help="загрузка выгруженной модели")
+    args = parser.parse_args()
+
+    TOKENS_PER_SEC = args.tokens_per_sec
+    LATENCY_MS = args.latency_ms
+    ERROR_RATE = args.error_rate
+    RESPONSE_TOKENS = args.tokens
+    PROMPT_TOKENS_PER_SEC = args.prompt_tokens_per_sec
+    LOAD_MS = args.load_ms
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
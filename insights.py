@@ -0,0 +1,222 @@
+"""
+Регулярные платежи и необычные операции по всей выписке.
+
+Раньше ИИ угадывал подписки и всплески по 20 строкам из build_prompt. Здесь
+выписка (TransactionBatch) разбирается целиком сортировкой и группировкой
+массивов NumPy/pandas — O(n log n), без цикла Python по строкам:
+
+1. регулярные платежи — одинаковые продавец (описание, а без описаний —
+   категория) и сумма через равные промежутки (неделя, месяц, квартал, год);
+2. необычные операции — суммы, которые в своей категории дальше ANOMALY_Z
+   робастных отклонений (медиана и MAD логарифмов сумм) от обычной.
+
+Результат (detect) попадает в ответ /analyze-expenses и в промпт ИИ (describe).
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from transaction_batch import TransactionBatch, labels
+
+# Сколько списаний нужно, чтобы считать платеж регулярным
+RECURRING_MIN_COUNT = int(os.getenv("RECURRING_MIN_COUNT", "3"))
+# Доля промежутков, которые должны укладываться в период (остальные — пропуски, задержки)
+RECURRING_MIN_REGULARITY = 0.75
+# Робастный z-score (по логарифму суммы), после которого операция считается необычной
+ANOMALY_Z = float(os.getenv("ANOMALY_Z", "4"))
+# Минимум операций в категории, чтобы судить о необычности
+ANOMALY_MIN_COUNT = 8
+TOP_ITEMS = 20
+PROMPT_ITEMS = 5
+
+# Период -> (дней, допуск в днях): списание сдвигается на выходные, месяцы — от 28 до 31 дня
+PERIODS = {
+    "week": (7, 2),
+    "two_weeks": (14, 3),
+    "month": (30, 4),
+    "quarter": (91, 7),
+    "year": (365, 10),
+}
+PERIOD_LABELS = {
+    "week": "раз в неделю", "two_weeks": "раз в две недели", "month": "раз в месяц",
+    "quarter": "раз в квартал", "year": "раз в год",
+}
+# Периоды, у которых следующее списание — то же число через N месяцев
+PERIOD_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+DAYS_PER_MONTH = 30.44
+
+
+def _merchants(batch: TransactionBatch) -> pd.Categorical:
+    """Продавец строки: описание, а где его нет (выписка без описаний в склейке) — категория"""
+    if batch.description is None:
+        return batch.category
+    missing = batch.description.codes == -1
+    if not missing.any():
+        return batch.description
+    return pd.Categorical(np.where(missing, labels(batch.category), labels(batch.description)))
+
+
+def _next_date(last_day: np.datetime64, period: str) -> str:
+    if period in PERIOD_MONTHS:
+        return str((pd.Timestamp(last_day) + pd.DateOffset(months=PERIOD_MONTHS[period])).date())
+    return str(last_day + np.timedelta64(PERIODS[period][0], "D"))
+
+
+def recurring_payments(batch: TransactionBatch, top: int = TOP_ITEMS) -> tuple:
+    """(регулярные платежи по убыванию стоимости в месяц, их общая сумма в месяц)"""
+    merchant = _merchants(batch)
+    keep = np.flatnonzero(~np.isnat(batch.date) & (merchant.codes >= 0))
+    if not len(keep):
+        return [], 0.0
+    codes = merchant.codes[keep].astype(np.int64)
+    cents = np.round(batch.amount[keep] * 100).astype(np.int64)
+    days = batch.date[keep].astype("datetime64[D]").astype(np.int64)
+
+    # Сортировка по (продавец, сумма, день): серия одного платежа идет подряд
+    order = np.lexsort((days, cents, codes))
+    rows, codes, cents, days = keep[order], codes[order], cents[order], days[order]
+    same_series = np.r_[False, (codes[1:] == codes[:-1]) & (cents[1:] == cents[:-1])]
+    # Несколько одинаковых списаний за день считаются одним
+    first_of_day = ~(same_series & np.r_[False, days[1:] == days[:-1]])
+    rows, days, same_series = rows[first_of_day], days[first_of_day], same_series[first_of_day]
+    same_series[0] = False
+
+    series = np.cumsum(~same_series) - 1
+    counts = np.bincount(series)
+    candidates = counts >= RECURRING_MIN_COUNT
+    if not candidates.any():
+        return [], 0.0
+
+    # Промежутки между соседними списаниями серии; медиана определяет период
+    gaps = np.diff(days)
+    gap_series = series[1:][same_series[1:]]
+    gaps = gaps[same_series[1:]]
+    in_candidate = candidates[gap_series]
+    gap_series, gaps = gap_series[in_candidate], gaps[in_candidate]
+    median_gap = pd.Series(gaps).groupby(gap_series).median()
+
+    period_names = np.array(list(PERIODS))
+    period_days = np.array([d for d, _ in PERIODS.values()])
+    tolerance = np.array([t for _, t in PERIODS.values()])
+    nearest = np.abs(median_gap.to_numpy()[:, None] - period_days[None, :]).argmin(axis=1)
+    period_of = pd.Series(nearest, index=median_gap.index)
+    fits = np.abs(median_gap.to_numpy() - period_days[nearest]) <= tolerance[nearest]
+    period_of = period_of[fits]
+    if period_of.empty:
+        return [], 0.0
+
+    # Доля промежутков в пределах допуска (пропущенный месяц дает промежуток в два периода)
+    gap_period = period_of.reindex(gap_series).to_numpy()
+    has_period = ~np.isnan(gap_period)
+    gap_period = gap_period[has_period].astype(np.int64)
+    regular = np.abs(gaps[has_period] - period_days[gap_period]) <= tolerance[gap_period]
+    regularity = pd.Series(regular).groupby(gap_series[has_period]).mean()
+    regular_series = regularity.index[regularity.to_numpy() >= RECURRING_MIN_REGULARITY].to_numpy()
+    if not len(regular_series):
+        return [], 0.0
+
+    # Последнее списание серии; в ответ — top серий с наибольшей суммой в месяц
+    last = np.r_[series[1:] != series[:-1], True]
+    last_rows = pd.Series(rows[last], index=series[last])[regular_series].to_numpy()
+    intervals = period_days[period_of[regular_series].to_numpy()]
+    monthly = batch.amount[last_rows] * DAYS_PER_MONTH / intervals
+    chosen = np.argsort(-np.abs(monthly), kind="stable")[:top]
+
+    found = []
+    for i in chosen:
+        row, period = last_rows[i], str(period_names[period_of[regular_series[i]]])
+        last_day = batch.date[row].astype("datetime64[D]")
+        found.append({
+            "merchant": str(merchant[row]),
+            "category": str(batch.category[row]),
+            "amount": float(batch.amount[row]),
+            "period": period,
+            "count": int(counts[regular_series[i]]),
+            "last_date": str(last_day),
+            "next_date": _next_date(last_day, period),
+            "monthly_amount": round(float(monthly[i]), 2),
+        })
+    return found, round(float(monthly.sum()), 2)
+
+
+def anomalies(batch: TransactionBatch, top: int = TOP_ITEMS) -> tuple:
+    """(необычно крупные операции по убыванию z-score, сколько всего найдено).
+
+    Суммы трат распределены с длинным хвостом, поэтому сравниваются логарифмы
+    модулей: обычная сумма категории — медиана, разброс — MAD (медиана отклонений
+    от нее); обе считаются группировкой по кодам категорий.
+    """
+    if not len(batch):
+        return [], 0
+    size = np.abs(batch.amount)
+    with np.errstate(divide="ignore"):
+        log_size = pd.Series(np.log(size))
+    log_size[np.isinf(log_size)] = np.nan  # нулевые суммы не участвуют
+    codes = batch.category.codes
+    grouped = log_size.groupby(codes)
+    median = grouped.transform("median").to_numpy()
+    mad = (log_size - median).abs().groupby(codes).transform("median").to_numpy()
+    count = grouped.transform("count").to_numpy()
+
+    scale = 1.4826 * mad
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (log_size.to_numpy() - median) / scale
+    flagged = np.flatnonzero((count >= ANOMALY_MIN_COUNT) & (scale > 0) & (score >= ANOMALY_Z))
+    if not len(flagged):
+        return [], 0
+
+    chosen = flagged[np.argsort(-score[flagged], kind="stable")[:top]]
+    part = batch.take(chosen)
+    dates = part.iso_dates()
+    descriptions = labels(part.description) if part.description is not None else [None] * len(part)
+    items = [
+        {
+            "date": day,
+            "category": category,
+            "description": description,
+            "amount": amount,
+            "typical_amount": round(float(np.copysign(np.exp(median[row]), amount)), 2),
+            "score": round(float(score[row]), 1),
+        }
+        for row, day, category, description, amount in zip(
+            chosen, dates, labels(part.category), descriptions, part.amount.tolist()
+        )
+    ]
+    return items, len(flagged)
+
+
+def detect(batch: TransactionBatch) -> dict:
+    """Регулярные платежи и необычные операции выписки — для ответа и промпта"""
+    recurring, monthly_total = recurring_payments(batch)
+    unusual, unusual_count = anomalies(batch)
+    return {
+        "recurring": recurring,
+        "recurring_monthly_total": monthly_total,
+        "anomalies": unusual,
+        "anomalies_count": unusual_count,
+    }
+
+
+def _money(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def describe(found: Optional[dict]) -> str:
+    """Блок промпта: найденные по всей выписке регулярные платежи и необычные операции"""
+    if not found or not (found["recurring"] or found["anomalies"]):
+        return ""
+    lines = []
+    if found["recurring"]:
+        lines.append(f"Регулярные платежи (по всей выписке, {_money(found['recurring_monthly_total'])} в месяц):")
+        for item in found["recurring"][:PROMPT_ITEMS]:
+            lines.append(f"- {item['merchant']} ({item['category']}): {_money(item['amount'])} "
+                         f"{PERIOD_LABELS[item['period']]}, {item['count']} списаний")
+    if found["anomalies"]:
+        lines.append(f"Необычно крупные операции (всего {found['anomalies_count']}):")
+        for item in found["anomalies"][:PROMPT_ITEMS]:
+            lines.append(f"- {item['date'] or 'без даты'} {item['category']}: {_money(item['amount'])} "
+                         f"при обычной сумме {_money(item['typical_amount'])}")
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+"""
+Клиент Ollama (/api/generate) с размыкателем цепи (circuit breaker).
+
+После LLM_BREAKER_FAILURES неудачных вызовов подряд (ошибка или ответ дольше
+LLM_SLOW_CALL_SECONDS) размыкатель открывается: следующие LLM_BREAKER_COOLDOWN
+секунд вызовы сразу получают CircuitOpenError, не дожидаясь таймаута. Затем
+пропускается один пробный вызов — успех закрывает размыкатель, неудача
+открывает снова. Состояние — в памяти воркера.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from shared_store import get_store
+
+load_dotenv()
+
+OLLAMA_API = os.getenv("OLLAMA_API", "http://localhost:11434/api/generate")
+MODEL_NAME = os.getenv("MODEL_NAME", "mistral")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+# Сколько модель остается в памяти после запроса: "30m", "1h" или секунды; -1 — всегда
+_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+# Кэш ответов на одинаковые промпты (секунды, 0 — выключен); хранится в shared_store
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "60"))
+
+
+class LLMError(Exception):
+    """Ollama недоступна или вернула ошибку"""
+
+
+class CircuitOpenError(LLMError):
+    """Размыкатель открыт: вызов не отправлялся"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Ollama временно отключена после ошибок, повтор через {retry_after:.0f} с")
+        self.retry_after = retry_after
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Размыкатель цепи вокруг вызовов Ollama (потокобезопасный: вызовы идут из пула потоков)"""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN,
+                 slow_call: float = LLM_SLOW_CALL_SECONDS):
+        self.failures_threshold = failures
+        self.cooldown = cooldown
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    def before_call(self):
+        """CircuitOpenError, если вызов не пропускается; после паузы пропускает один пробный"""
+        if self.failures_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and self.retry_after() <= 0:
+                self.state = HALF_OPEN
+                return
+            raise CircuitOpenError(self.retry_after() or self.cooldown)
+
+    def record(self, ok: bool, seconds: float = 0.0):
+        """Итог вызова: ошибка или медленный ответ считаются неудачей"""
+        if self.failures_threshold <= 0:
+            return
+        with self._lock:
+            if ok and seconds <= self.slow_call:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failures_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures,
+                    "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0}
+
+
+breaker = CircuitBreaker()
+
+
+def generate(prompt: str) -> str:
+    """Отправляет промпт в Ollama и собирает потоковый NDJSON ответ в одну строку"""
+    return generate_with_usage(prompt)[0]
+
+
+def generate_with_usage(prompt: str, context: Optional[list] = None):
+    """Как generate, но возвращает (текст, {"prompt_tokens", "completion_tokens", ...}).
+
+    Токены берутся из финальной строки Ollama (prompt_eval_count / eval_count);
+    если их нет — оценка: ~4 символа на токен промпта, одна строка потока на токен ответа.
+    context — токены предыдущего ответа Ollama: модель продолжает диалог и не
+    вычисляет историю заново. Новый context и prompt_eval_ms тоже попадают в словарь.
+    """
+    cache_key = None
+    if LLM_CACHE_TTL > 0 and context is None:
+        cache_key = hashlib.sha256(f"{MODEL_NAME}\n{prompt}".encode()).hexdigest()
+        cached = get_store().get("llm_cache", cache_key)
+        if cached is not None:
+            # Ответ из кэша не расходует токены модели
+            return cached, {"prompt_tokens": 0, "completion_tokens": 0, "prompt_eval_ms": 0.0, "context": None}
+
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        full_text, usage, chunks = _post(prompt, context)
+    except Exception:
+        breaker.record(False)
+        raise
+    breaker.record(True, time.perf_counter() - started)
+
+    if cache_key is not None and full_text:
+        get_store().set("llm_cache", cache_key, full_text, ttl=LLM_CACHE_TTL)
+    return full_text, {
+        "prompt_tokens": int(usage.get("prompt_eval_count") or len(prompt) // 4),
+        "completion_tokens": int(usage.get("eval_count") or chunks),
+        "prompt_eval_ms": (usage.get("prompt_eval_duration") or 0) / 1e6,
+        "context": usage.get("context"),
+    }
+
+
+def _post(prompt: str, context: Optional[list]):
+    """Один потоковый запрос к Ollama: (текст, финальная строка NDJSON, число строк)"""
+    # Ленивый импорт: requests не нужен для старта воркера
+    import requests
+
+    payload = {"model": MODEL_NAME, "prompt": prompt, "keep_alive": OLLAMA_KEEP_ALIVE}
+    if context:
+        payload["context"] = context
+    try:
+        response = requests.post(OLLAMA_API, json=payload, timeout=OLLAMA_TIMEOUT, stream=True)
+    except requests.RequestException as e:
+        raise LLMError(f"Ollama недоступна: {e}")
+
+    if not response.ok:
+        raise LLMError(f"Ollama error: {response.text}")
+
+    full_text = ""
+    chunks = 0
+    usage = {}
+    for line in response.iter_lines():
+        if not line:
+            continue
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            continue
+        full_text += chunk.get("response", "")
+        chunks += 1
+        if chunk.get("done"):
+            usage = chunk
+            break
+    return full_text.strip(), usage, chunks
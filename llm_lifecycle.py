@@ -0,0 +1,135 @@
+"""
+Жизненный цикл модели Ollama: прогрев, keep_alive и проверки доступности.
+
+При старте воркера фоновая задача загружает MODEL_NAME в память (запрос
+/api/generate с пустым промптом — так Ollama только загружает модель), не
+задерживая запуск приложения. Затем раз в LLM_PROBE_INTERVAL секунд тот же
+запрос повторяется: он замеряет задержку, время загрузки (если модель успела
+выгрузиться) и продлевает keep_alive, поэтому модель не остывает, пока
+работает приложение. Состояние видно в /ready.
+
+Маршруты с ИИ подключают require_llm_ready: пока модель прогревается, запрос
+ждет до LLM_READY_WAIT секунд, недоступная модель — 503 с Retry-After.
+LLM_PROBE_INTERVAL=0 выключает прогрев и проверки (запросы идут как раньше).
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from llm import MODEL_NAME, OLLAMA_API, OLLAMA_KEEP_ALIVE
+
+load_dotenv()
+
+LLM_PROBE_INTERVAL = float(os.getenv("LLM_PROBE_INTERVAL", "30"))
+# Первая загрузка большой модели может идти минуту и дольше
+LLM_PROBE_TIMEOUT = float(os.getenv("LLM_PROBE_TIMEOUT", "120"))
+LLM_READY_WAIT = float(os.getenv("LLM_READY_WAIT", "30"))
+
+STARTING, READY, UNHEALTHY = "starting", "ready", "unhealthy"
+
+
+class LLMLifecycle:
+    """Фоновый прогрев и проверки модели; один экземпляр на воркер"""
+
+    def __init__(self, interval: float = LLM_PROBE_INTERVAL):
+        self.interval = interval
+        self.state = STARTING
+        self.last_probe_at: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self.failures = 0
+        self.error: Optional[str] = None
+        self._probed: Optional[asyncio.Event] = None  # первая проверка завершилась
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Проверки идут (включены и запущены при старте приложения)"""
+        return self.interval > 0 and self._task is not None
+
+    def start(self):
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._probed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        async with httpx.AsyncClient(timeout=LLM_PROBE_TIMEOUT) as client:
+            while True:
+                await self.probe(client)
+                await asyncio.sleep(self.interval)
+
+    async def probe(self, client: httpx.AsyncClient):
+        """Пустой промпт: Ollama загружает модель (если нужно) и продлевает keep_alive"""
+        started = time.perf_counter()
+        try:
+            response = await client.post(OLLAMA_API, json={
+                "model": MODEL_NAME, "prompt": "", "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE,
+            })
+            response.raise_for_status()
+            body = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.failures += 1
+            self.error = str(e) or type(e).__name__
+            self.state = UNHEALTHY
+        else:
+            self.load_ms = (body.get("load_duration") or 0) / 1e6
+            self.failures = 0
+            self.error = None
+            self.state = READY
+        self.latency_ms = (time.perf_counter() - started) * 1000
+        self.last_probe_at = time.time()
+        self._probed.set()
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Готова ли модель; во время первого прогрева ждет его не дольше timeout"""
+        if not self.enabled:
+            return True
+        if self.state == STARTING:
+            try:
+                await asyncio.wait_for(self._probed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return self.state == READY
+
+    def status(self) -> dict:
+        return {
+            "model": MODEL_NAME,
+            "state": self.state if self.enabled else "unmonitored",
+            "last_probe_at": self.last_probe_at,
+            "latency_ms": self.latency_ms,
+            "load_ms": self.load_ms,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+
+lifecycle = LLMLifecycle()
+
+
+async def require_llm_ready():
+    """Dependency для маршрутов с ИИ: dependencies=[Depends(require_llm_ready)]"""
+    if await lifecycle.wait_ready(LLM_READY_WAIT):
+        return
+    detail = "Модель ИИ недоступна" if lifecycle.state == UNHEALTHY else "Модель ИИ загружается"
+    raise HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(math.ceil(lifecycle.interval))},
+    )
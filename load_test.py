@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Нагрузочное тестирование API (заменяет ручной test_endpoints.py).
+
+Регистрирует и логинит пользователей, затем с заданной частотой (open-loop,
+запросы отправляются по расписанию независимо от ответов) загружает выписки,
+пишет в чат и запрашивает /my-files. В конце печатает по каждому эндпоинту
+пропускную способность, p50/p95/p99 и долю ошибок.
+
+Без GPU поднимите fake_ollama.py и укажите его в OLLAMA_API:
+    python fake_ollama.py --port 11434 &
+    OLLAMA_API=http://localhost:11434/api/generate uvicorn main:app &
+    python load_test.py --rps 20 --duration 60 --users 20
+
+    python load_test.py --smoke   # один проход по всем эндпоинтам (как старый test_endpoints.py)
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+import bench_data
+
+BASE_URL = "http://localhost:8000"
+
+# Сценарий: (эндпоинт, вес)
+DEFAULT_MIX = {"analyze-expenses": 2, "chat": 3, "my-files": 5}
+
+
+class Stats:
+    """Латентности и ошибки по эндпоинтам"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, elapsed: float, status: int):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+        if status >= 400:
+            self.errors[name] += 1
+
+    def report(self, wall: float):
+        print(f"\n{'endpoint':<20}{'count':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            count = len(values)
+            print(
+                f"{name:<20}{count:>8}{count / wall:>8.1f}"
+                f"{percentile(values, 50) * 1000:>10.1f}"
+                f"{percentile(values, 95) * 1000:>10.1f}"
+                f"{percentile(values, 99) * 1000:>10.1f}"
+                f"{self.errors[name] / count:>9.1%}"
+            )
+        for name in sorted(self.statuses):
+            codes = ", ".join(f"{code}: {n}" for code, n in sorted(self.statuses[name].items()))
+            print(f"  {name}: {codes}")
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+async def timed(stats: Stats, name: str, coro):
+    started = time.perf_counter()
+    try:
+        response = await coro
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 599
+    stats.record(name, time.perf_counter() - started, status)
+    return response
+
+
+async def create_user(client: httpx.AsyncClient, stats: Stats, run_id: str, i: int) -> str:
+    """Регистрирует пользователя и возвращает токен"""
+    username = f"load_{run_id}_{i}"
+    password = "loadtest123"
+    await timed(stats, "register", client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": password,
+    }))
+    response = await timed(stats, "login", client.post("/login", json={
+        "username": username, "password": password,
+    }))
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+def make_request(client: httpx.AsyncClient, name: str, token: str, statement: bytes):
+    headers = {"Authorization": f"Bearer {token}"}
+    if name == "analyze-expenses":
+        files = {"file": ("statement.csv", statement, "text/csv")}
+        return client.post("/analyze-expenses", headers=headers, files=files)
+    if name == "chat":
+        return client.post("/chat", headers=headers, json={"message": "Как сократить расходы на продукты?"})
+    if name == "my-files":
+        return client.get("/my-files", headers=headers)
+    raise ValueError(f"Неизвестный эндпоинт: {name}")
+
+
+async def run_load(args):
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    statement = bench_data.make_csv(args.rows)
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_inflight)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        tokens = await asyncio.gather(*(create_user(client, stats, run_id, i) for i in range(args.users)))
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            print("❌ Не удалось залогинить ни одного пользователя")
+            stats.report(1)
+            return
+
+        names = list(args.mix)
+        weights = [args.mix[n] for n in names]
+        inflight = asyncio.Semaphore(args.max_inflight)
+        tasks = []
+        dropped = 0
+
+        async def one():
+            try:
+                name = rng.choices(names, weights)[0]
+                await timed(stats, name, make_request(client, name, rng.choice(tokens), statement))
+            finally:
+                inflight.release()
+
+        started = time.perf_counter()
+        interval = 1 / args.rps
+        next_at = started
+        while next_at - started < args.duration:
+            await asyncio.sleep(max(0, next_at - time.perf_counter()))
+            if inflight.locked():
+                dropped += 1  # клиент не успевает — фиксируем, а не сдвигаем расписание
+            else:
+                await inflight.acquire()
+                tasks.append(asyncio.create_task(one()))
+            next_at += interval
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+
+    print(f"Пользователей: {len(tokens)}, целевой RPS: {args.rps}, длительность: {wall:.1f} с")
+    print(f"Отправлено: {len(tasks)}, пропущено из-за --max-inflight: {dropped}")
+    stats.report(wall)
+
+
+async def run_smoke(args):
+    """Один проход по всем эндпоинтам с выводом ответов"""
+    stats = Stats()
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        token = await create_user(client, stats, uuid.uuid4().hex[:8], 0)
+        if not token:
+            print("❌ Ошибка входа!")
+            return
+        headers = {"Authorization": f"Bearer {token}"}
+        me = await timed(stats, "me", client.get("/me", headers=headers))
+        print(f"Me: {me.status_code} {me.json()}")
+        for name in ("analyze-expenses", "chat", "my-files"):
+            response = await timed(stats, name, make_request(client, name, token, bench_data.make_csv(5)))
+            body = response.text if response is not None else "нет ответа"
+            print(f"{name}: {response.status_code if response is not None else 599} {body[:200]}")
+    stats.report(1)
+
+
+def parse_mix(value: str) -> dict:
+    """"chat=3,my-files=5" -> {"chat": 3, "my-files": 5}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--rps", type=float, default=10, help="целевая частота запросов")
+    parser.add_argument("--duration", type=float, default=30, help="длительность, с")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200, help="строк в загружаемой выписке")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="веса эндпоинтов, например analyze-expenses=2,chat=3,my-files=5")
+    parser.add_argument("--max-inflight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--smoke", action="store_true", help="один проход по всем эндпоинтам")
+    args = parser.parse_args()
+
+    asyncio.run(run_smoke(args) if args.smoke else run_load(args))
+
+
+if __name__ == "__main__":
+    main()
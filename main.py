@@ -1,38 +1,58 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Session, select
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from sqlmodel import Session, select, func, update, insert
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import pandas as pd
-import pdfplumber
-import requests
 import os
-import re
+import io
+import csv
 import json
-from io import BytesIO
-from datetime import datetime, timedelta
-from typing import List
+import math
+import asyncio
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 
 # Импорты для аутентификации и базы данных
 from models import (
-    User, UploadedFile, UserCreate, UserLogin, UserResponse, 
+    User, UploadedFile, AnalysisBatch, SpendingAggregate, CategoryStat, Transaction, CategoryTotal, UserCreate, UserLogin, UserResponse, 
     Token, FileAnalysisResponse, AdminReportItem
 )
 from simple_auth import (
     authenticate_user, create_access_token, get_current_user, 
-    get_current_admin_user, get_password_hash
+    get_current_admin_user, get_optional_user, get_password_hash
 )
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-from database_sqlite import get_session, create_db_and_tables
+from database_sqlite import engine, get_session, create_db_and_tables
+import advice
+import chat_sessions
+import llm
+import running_aggregates
+import search
+from compression import CompressionMiddleware
+from deadline import DEADLINE_HEADER, Deadline, request_deadline
+from conditional import make_etag, is_not_modified, set_validators, not_modified_response
+from profiling import ProfilingMiddleware, list_profiles, profile_path, profile_summary
+from statement_templates import format_stats
+from rate_limit import rate_limited, check_llm_quota, record_llm_usage, llm_usage_report
+from llm_lifecycle import lifecycle, require_llm_ready
 
 # === Инициализация приложения ===
 app = FastAPI(title="AI Bank Backend", version="1.0.0")
 
 # === Загружаем .env ===
 load_dotenv()
-OLLAMA_API = os.getenv("OLLAMA_API", "http://localhost:11434/api/generate")
-MODEL_NAME = os.getenv("MODEL_NAME", "mistral")
+
+# pandas/pdfplumber импортируются лениво при первой загрузке файла, чтобы воркер
+# стартовал быстрее. PRELOAD_PARSERS=1 импортирует их сразу — для gunicorn --preload,
+# где модули загружаются один раз в master-процессе до fork.
+if os.getenv("PRELOAD_PARSERS", "0") == "1":
+    import analysis  # noqa: F401
 
 # === Настройка CORS ===
 app.add_middleware(
@@ -43,53 +63,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# === Создание таблиц и seed данных при запуске ===
+# === Сжатие ответов (brotli/gzip от COMPRESS_MIN_SIZE байт) ===
+app.add_middleware(CompressionMiddleware)
+
+# === Профилирование запросов (X-Profile / PROFILE_SAMPLE_RATE) ===
+app.add_middleware(ProfilingMiddleware)
+
+# === Создание таблиц при запуске ===
+# Seed данные создаются отдельной командой: python bulk_seed.py
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
-    
-    # Создаем seed данные
-    try:
-        from simple_seed import create_simple_seed_data
-        create_simple_seed_data()
-    except Exception as e:
-        print(f"Ошибка при создании seed данных: {e}")
+
+
+# === Прогрев модели и фоновые проверки Ollama (llm_lifecycle.py) ===
+@app.on_event("startup")
+async def start_llm_lifecycle():
+    lifecycle.start()
+
+
+@app.on_event("shutdown")
+async def stop_llm_lifecycle():
+    await lifecycle.stop()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
 
 
 # === CHAT ===
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None  # продолжить сессию; без него с токеном создается новая
 
 
-@app.post("/chat")
-async def chat(request: ChatRequest):
-    """Простой чат через Ollama."""
-    try:
-        payload = {"model": MODEL_NAME, "prompt": request.message}
-        response = requests.post(OLLAMA_API, json=payload, timeout=120, stream=True)
+def circuit_open_response(error: llm.CircuitOpenError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(math.ceil(error.retry_after))})
 
-        if not response.ok:
-            raise HTTPException(
-                status_code=500, detail=f"Ollama error: {response.text}"
-            )
 
-        full_text = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    text = line.decode("utf-8").strip()
-                    if text.startswith("{") and '"response"' in text:
-                        match = re.search(r'"response"\s*:\s*"([^"]*)"', text)
-                        if match:
-                            full_text += match.group(1)
-                except Exception:
-                    continue
-
-        return {"reply": full_text.strip() or "Нет ответа от модели."}
+@app.post("/chat", dependencies=[Depends(rate_limited("chat")), Depends(require_llm_ready)])
+def chat(
+    request: ChatRequest,
+    current_user: Optional[User] = Depends(get_optional_user),
+    session: Session = Depends(get_session)
+):
+    """Чат через Ollama. С токеном — расход учитывается в дневной квоте пользователя,
+    а диалог хранится на сервере: ответ содержит session_id для следующего хода.
+    Без токена каждый запрос независим.
+
+    Обычная def: FastAPI выполняет ее в пуле потоков, поэтому ожидание ИИ, квота
+    и хранилище сессий не блокируют event loop.
+    """
+    user_id = current_user.id if current_user else None
+    if user_id is None:
+        if request.session_id:
+            raise HTTPException(401, "Сессии чата доступны только с токеном")
+        try:
+            full_text, _ = llm.generate_with_usage(request.message)
+            return {"reply": full_text or "Нет ответа от модели."}
+        except llm.CircuitOpenError as e:
+            raise circuit_open_response(e)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
+
+    check_llm_quota(session, user_id)
+    if request.session_id:
+        session_id, state = request.session_id, chat_sessions.load(user_id, request.session_id)
+        if state is None:
+            raise HTTPException(404, "Сессия чата не найдена или истекла")
+    else:
+        session_id, state = chat_sessions.create(user_id)
+    try:
+        prompt, context = chat_sessions.prepare(state, request.message)
+        full_text, usage = llm.generate_with_usage(prompt, context=context)
+        record_llm_usage(session, user_id, usage)
+        session.commit()
+        reply = full_text or "Нет ответа от модели."
+        chat_sessions.save(user_id, session_id, state, request.message, reply, usage.get("context"))
+        return {"reply": reply, "session_id": session_id, "turn": state["turns"]}
+    except llm.CircuitOpenError as e:
+        raise circuit_open_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
 
+@app.get("/chat/sessions")
+def get_chat_sessions(current_user: User = Depends(get_current_user)):
+    """Сессии чата пользователя, последние активные — первыми"""
+    return chat_sessions.list_sessions(current_user.id)
+
+
+@app.delete("/chat/sessions/{session_id}")
+def delete_chat_session(session_id: str, current_user: User = Depends(get_current_user)):
+    chat_sessions.delete(current_user.id, session_id)
+    return {"deleted": session_id}
+
+
 # === АУТЕНТИФИКАЦИЯ ===
 @app.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate, session: Session = Depends(get_session)):
@@ -144,187 +215,698 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+# === СУММЫ ПО КАТЕГОРИЯМ (таблица CategoryStat) ===
+def add_category_stats(session: Session, uploaded_file: UploadedFile, by_category: list):
+    """Сохраняет суммы по категориям файла строками CategoryStat (у файла уже должен быть id)"""
+    session.add_all(
+        CategoryStat(file_id=uploaded_file.id, user_id=uploaded_file.user_id,
+                     category=item["category"], amount=item["amount"])
+        for item in by_category
+    )
+
+
+def add_transactions(session: Session, uploaded_file: UploadedFile, chunks,
+                     deadline: Optional[Deadline] = None) -> int:
+    """Сохраняет разобранные строки выписки в Transaction (для выгрузки /export):
+    executemany на каждую пачку строк из analysis.iter_transaction_rows, затем
+    описания файла — в индекс поиска. После дедлайна следующие пачки не пишутся;
+    возвращает, сколько строк сохранено"""
+    connection = session.connection()
+    saved = 0
+    for rows in chunks:
+        if deadline is not None and deadline.passed():
+            break
+        for row in rows:
+            row["file_id"] = uploaded_file.id
+            row["user_id"] = uploaded_file.user_id
+        connection.execute(insert(Transaction), rows)
+        saved += len(rows)
+    search.index_transactions(connection, uploaded_file.id)
+    return saved
+
+
+def load_category_stats(session: Session, *where) -> Dict[int, str]:
+    """category_stats в прежнем формате (JSON строка) для файлов, одним запросом"""
+    statement = (
+        select(CategoryStat.file_id, CategoryStat.category, CategoryStat.amount)
+        .where(*where)
+        .order_by(CategoryStat.file_id, CategoryStat.id)
+    )
+    grouped = {}
+    for file_id, category, amount in session.exec(statement):
+        grouped.setdefault(file_id, []).append({"category": category, "amount": amount})
+    return {file_id: json.dumps(items, ensure_ascii=False) for file_id, items in grouped.items()}
+
+
+def top_categories(session: Session, limit: int, *where) -> List[CategoryTotal]:
+    """Категории с наибольшей суммой по всем файлам — агрегация в базе"""
+    total = func.sum(CategoryStat.amount)
+    statement = (
+        select(CategoryStat.category, total, func.count(func.distinct(CategoryStat.file_id)))
+        .where(*where)
+        .group_by(CategoryStat.category)
+        .order_by(func.abs(total).desc())
+        .limit(min(max(limit, 1), 100))
+    )
+    return [
+        CategoryTotal(category=category, amount=amount, files_count=files_count)
+        for category, amount, files_count in session.exec(statement)
+    ]
+
+
+# === ВЕРСИЯ ФАЙЛОВ ПОЛЬЗОВАТЕЛЯ (для ETag / Last-Modified) ===
+def bump_files_version(session: Session, user_id: int):
+    """Увеличивает User.files_version атомарным UPDATE (параллельные загрузки не теряют шаг)"""
+    session.exec(
+        update(User)
+        .where(User.id == user_id)
+        .values(files_version=func.coalesce(User.files_version, 0) + 1, files_updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def admin_reports_validators(session: Session):
+    """Сводка по таблице user: новые пользователи и загрузки меняют ETag и Last-Modified отчета"""
+    users_count, max_id, versions, updated_at, created_at = session.exec(
+        select(func.count(User.id), func.max(User.id),
+               func.sum(func.coalesce(User.files_version, 0)),
+               func.max(User.files_updated_at), func.max(User.created_at))
+    ).one()
+    last_modified = max((d for d in (updated_at, created_at) if d is not None), default=None)
+    return (users_count, max_id, versions), last_modified
+
+
+# === ПРОЕКЦИЯ ПОЛЕЙ ДЛЯ СПИСКОВ ФАЙЛОВ ===
+FILE_FIELDS = tuple(FileAnalysisResponse.model_fields)
+# Легкое представление: без текста анализа и статистики категорий
+LIST_VIEW_FIELDS = ("id", "filename", "upload_date", "total_amount", "transactions_count", "batch_id")
+
+
+def parse_fields(fields: Optional[str], view: Optional[str]) -> tuple:
+    """Поля FileAnalysisResponse для ответа: fields=a,b,c, view=list или все (по умолчанию)"""
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(requested) - set(FILE_FIELDS))
+        if unknown:
+            raise HTTPException(400, f"Неизвестные поля: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(["id", *requested]))
+    if view == "list":
+        return LIST_VIEW_FIELDS
+    if view not in (None, "full"):
+        raise HTTPException(400, "view может быть full или list")
+    return FILE_FIELDS
+
+
+def select_files(session: Session, fields: tuple, extra: tuple = (), *where) -> List[dict]:
+    """Выбирает из uploadedfile только колонки fields + extra (category_stats — отдельной таблицей)"""
+    columns = [c for c in dict.fromkeys((*fields, *extra)) if c != "category_stats"]
+    statement = (
+        select(*(getattr(UploadedFile, c) for c in columns))
+        .where(*where)
+        .order_by(UploadedFile.id)
+    )
+    rows = session.exec(statement).all()
+    if len(columns) == 1:  # select одной колонки возвращает скаляры
+        rows = [(row,) for row in rows]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def file_response(row: dict, fields: tuple, category_stats: Dict[int, str]) -> FileAnalysisResponse:
+    """FileAnalysisResponse только с полями fields (остальные не попадут в ответ)"""
+    values = {f: row[f] for f in fields if f != "category_stats"}
+    if "category_stats" in fields:
+        values["category_stats"] = category_stats.get(row["id"])
+    return FileAnalysisResponse(**values)
+
+
+# === НАКОПИТЕЛЬНЫЕ ИТОГИ (инкрементальный анализ) ===
+def fold_into_aggregates(session: Session, user_id: int, delta: dict) -> dict:
+    """Прибавляет дельту выписки к итогам пользователя (коммит — вместе с файлом).
+
+    Возвращает разницу с предыдущим периодом (для промпта) и обновленную сводку.
+    """
+    record = session.get(SpendingAggregate, user_id)
+    state = json.loads(record.state) if record else running_aggregates.empty_state()
+
+    diff = running_aggregates.period_diff(state, delta)
+    state = running_aggregates.merge_delta(state, delta)
+
+    if record is None:
+        record = SpendingAggregate(user_id=user_id, state="")
+    record.state = json.dumps(state, ensure_ascii=False)
+    record.updated_at = datetime.utcnow()
+    session.add(record)
+    return {"diff": diff, **running_aggregates.summary(state)}
+
+
+@app.get("/my-aggregates")
+async def get_my_aggregates(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Накопительные итоги пользователя: суммы по категориям, по месяцам и скользящее среднее"""
+    record = session.get(SpendingAggregate, current_user.id)
+    state = json.loads(record.state) if record else running_aggregates.empty_state()
+    return running_aggregates.summary(state)
+
+
+# === СОВЕТЫ: ИИ В ПРЕДЕЛАХ БЮДЖЕТА ВРЕМЕНИ, ИНАЧЕ ПРАВИЛА (advice.py) ===
+# Сколько секунд загрузка выписки ждет ИИ; дальше клиент получает совет по правилам,
+# а ответ ИИ, когда придет, заменяет его в сохраненном файле (advice_source: pending -> llm)
+LLM_ADVICE_BUDGET = float(os.getenv("LLM_ADVICE_BUDGET", "10"))
+ADVICE_LLM, ADVICE_RULES, ADVICE_PENDING = "llm", "rules", "pending"
+
+
+async def advise(session: Session, user_id: int, prompt: str, rules, deadline: Optional[Deadline] = None) -> tuple:
+    """(текст совета, источник, future ответа ИИ для fill_late_advice или None).
+
+    rules — функция без аргументов, строящая совет по правилам. Она отвечает,
+    если размыкатель открыт, модель недоступна, ИИ вернул ошибку или пустой
+    ответ либо не уложился в LLM_ADVICE_BUDGET или в остаток до дедлайна
+    запроса (тогда это отмечается в deadline.partial["advice"]).
+    """
+    started = time.monotonic()
+    budget = LLM_ADVICE_BUDGET
+    # partial отмечаем, только если ИИ не дождались из-за дедлайна, а не из-за настройки
+    cut_by_deadline = deadline is not None and deadline.remaining() < budget
+    if cut_by_deadline:
+        budget = deadline.remaining()
+    if budget <= 0:
+        if cut_by_deadline:
+            deadline.cut("advice", llm="skipped")
+        return rules(), ADVICE_RULES, None
+    if not await lifecycle.wait_ready(budget):
+        return rules(), ADVICE_RULES, None
+    future = asyncio.get_running_loop().run_in_executor(None, llm.generate_with_usage, prompt)
+    remaining = max(budget - (time.monotonic() - started), 0.0)
+    try:
+        full_text, usage = await asyncio.wait_for(asyncio.shield(future), remaining)
+    except asyncio.TimeoutError:
+        if cut_by_deadline:
+            deadline.cut("advice", llm="pending")
+        return rules(), ADVICE_PENDING, future
+    except Exception:
+        return rules(), ADVICE_RULES, None
+    await run_in_threadpool(record_llm_usage, session, user_id, usage)
+    if not full_text:
+        return rules(), ADVICE_RULES, None
+    return full_text, ADVICE_LLM, None
+
+
+def fill_late_advice(future, user_id: int, file_ids: list, batch_id: Optional[int] = None):
+    """Когда ответ ИИ придет, store_late_advice запишет его в файлы (и пакет) в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    future.add_done_callback(
+        lambda done: loop.run_in_executor(None, store_late_advice, done, user_id, file_ids, batch_id)
+    )
+
+
+def store_late_advice(future, user_id: int, file_ids: list, batch_id: Optional[int]):
+    """Заменяет совет по правилам ответом ИИ; при ошибке ИИ совет по правилам остается окончательным"""
+    try:
+        full_text, usage = future.result()
+    except Exception:
+        full_text, usage = "", None
+    values = {"ai_analysis": full_text, "advice_source": ADVICE_LLM} if full_text else {"advice_source": ADVICE_RULES}
+    with Session(engine) as session:
+        session.exec(update(UploadedFile).where(UploadedFile.id.in_(file_ids)).values(**values))
+        if batch_id is not None:
+            session.exec(update(AnalysisBatch).where(AnalysisBatch.id == batch_id).values(**values))
+        if usage is not None:
+            record_llm_usage(session, user_id, usage)
+        bump_files_version(session, user_id)
+        session.commit()
+
+
+# === ДЕДЛАЙН ЗАПРОСА: ЧТО НЕ УСПЕЛИ — ПРОПУСКАЕМ (deadline.py) ===
+def deadline_exceeded(deadline: Deadline) -> HTTPException:
+    """504, когда к дедлайну не разобрано ни одной строки — отвечать нечем"""
+    return HTTPException(504, f"Выписка не разобрана за {deadline.seconds:g} с "
+                              f"(REQUEST_DEADLINE или заголовок {DEADLINE_HEADER})")
+
+
+def detect_insights(batch, deadline: Deadline) -> Optional[dict]:
+    """insights.detect, если время до дедлайна еще есть; иначе None"""
+    import insights
+
+    if deadline.expired():
+        deadline.cut("insights", skipped=True)
+        return None
+    return insights.detect(batch)
+
+
 # === АНАЛИЗ РАСХОДОВ (ОБНОВЛЕННЫЙ) ===
-@app.post("/analyze-expenses")
+@app.post("/analyze-expenses", dependencies=[Depends(rate_limited("analyze"))])
 async def analyze_expenses(
     file: UploadFile = File(...),
+    incremental: bool = False,
+    period: str = "day",
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    deadline: Deadline = Depends(request_deadline)
 ):
-    """Загружает .pdf/.csv/.xlsx, анализирует расходы, сохраняет в БД и возвращает советы"""
-    filename = file.filename.lower()
+    """Загружает .pdf/.csv/.xlsx, анализирует расходы, сохраняет в БД и возвращает советы.
+
+    incremental=true — выписка добавляется к накопительным итогам пользователя,
+    а ИИ получает только изменения относительно предыдущих месяцев.
+    period — шаг by_date: day, week, month или auto (по длине выписки).
+    Что не успели до дедлайна (REQUEST_DEADLINE / X-Request-Deadline), пропускается:
+    ответ — с partial=true и partial_details (deadline.py).
+
+    Разбор, итоги и запись в SQLite — синхронные и долгие, поэтому идут в пуле
+    потоков (run_in_threadpool): event loop тем временем отвечает другим запросам.
+    """
+    import analysis  # pandas/pdfplumber грузятся при первой загрузке файла
+
+    if period not in analysis.DATE_PERIODS:
+        raise HTTPException(400, f"period может быть одним из: {', '.join(analysis.DATE_PERIODS)}")
+    await run_in_threadpool(check_llm_quota, session, current_user.id)
     try:
         content = await file.read()
 
-        # --- 1. Парсим файл ---
-        if filename.endswith(".xlsx"):
-            df = pd.read_excel(BytesIO(content))
-        elif filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(content))
-        elif filename.endswith(".pdf"):
-            df = parse_pdf(BytesIO(content))
-        else:
-            raise HTTPException(400, "Поддерживаются только .xlsx, .csv, .pdf")
+        def prepare():
+            # --- 1. Парсим файл ---
+            try:
+                batch = analysis.load_statement(file.filename, content, deadline)
+            except ValueError as e:
+                if "parse" in deadline.partial:
+                    raise deadline_exceeded(deadline)
+                raise HTTPException(400, str(e))
 
-        if df.empty:
-            raise HTTPException(400, "Файл не содержит данных")
+            # --- 2. Регулярные платежи и необычные операции по всей выписке, промпт для AI ---
+            found = detect_insights(batch, deadline)
+            running = None
+            if incremental:
+                running = fold_into_aggregates(session, current_user.id, analysis.period_delta(batch))
+                prompt = analysis.build_diff_prompt(running["diff"], found)
+            else:
+                prompt = analysis.build_prompt(batch, found)
 
-        df.columns = [col.lower().strip() for col in df.columns]
+            # --- 3. Подготавливаем данные для графиков ---
+            return batch, found, running, prompt, analysis.aggregate(batch, period)
 
-        if "category" not in df.columns:
-            if "description" in df.columns:
-                df.rename(columns={"description": "category"}, inplace=True)
-            else:
-                df["category"] = "Не указано"
-
-        if "amount" not in df.columns:
-            for col in df.columns:
-                if df[col].apply(lambda x: isinstance(x, (int, float))).any():
-                    df.rename(columns={col: "amount"}, inplace=True)
-                    break
-
-        if "amount" not in df.columns:
-            raise HTTPException(400, "Не найдена колонка с суммой")
-
-        # --- 2. Отправляем часть данных в AI ---
-        sample_data = df.head(20).to_dict(orient="records")
-        prompt = f"""
-        Вот пример расходов пользователя:
-        {sample_data}
-
-        Проанализируй траты и ответь:
-        1. Какие категории перерасходуют бюджет?
-        2. Какие советы по сокращению расходов?
-        3. Какую сумму можно было бы сэкономить ежемесячно?
-        """
-
-        payload = {"model": MODEL_NAME, "prompt": prompt}
-        response = requests.post(OLLAMA_API, json=payload, timeout=120, stream=True)
-
-        if not response.ok:
-            raise HTTPException(500, f"Ollama error: {response.text}")
-
-        full_text = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    text = line.decode("utf-8").strip()
-                    if text.startswith("{") and '"response"' in text:
-                        match = re.search(r'"response"\s*:\s*"([^"]*)"', text)
-                        if match:
-                            full_text += match.group(1)
-                except Exception:
-                    continue
-
-        # --- 3. Подготавливаем данные для графиков ---
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-        df = df.dropna(subset=["amount"])
-
-        # По категориям
-        by_category = (
-            df.groupby("category")["amount"]
-            .sum()
-            .reset_index()
+        batch, found, running, prompt, stats = await run_in_threadpool(prepare)
+        by_category = stats["by_category"]
+        total_amount = stats["total_amount"]
+        transactions_count = stats["transactions_count"]
+
+        # --- 4. Совет ИИ (или по правилам, если ИИ недоступен или не успел) ---
+        full_text, advice_source, pending = await advise(
+            session, current_user.id, prompt,
+            lambda: advice.rule_advice(by_category, stats["by_date"], running["diff"] if running else None),
+            deadline
         )
-        # Конвертируем индексы в строки и суммы в float
-        by_category = [
-            {"category": str(row["category"]), "amount": float(row["amount"])}
-            for _, row in by_category.iterrows()
-        ]
 
-        # По датам
-        if "date" in df.columns:
-            by_date = (
-                df.groupby("date")["amount"]
-                .sum()
-                .reset_index()
+        # --- 5. Сохраняем в базу данных ---
+        def save() -> UploadedFile:
+            uploaded_file = UploadedFile(
+                user_id=current_user.id,
+                filename=file.filename,
+                ai_analysis=full_text,
+                advice_source=advice_source,
+                total_amount=total_amount,
+                transactions_count=transactions_count
             )
-            # Конвертируем индексы в строки и суммы в float
-            by_date = [
-                {"date": str(row["date"]), "amount": float(row["amount"])}
-                for _, row in by_date.iterrows()
-            ]
-        else:
-            by_date = []
-
-        # Все транзакции
-        transactions = df.head(100).to_dict(orient="records")
-        # Конвертируем numpy типы в обычные Python типы
-        transactions = [
-            {
-                k: (float(v) if isinstance(v, (int, float)) and hasattr(v, 'dtype') else v)
-                for k, v in trans.items()
-            }
-            for trans in transactions
-        ]
 
-        # --- 4. Сохраняем в базу данных ---
-        # Конвертируем numpy типы в Python типы для корректной работы с БД
-        total_amount = float(df["amount"].sum())
-        transactions_count = int(len(df))
-        
-        uploaded_file = UploadedFile(
-            user_id=current_user.id,
-            filename=file.filename,
-            category_stats=json.dumps(by_category, ensure_ascii=False),
-            ai_analysis=full_text.strip() or "Нет ответа от модели.",
-            total_amount=total_amount,
-            transactions_count=transactions_count
-        )
-        
-        session.add(uploaded_file)
-        session.commit()
-        session.refresh(uploaded_file)
+            session.add(uploaded_file)
+            session.flush()
+            add_category_stats(session, uploaded_file, by_category)
+            saved = add_transactions(session, uploaded_file, analysis.iter_transaction_rows(batch), deadline)
+            if saved < transactions_count:
+                deadline.cut("transactions", saved=saved, total=transactions_count)
+            bump_files_version(session, current_user.id)
+            session.commit()
+            session.refresh(uploaded_file)
+            return uploaded_file
 
-        return {
+        uploaded_file = await run_in_threadpool(save)
+        if pending is not None:
+            fill_late_advice(pending, current_user.id, [uploaded_file.id])
+
+        result = {
             "file_id": uploaded_file.id,
-            "reply": full_text.strip() or "Нет ответа от модели.",
-            "transactions": transactions,
+            "reply": full_text,
+            "advice_source": advice_source,
+            "transactions": stats["transactions"],
             "by_category": by_category,
-            "by_date": by_date,
+            "by_date": stats["by_date"],
+            "period": stats["period"],
+            "insights": found,
             "total_amount": total_amount,
-            "transactions_count": transactions_count
+            "transactions_count": transactions_count,
+            **deadline.report()
         }
+        if running is not None:
+            result["running"] = running
+        return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка обработки: {str(e)}")
 
 
+# === ПАКЕТНЫЙ АНАЛИЗ ===
+# Разбор PDF/XLSX упирается в CPU, поэтому файлы пакета разбираются в пуле
+# процессов (потоки уперлись бы в GIL). Пул создается при первой пакетной загрузке.
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "24"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or min(os.cpu_count() or 1, MAX_BATCH_FILES)
+_parse_pool = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+
+@app.post("/analyze-expenses/batch", dependencies=[Depends(rate_limited("batch"))])
+async def analyze_expenses_batch(
+    files: List[UploadFile] = File(...),
+    incremental: bool = False,
+    period: str = "day",
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    deadline: Deadline = Depends(request_deadline)
+):
+    """Загружает несколько выписок сразу: параллельный разбор, объединение без
+    дублей на стыках периодов и один запрос к ИИ по общей сводке.
+    incremental=true — как в /analyze-expenses, объединенные данные идут в накопительные итоги.
+    period — шаг by_date, как в /analyze-expenses. Файлы, не разобранные к дедлайну,
+    пропускаются (partial_details.parse.files_skipped).
+    Объединение, итоги и запись в SQLite — в пуле потоков, как в /analyze-expenses."""
+    import analysis
+    from statement_templates import record_format
+
+    if period not in analysis.DATE_PERIODS:
+        raise HTTPException(400, f"period может быть одним из: {', '.join(analysis.DATE_PERIODS)}")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(400, f"Не больше {MAX_BATCH_FILES} файлов за раз")
+    await run_in_threadpool(check_llm_quota, session, current_user.id)
+
+    try:
+        contents = [await f.read() for f in files]
+
+        # --- 1. Параллельно парсим файлы ---
+        # Воркеру передается момент дедлайна по time.time(): файл может ждать в очереди пула.
+        # Воркеры останавливаются к нему сами; ждем их результатов еще половину резерва
+        loop = asyncio.get_running_loop()
+        pool = get_parse_pool()
+        timeout = deadline.remaining()
+        expires_at = time.time() + timeout if math.isfinite(timeout) else None
+        futures = [
+            loop.run_in_executor(pool, analysis.parse_in_worker, f.filename, content, expires_at)
+            for f, content in zip(files, contents)
+        ]
+        done, not_done = await asyncio.wait(
+            futures, timeout=timeout + deadline.reserve / 2 if expires_at is not None else None
+        )
+        for future in not_done:
+            future.cancel()  # еще не начатые файлы не разбираются
+        batches, parsed_files, cut_files, formats_seen = [], [], {}, []
+        for f, future in zip(files, futures):
+            if future not in done:
+                continue
+            error = future.exception()
+            if isinstance(error, ValueError):
+                raise HTTPException(400, f"{f.filename}: {error}")
+            if error is not None:
+                raise error
+            statement, formats, cut = future.result()
+            formats_seen.extend(formats)
+            if cut:
+                cut_files[f.filename] = cut
+            batches.append(statement)
+            parsed_files.append(f)
+        if cut_files:
+            deadline.cut("parse", files=cut_files)
+        if not_done:
+            deadline.cut("parse", files_skipped=[f.filename for f, future in zip(files, futures) if future in not_done])
+        if not batches:
+            raise deadline_exceeded(deadline)
+        files = parsed_files  # дальше — только разобранные файлы
+
+        def prepare():
+            for name in formats_seen:
+                record_format(name)
+
+            # --- 2. Итоги по каждому файлу и по объединенным данным ---
+            file_stats = [analysis.aggregate(statement) for statement in batches]
+            merged, duplicates_removed = analysis.merge_statements(batches)
+            stats = analysis.aggregate(merged, period)
+            found = detect_insights(merged, deadline)
+
+            # --- 3. Промпт для одного запроса к ИИ по общей сводке ---
+            files_summary = [
+                {"filename": f.filename, "transactions_count": s["transactions_count"], "total_amount": s["total_amount"]}
+                for f, s in zip(files, file_stats)
+            ]
+            running = None
+            if incremental:
+                delta = analysis.period_delta(merged)
+                delta["files_count"] = len(files)
+                running = fold_into_aggregates(session, current_user.id, delta)
+                prompt = analysis.build_diff_prompt(running["diff"], found)
+            else:
+                prompt = analysis.build_batch_prompt(stats, files_summary, found)
+            return file_stats, duplicates_removed, stats, found, files_summary, running, prompt
+
+        file_stats, duplicates_removed, stats, found, files_summary, running, prompt = await run_in_threadpool(prepare)
+        full_text, advice_source, pending = await advise(
+            session, current_user.id, prompt,
+            lambda: advice.rule_advice(stats["by_category"], stats["by_date"], running["diff"] if running else None),
+            deadline
+        )
+
+        # --- 4. Сохраняем пакет и по записи на каждый файл ---
+        def save() -> tuple:
+            """(id пакета, id файлов) — id известны после flush, до истечения объектов на commit"""
+            batch = AnalysisBatch(
+                user_id=current_user.id,
+                files_count=len(files),
+                duplicates_removed=duplicates_removed,
+                category_stats=json.dumps(stats["by_category"], ensure_ascii=False),
+                ai_analysis=full_text,
+                advice_source=advice_source,
+                total_amount=stats["total_amount"],
+                transactions_count=stats["transactions_count"]
+            )
+            session.add(batch)
+            session.flush()
+
+            uploaded_files = [
+                UploadedFile(
+                    user_id=current_user.id,
+                    filename=f.filename,
+                    ai_analysis=full_text,
+                    advice_source=advice_source,
+                    total_amount=s["total_amount"],
+                    transactions_count=s["transactions_count"],
+                    batch_id=batch.id
+                )
+                for f, s in zip(files, file_stats)
+            ]
+            session.add_all(uploaded_files)
+            session.flush()
+            saved = 0
+            for uploaded_file, s, statement in zip(uploaded_files, file_stats, batches):
+                add_category_stats(session, uploaded_file, s["by_category"])
+                saved += add_transactions(session, uploaded_file, analysis.iter_transaction_rows(statement), deadline)
+            total = sum(s["transactions_count"] for s in file_stats)
+            if saved < total:
+                deadline.cut("transactions", saved=saved, total=total)
+            bump_files_version(session, current_user.id)
+            ids = batch.id, [u.id for u in uploaded_files]
+            session.commit()
+            return ids
+
+        batch_id, file_ids = await run_in_threadpool(save)
+        if pending is not None:
+            fill_late_advice(pending, current_user.id, file_ids, batch_id)
+
+        result = {
+            "batch_id": batch_id,
+            "file_ids": file_ids,
+            "files": [dict(summary, file_id=file_id) for summary, file_id in zip(files_summary, file_ids)],
+            "reply": full_text,
+            "advice_source": advice_source,
+            "transactions": stats["transactions"],
+            "by_category": stats["by_category"],
+            "by_date": stats["by_date"],
+            "period": stats["period"],
+            "insights": found,
+            "total_amount": stats["total_amount"],
+            "transactions_count": stats["transactions_count"],
+            "duplicates_removed": duplicates_removed,
+            **deadline.report()
+        }
+        if running is not None:
+            result["running"] = running
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка обработки: {str(e)}")
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch(
+    batch_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Пакетный анализ текущего пользователя и id его файлов"""
+    batch = session.get(AnalysisBatch, batch_id)
+    if batch is None or batch.user_id != current_user.id:
+        raise HTTPException(404, "Пакет не найден")
+    file_ids = session.exec(select(UploadedFile.id).where(UploadedFile.batch_id == batch_id)).all()
+    return {**batch.model_dump(), "file_ids": list(file_ids)}
+
+
+# === ВЫГРУЗКА ТРАНЗАКЦИЙ (Parquet / Arrow) ===
+def export_response(format: str, user_id: Optional[int], name: str) -> StreamingResponse:
+    """Потоковый ответ с файлом выгрузки; строки читаются из базы пачками (export.py)"""
+    import export  # pyarrow грузится только при первой выгрузке
+
+    if format not in export.FORMATS:
+        raise HTTPException(400, f"Неизвестный формат: {format} (доступны: {', '.join(export.FORMATS)})")
+    if not export.available():
+        raise HTTPException(503, "Выгрузка недоступна: не установлен пакет pyarrow")
+    media_type, extension = export.FORMATS[format]
+    return StreamingResponse(
+        export.iter_export(format, user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    )
+
+
+# === ПОТОКОВАЯ ВЫГРУЗКА ОТЧЕТОВ (NDJSON / CSV) ===
+# Сколько строк курсор забирает за раз и с какого размера буфер уходит клиенту
+REPORT_STREAM_ROWS = int(os.getenv("REPORT_STREAM_ROWS", "1000"))
+REPORT_STREAM_CHUNK = 64 * 1024
+REPORT_CSV_COLUMNS = ("user_id", "username", "email", "files_count", "total_uploaded_amount", "last_upload")
+
+
+def iter_user_reports(fields: tuple):
+    """AdminReportItem по одному пользователю, прямо из курсора базы.
+
+    Пользователи и их файлы читаются одним запросом (LEFT JOIN, сортировка по
+    пользователю), суммы по категориям — вторым курсором в том же порядке;
+    в памяти одновременно только файлы одного пользователя.
+    """
+    file_columns = [c for c in dict.fromkeys((*fields, "total_amount", "upload_date")) if c != "category_stats"]
+    file_id_index = 3 + file_columns.index("id")
+    statement = (
+        select(User.id, User.username, User.email, *(getattr(UploadedFile, c) for c in file_columns))
+        .outerjoin(UploadedFile, UploadedFile.user_id == User.id)
+        .order_by(User.id, UploadedFile.id)
+    )
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=REPORT_STREAM_ROWS)
+        stats = iter(())
+        if "category_stats" in fields:
+            stats = iter(conn.execute(
+                select(CategoryStat.user_id, CategoryStat.file_id, CategoryStat.category, CategoryStat.amount)
+                .order_by(CategoryStat.user_id, CategoryStat.file_id, CategoryStat.id)
+            ))
+        pending_stat = next(stats, None)
+
+        for user_id, rows in itertools.groupby(conn.execute(statement), key=lambda row: row[0]):
+            rows = list(rows)
+            # У пользователя без файлов LEFT JOIN дает одну строку с пустым id файла
+            files = [dict(zip(file_columns, row[3:])) for row in rows if row[file_id_index] is not None]
+
+            # Суммы по категориям этого пользователя: второй курсор догоняет первый
+            grouped = {}
+            while pending_stat is not None and pending_stat[0] <= user_id:
+                if pending_stat[0] == user_id:
+                    grouped.setdefault(pending_stat[1], []).append(
+                        {"category": pending_stat[2], "amount": pending_stat[3]})
+                pending_stat = next(stats, None)
+            category_stats = {file_id: json.dumps(items, ensure_ascii=False) for file_id, items in grouped.items()}
+
+            yield AdminReportItem(
+                user_id=user_id,
+                username=rows[0][1],
+                email=rows[0][2],
+                files_count=len(files),
+                total_uploaded_amount=sum(file["total_amount"] or 0 for file in files),
+                last_upload=max((file["upload_date"] for file in files), default=None),
+                files=[file_response(file, fields, category_stats) for file in files]
+            )
+
+
+def iter_reports_ndjson(fields: tuple):
+    buffer = []
+    size = 0
+    for report in iter_user_reports(fields):
+        line = report.model_dump_json(exclude_unset=True) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= REPORT_STREAM_CHUNK:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    yield "".join(buffer)
+
+
+def iter_reports_csv():
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(REPORT_CSV_COLUMNS)
+    for report in iter_user_reports(("id", "total_amount", "upload_date")):
+        values = [getattr(report, column) for column in REPORT_CSV_COLUMNS]
+        if report.last_upload is not None:
+            values[-1] = report.last_upload.isoformat()
+        writer.writerow(values)
+        if output.tell() >= REPORT_STREAM_CHUNK:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
 # === АДМИН-ПАНЕЛЬ ===
-@app.get("/admin/reports", response_model=List[AdminReportItem])
+@app.get("/admin/reports", response_model=List[AdminReportItem], response_model_exclude_unset=True)
 async def get_admin_reports(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),  # Проверяем что пользователь - админ
     session: Session = Depends(get_session)
 ):
-    """Получение отчетов всех пользователей (только для админов)"""
-    # Получаем всех пользователей с их файлами
+    """Получение отчетов всех пользователей (только для админов).
+
+    fields=id,filename,... или view=list — какие поля файлов вернуть (см. /my-files).
+    Поддерживает If-None-Match / If-Modified-Since: без изменений — 304 без тяжелых запросов.
+    """
+    fields = parse_fields(fields, view)
+    version, last_modified = admin_reports_validators(session)
+    etag = make_etag("admin-reports", *version, *fields)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
+
+    # Получаем всех пользователей и одним запросом — нужные колонки их файлов
     statement = select(User)
     users = session.exec(statement).all()
+    rows = select_files(session, fields, ("user_id", "total_amount", "upload_date"))
+    category_stats = load_category_stats(session) if "category_stats" in fields else {}
+
+    files_by_user = {}
+    for row in rows:
+        files_by_user.setdefault(row["user_id"], []).append(row)
     
     reports = []
     for user in users:
-        # Получаем файлы пользователя
-        files_statement = select(UploadedFile).where(UploadedFile.user_id == user.id)
-        files = session.exec(files_statement).all()
+        files = files_by_user.get(user.id, [])
         
         # Подсчитываем статистику
         files_count = len(files)
-        total_uploaded_amount = sum(file.total_amount or 0 for file in files)
-        last_upload = max((file.upload_date for file in files), default=None)
-        
-        # Преобразуем файлы в формат ответа
-        file_responses = [
-            FileAnalysisResponse(
-                id=file.id,
-                filename=file.filename,
-                upload_date=file.upload_date,
-                ai_analysis=file.ai_analysis,
-                total_amount=file.total_amount,
-                transactions_count=file.transactions_count,
-                category_stats=file.category_stats
-            )
-            for file in files
-        ]
+        total_uploaded_amount = sum(file["total_amount"] or 0 for file in files)
+        last_upload = max((file["upload_date"] for file in files), default=None)
         
         reports.append(AdminReportItem(
             user_id=user.id,
@@ -333,34 +915,187 @@ async def get_admin_reports(
             files_count=files_count,
             total_uploaded_amount=total_uploaded_amount,
             last_upload=last_upload,
-            files=file_responses
+            files=[file_response(file, fields, category_stats) for file in files]
         ))
     
     return reports
 
 
+@app.get("/admin/reports/export")
+async def export_admin_reports(
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Отчеты всех пользователей потоком, по пользователю на строку — для ночных выгрузок.
+
+    format=ndjson — строка = AdminReportItem (fields / view как в /admin/reports);
+    format=csv — только сводка: user_id, username, email, files_count, total_uploaded_amount, last_upload.
+    """
+    if format == "ndjson":
+        content, media_type = iter_reports_ndjson(parse_fields(fields, view)), "application/x-ndjson"
+    elif format == "csv":
+        content, media_type = iter_reports_csv(), "text/csv; charset=utf-8"
+    else:
+        raise HTTPException(400, "format может быть ndjson или csv")
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="admin_reports.{format}"'}
+    )
+
+
+@app.get("/admin/search")
+async def admin_search(
+    q: str,
+    scope: str = "files",
+    user_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+    current_user: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    """Полнотекстовый поиск (только для админов).
+
+    scope=files — по именам файлов и ответам ИИ (по релевантности, с фрагментом текста),
+    scope=transactions — по описаниям транзакций (новые первыми). Все слова запроса
+    должны встретиться; "рестор*" — начало слова. user_id — только этот пользователь.
+    """
+    if scope not in search.SCOPES:
+        raise HTTPException(400, f"scope может быть одним из: {', '.join(search.SCOPES)}")
+    terms = search.query_terms(q)
+    if not terms:
+        raise HTTPException(400, "Пустой поисковый запрос")
+    connection = session.connection()
+    if not search.available(connection):
+        raise HTTPException(503, "Поиск недоступен: SQLite собран без FTS5")
+    limit = max(1, min(limit, search.MAX_LIMIT))
+    offset = max(offset, 0)
+
+    find = search.search_files if scope == "files" else search.search_transactions
+    items = find(connection, terms, limit + 1, offset, user_id)
+    return {
+        "query": q,
+        "scope": scope,
+        "items": items[:limit],
+        "limit": limit,
+        "offset": offset,
+        "has_more": len(items) > limit,
+    }
+
+
+@app.get("/admin/top-categories", response_model=List[CategoryTotal])
+async def get_admin_top_categories(
+    limit: int = 10,
+    current_user: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    """Категории с наибольшими суммами по файлам всех пользователей"""
+    return top_categories(session, limit)
+
+
+@app.get("/admin/llm-usage")
+async def get_admin_llm_usage(
+    day: Optional[date] = None,
+    current_user: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    """Расход токенов LLM по пользователям за день (по умолчанию — сегодня, UTC)"""
+    return llm_usage_report(session, day)
+
+
+@app.get("/admin/parser-stats")
+async def get_parser_stats(current_user: User = Depends(get_current_admin_user)):
+    """Сколько PDF разобрано каждым шаблоном банка; generic — формат не распознан"""
+    return format_stats()
+
+
+@app.get("/admin/transactions/export")
+async def export_all_transactions(
+    format: str = "parquet",
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Транзакции всех пользователей (или одного, user_id=...) в Parquet / Arrow IPC"""
+    name = f"transactions_user{user_id}" if user_id is not None else "transactions"
+    return export_response(format, user_id, name)
+
+
+@app.get("/admin/profiles")
+async def get_admin_profiles(current_user: User = Depends(get_current_admin_user)):
+    """Список сохраненных профилей запросов (только для админов)"""
+    return list_profiles()
+
+
+@app.get("/admin/profiles/{request_id}")
+async def download_admin_profile(
+    request_id: str,
+    format: str = "prof",
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Скачивание профиля: format=prof — файл pstats, format=text — текстовая сводка"""
+    if format == "text":
+        summary = profile_summary(request_id)
+        if summary is None:
+            raise HTTPException(404, "Профиль не найден")
+        return PlainTextResponse(summary)
+
+    path = profile_path(request_id)
+    if path is None:
+        raise HTTPException(404, "Профиль не найден")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{request_id}.prof")
+
+
 # === ПОЛУЧЕНИЕ ФАЙЛОВ ПОЛЬЗОВАТЕЛЯ ===
-@app.get("/my-files", response_model=List[FileAnalysisResponse])
+@app.get("/my-files", response_model=List[FileAnalysisResponse], response_model_exclude_unset=True)
 async def get_my_files(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
-    """Получение всех загруженных файлов текущего пользователя"""
-    statement = select(UploadedFile).where(UploadedFile.user_id == current_user.id)
-    files = session.exec(statement).all()
-    
-    return [
-        FileAnalysisResponse(
-            id=file.id,
-            filename=file.filename,
-            upload_date=file.upload_date,
-            ai_analysis=file.ai_analysis,
-            total_amount=file.total_amount,
-            transactions_count=file.transactions_count,
-            category_stats=file.category_stats
-        )
-        for file in files
-    ]
+    """Получение всех загруженных файлов текущего пользователя.
+
+    fields=id,filename,... — только перечисленные поля (id всегда),
+    view=list — легкий список без ai_analysis и category_stats.
+    ETag — по User.files_version, который уже загружен вместе с пользователем:
+    при If-None-Match без изменений — 304 без запросов к файлам.
+    """
+    fields = parse_fields(fields, view)
+    last_modified = current_user.files_updated_at or current_user.created_at
+    etag = make_etag("my-files", current_user.id, current_user.files_version or 0, *fields)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
+
+    rows = select_files(session, fields, (), UploadedFile.user_id == current_user.id)
+    category_stats = (
+        load_category_stats(session, CategoryStat.user_id == current_user.id)
+        if "category_stats" in fields else {}
+    )
+    return [file_response(row, fields, category_stats) for row in rows]
+
+
+@app.get("/my-files/top-categories", response_model=List[CategoryTotal])
+async def get_my_top_categories(
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Категории с наибольшими суммами по всем файлам текущего пользователя"""
+    return top_categories(session, limit, CategoryStat.user_id == current_user.id)
+
+
+@app.get("/my-transactions/export")
+async def export_my_transactions(
+    format: str = "parquet",
+    current_user: User = Depends(get_current_user)
+):
+    """Все разобранные транзакции текущего пользователя: format=parquet или arrow (IPC stream)"""
+    return export_response(format, current_user.id, "transactions")
 
 
 @app.get("/")
@@ -368,73 +1103,22 @@ def root():
     return {"message": "AI Bank Backend is running ✅"}
 
 
-# === PDF ПАРСЕР (БЕЗ ИЗМЕНЕНИЙ) ===
-date_re = re.compile(r"(\d{1,2}\.\d{1,2}\.\d{2,4})")
-amount_re = re.compile(
-    r"([+-]?\s?\d{1,3}(?:[\s\d]{0,}\d)?(?:[.,]\d{2})?)\s*(?:₸|KZT|т|тг|\$|₽)?"
-)
+@app.get("/health")
+def health():
+    """Liveness: процесс отвечает (без обращения к базе и Ollama)"""
+    return {"status": "ok"}
 
 
-def parse_pdf(file_obj):
-    """Извлекает строки с датой, суммой и описанием из PDF."""
-    rows = []
-    with pdfplumber.open(file_obj) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-            for raw_line in text.split("\n"):
-                line = raw_line.strip()
-                if not line:
-                    continue
-
-                date_match = date_re.search(line)
-                amount_match = list(amount_re.finditer(line))
-                if not date_match or not amount_match:
-                    continue
-
-                date = date_match.group(1)
-                date_end = date_match.end()
-
-                chosen_amount = None
-                chosen_amount_span = None
-                for m in amount_match:
-                    if m.start() >= date_end - 1:
-                        chosen_amount = m.group(1)
-                        chosen_amount_span = (m.start(), m.end())
-                        break
-                if not chosen_amount:
-                    chosen_amount = amount_match[-1].group(1)
-                    chosen_amount_span = (
-                        amount_match[-1].start(),
-                        amount_match[-1].end(),
-                    )
-
-                desc = line[date_end : chosen_amount_span[0]].strip()
-                if not desc:
-                    desc = line[chosen_amount_span[1] :].strip()
-
-                amt_str = chosen_amount.replace(" ", "").replace(",", ".")
-                amt_str = re.sub(r"[^\d\-\+\.]", "", amt_str)
-                try:
-                    amount = float(amt_str)
-                except ValueError:
-                    continue
-
-                category = classify_description(desc)
-                rows.append({"date": date, "category": category, "amount": amount})
-    return pd.DataFrame(rows)
-
-
-def classify_description(desc: str) -> str:
-    """Простая классификация транзакции по ключевым словам."""
-    d = desc.lower()
-    if any(k in d for k in ["перевод", "пополнение", "deposit", "депозит"]):
-        return "transfer/deposit"
-    if any(k in d for k in ["покупк", "магазин", "ozon", "market", "shop"]):
-        return "purchase"
-    if any(k in d for k in ["коммун", "телеком", "kazakhtelecom", "услуги"]):
-        return "utilities"
-    if any(k in d for k in ["аппарат", "банкомат", "снятие"]):
-        return "cash"
-    return desc if len(desc) <= 80 else desc[:77] + "..."
\ No newline at end of file
+@app.get("/ready")
+async def ready(response: Response, session: Session = Depends(get_session)):
+    """Readiness: база доступна и модель ИИ загружена; иначе 503 — балансировщик не шлет сюда запросы"""
+    try:
+        session.exec(select(1)).one()
+        database = "ok"
+    except Exception as e:
+        database = f"error: {e}"
+    llm_status = dict(lifecycle.status(), breaker=llm.breaker.status())
+    is_ready = database == "ok" and llm_status["state"] in ("ready", "unmonitored")
+    if not is_ready:
+        response.status_code = 503
+    return {"ready": is_ready, "database": database, "llm": llm_status}
@@ -1,6 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 
 
@@ -16,6 +16,9 @@ class User(SQLModel, table=True):
     password_hash: str
     role: UserRole = Field(default=UserRole.USER)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Меняются при каждой загрузке — валидаторы ETag/Last-Modified для /my-files и /admin/reports
+    files_version: Optional[int] = Field(default=None)
+    files_updated_at: Optional[datetime] = Field(default=None)
     
     # Связь с загруженными файлами
     uploaded_files: List["UploadedFile"] = Relationship(back_populates="user")
@@ -23,18 +26,68 @@ class User(SQLModel, table=True):
 
 class UploadedFile(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     filename: str
     upload_date: datetime = Field(default_factory=datetime.utcnow)
-    category_stats: Optional[str] = Field(default=None)  # JSON строка с результатами анализа
     ai_analysis: Optional[str] = Field(default=None)  # Ответ от ИИ
+    advice_source: Optional[str] = Field(default=None)  # llm, rules или pending (ответ ИИ еще придет)
     total_amount: Optional[float] = Field(default=None)  # Общая сумма расходов
     transactions_count: Optional[int] = Field(default=None)  # Количество транзакций
+    batch_id: Optional[int] = Field(default=None, foreign_key="analysisbatch.id", index=True)  # Пакетная загрузка
     
     # Связь с пользователем
     user: User = Relationship(back_populates="uploaded_files")
 
 
+class CategoryStat(SQLModel, table=True):
+    """Сумма по категории в загруженном файле (раньше — JSON в UploadedFile.category_stats)"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    file_id: int = Field(foreign_key="uploadedfile.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)  # Дублируем для выборок по пользователю без join
+    category: str = Field(index=True)
+    amount: float
+
+
+class AnalysisBatch(SQLModel, table=True):
+    """Пакетная загрузка нескольких выписок с одним общим анализом ИИ"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    files_count: int
+    duplicates_removed: int = Field(default=0)  # Операции, попавшие в соседние выписки дважды
+    category_stats: Optional[str] = Field(default=None)  # JSON строка по объединенным данным
+    ai_analysis: Optional[str] = Field(default=None)
+    advice_source: Optional[str] = Field(default=None)
+    total_amount: Optional[float] = Field(default=None)
+    transactions_count: Optional[int] = Field(default=None)
+
+
+class Transaction(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    file_id: int = Field(foreign_key="uploadedfile.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)  # Дублируем для выборок по пользователю без join
+    operation_date: Optional[date] = Field(default=None)
+    description: Optional[str] = Field(default=None)
+    category: str
+    amount: float
+
+
+class SpendingAggregate(SQLModel, table=True):
+    """Накопительные итоги пользователя для инкрементального анализа (running_aggregates.py)"""
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    state: str  # JSON строка: суммы по месяцам и категориям, счетчики
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LLMUsage(SQLModel, table=True):
+    """Токены LLM, израсходованные пользователем за день UTC (квота LLM_DAILY_TOKEN_QUOTA)"""
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    requests: int = Field(default=0)
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+
+
 # Pydantic модели для API
 class UserCreate(SQLModel):
     username: str
@@ -65,13 +118,22 @@ class TokenData(SQLModel):
 
 
 class FileAnalysisResponse(SQLModel):
+    # Все поля, кроме id, необязательны: /my-files?fields=... возвращает только запрошенные
     id: int
-    filename: str
-    upload_date: datetime
-    ai_analysis: Optional[str]
-    total_amount: Optional[float]
-    transactions_count: Optional[int]
-    category_stats: Optional[str]
+    filename: Optional[str] = None
+    upload_date: Optional[datetime] = None
+    ai_analysis: Optional[str] = None
+    advice_source: Optional[str] = None
+    total_amount: Optional[float] = None
+    transactions_count: Optional[int] = None
+    category_stats: Optional[str] = None  # JSON строка, собирается из CategoryStat
+    batch_id: Optional[int] = None
+
+
+class CategoryTotal(SQLModel):
+    category: str
+    amount: float
+    files_count: int
 
 
 class AdminReportItem(SQLModel):
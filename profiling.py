@@ -0,0 +1,228 @@
+"""
+Профилирование отдельных запросов (cProfile) по требованию.
+
+Запрос профилируется, если:
+- передан заголовок X-Profile: 1 и запрос сделан администратором
+  (или включен PROFILE_DEBUG=1 — тогда заголовок принимается от всех);
+- включен режим выборки PROFILE_SAMPLE_RATE=N — профилируется каждый N-й запрос.
+
+Для остальных запросов накладные расходы — один счетчик и проверка заголовка.
+Профилировщик включается только на время шагов корутины этого запроса: пока
+запрос ждет (await), event loop обслуживает другие запросы, и их работа в
+профиль не попадает. Синхронные эндпоинты FastAPI выполняет в threadpool —
+там cProfile их не видит, в профиле будет только ожидание.
+Результаты сохраняются в PROFILE_DIR как <request_id>.prof (формат pstats)
+и <request_id>.json (метаданные запроса).
+"""
+
+import asyncio
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_DEBUG = os.getenv("PROFILE_DEBUG", "0") == "1"
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0 — выборка выключена
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+
+logger = logging.getLogger(__name__)
+
+_request_id_re = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Одновременно может работать только один cProfile в процессе
+_profile_lock = threading.Lock()
+
+
+def is_valid_request_id(request_id: str) -> bool:
+    """Проверка идентификатора (защита от выхода за пределы PROFILE_DIR)"""
+    return bool(_request_id_re.match(request_id))
+
+
+def _is_admin_token(authorization: str) -> bool:
+    """Проверяет, что Bearer токен принадлежит администратору"""
+    from jose import JWTError, jwt
+    from sqlmodel import Session, select
+    from database_sqlite import engine
+    from models import User, UserRole
+    from simple_auth import SECRET_KEY, ALGORITHM
+
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    username = payload.get("sub")
+    if not username:
+        return False
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).first()
+    return user is not None and user.role == UserRole.ADMIN
+
+
+def _save_profile(profiler: cProfile.Profile, meta: dict):
+    """Сохраняет профиль и метаданные, удаляя самые старые файлы сверх лимита"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    request_id = meta["request_id"]
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{request_id}.prof"))
+    with open(os.path.join(PROFILE_DIR, f"{request_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    profiles = list_profiles()
+    for old in profiles[PROFILE_MAX_FILES:]:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f"{old['request_id']}{ext}"))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    """Список сохраненных профилей, новые первыми"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p.get("created_at", ""), reverse=True)
+    return profiles
+
+
+def profile_path(request_id: str) -> Optional[str]:
+    """Путь к .prof файлу или None, если профиля нет"""
+    if not is_valid_request_id(request_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{request_id}.prof")
+    return path if os.path.isfile(path) else None
+
+
+def profile_summary(request_id: str, limit: int = 50) -> Optional[str]:
+    """Текстовая сводка профиля (top функций по cumulative time)"""
+    path = profile_path(request_id)
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+class _Profiled:
+    """Обертка корутины: профилировщик включен только пока выполняется ее шаг
+    (от возобновления до следующего await), а не все время жизни запроса"""
+
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            self.profiler.enable()
+            try:
+                if error is not None:
+                    awaited = self.coro.throw(error)
+                else:
+                    awaited = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, error = (yield awaited), None
+            except BaseException as e:  # отмена задачи и прочее пробрасываем в корутину
+                value, error = None, e
+
+
+class ProfilingMiddleware:
+    """ASGI middleware, профилирующий выбранные запросы (см. _Profiled)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._counter = itertools.count(1)
+
+    async def _should_profile(self, headers: dict) -> bool:
+        if PROFILE_SAMPLE_RATE > 0 and next(self._counter) % PROFILE_SAMPLE_RATE == 0:
+            return True
+        if headers.get(PROFILE_HEADER, b"") not in (b"1", b"true"):
+            return False
+        if PROFILE_DEBUG:
+            return True
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        # Роль читается из БД — в пуле потоков, не блокируя event loop
+        return await asyncio.get_running_loop().run_in_executor(None, _is_admin_token, authorization)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not await self._should_profile(headers) or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        if not is_valid_request_id(request_id):
+            request_id = uuid.uuid4().hex
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            profiler.disable()
+        except ValueError:
+            # Другой профилировщик уже активен (например, запущен внешне)
+            _profile_lock.release()
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await _Profiled(self.app(scope, receive, send_wrapper), profiler)
+            duration_ms = (time.perf_counter() - started) * 1000
+            _save_profile(profiler, {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 2),
+                "created_at": datetime.utcnow().isoformat(),
+            })
+        except OSError as e:
+            logger.warning("Не удалось сохранить профиль %s: %s", request_id, e)
+        finally:
+            _profile_lock.release()
@@ -0,0 +1,184 @@
+"""
+Ограничение частоты запросов (token bucket) и дневные квоты токенов LLM.
+
+Лимиты задаются по маршрутам в RATE_LIMITS ("имя=запросов/секунд" через
+запятую): у каждого пользователя на маршрут своя «корзина» на N запросов,
+которая равномерно пополняется за указанное время. Ключ — имя пользователя
+из JWT (без запроса в БД), для анонимных запросов — IP клиента. Превышение —
+429 с Retry-After.
+
+Корзины лежат в shared_store: с SHARED_STORE=sqlite счетчик общий для всех
+воркеров.
+
+Квота LLM_DAILY_TOKEN_QUOTA — токенов LLM на пользователя в сутки (UTC);
+расход хранится в таблице LLMUsage и виден админам в /admin/llm-usage.
+"""
+
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update
+
+from models import LLMUsage, User
+from shared_store import get_store
+from simple_auth import SECRET_KEY, ALGORITHM
+
+load_dotenv()
+
+DEFAULT_RATE_LIMITS = "analyze=10/60,batch=2/60,chat=20/60"
+LLM_DAILY_TOKEN_QUOTA = int(os.getenv("LLM_DAILY_TOKEN_QUOTA", "0"))  # 0 — без квоты
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    """"chat=20/60,analyze=10/60" -> {"chat": (20, 60.0), ...}; 0 запросов — без лимита"""
+    limits = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        count, _, period = value.partition("/")
+        limits[name.strip()] = (int(count), float(period or 60))
+    return limits
+
+
+RATE_LIMITS = parse_limits(os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS))
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: int, period: float) -> float:
+    return min(capacity, tokens + (now - updated) * capacity / period)
+
+
+# === Корзины в shared_store ===
+RATE_LIMIT_NS = "rate_limit"
+
+
+def take(key: str, capacity: int, period: float, store=None) -> float:
+    """Забирает токен из корзины key; возвращает 0 или сколько секунд ждать следующего.
+    Корзина [токенов, время] меняется атомарно через update; за period она пополняется
+    целиком, поэтому дольше period ее хранить незачем (ttl)."""
+    retry_after = 0.0
+
+    def spend(bucket):
+        nonlocal retry_after
+        now = time.time()
+        tokens = _refill(*bucket, now, capacity, period) if bucket else capacity
+        if tokens >= 1:
+            return [tokens - 1, now]
+        retry_after = (1 - tokens) * period / capacity
+        return [tokens, now]
+
+    (store or get_store()).update(RATE_LIMIT_NS, key, spend, ttl=period)
+    return retry_after
+
+
+# === Зависимость FastAPI ===
+def _client_key(request: Request) -> str:
+    """Имя пользователя из Bearer токена, иначе IP"""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            username = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            username = None
+        if username:
+            return f"user:{username}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limited(route: str):
+    """Dependency для маршрута: dependencies=[Depends(rate_limited("chat"))].
+    Обычная def — SQLite-хранилище не блокирует event loop (FastAPI зовет ее в пуле потоков)."""
+
+    def check_rate_limit(request: Request):
+        capacity, period = RATE_LIMITS.get(route, (0, 0))
+        if capacity <= 0:
+            return
+        retry_after = take(f"{route}:{_client_key(request)}", capacity, period)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много запросов, попробуйте позже",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    return check_rate_limit
+
+
+# === Дневные квоты токенов LLM ===
+def utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.utcnow()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return math.ceil((tomorrow - now).total_seconds())
+
+
+def check_llm_quota(session: Session, user_id: int):
+    """429, если пользователь уже израсходовал дневную квоту токенов"""
+    if LLM_DAILY_TOKEN_QUOTA <= 0:
+        return
+    usage = session.get(LLMUsage, (user_id, utc_today()))
+    used = (usage.prompt_tokens + usage.completion_tokens) if usage else 0
+    if used >= LLM_DAILY_TOKEN_QUOTA:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Дневная квота токенов ИИ исчерпана ({LLM_DAILY_TOKEN_QUOTA})",
+            headers={"Retry-After": str(_seconds_until_tomorrow())},
+        )
+
+
+def record_llm_usage(session: Session, user_id: int, usage: dict):
+    """Прибавляет токены к расходу за сегодня (коммит — вместе с запросом)"""
+    today = utc_today()
+    increment = (
+        update(LLMUsage)
+        .where(LLMUsage.user_id == user_id, LLMUsage.day == today)
+        .values(
+            requests=LLMUsage.requests + 1,
+            prompt_tokens=LLMUsage.prompt_tokens + usage["prompt_tokens"],
+            completion_tokens=LLMUsage.completion_tokens + usage["completion_tokens"],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if session.exec(increment).rowcount:
+        return
+    try:
+        # Первая запись за день; если параллельный запрос успел ее создать — прибавляем к ней
+        with session.begin_nested():
+            session.add(LLMUsage(user_id=user_id, day=today, requests=1,
+                                 prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"]))
+    except IntegrityError:
+        session.exec(increment)
+
+
+def llm_usage_report(session: Session, day: Optional[date] = None) -> list:
+    """Расход токенов всеми пользователями за день — для /admin/llm-usage"""
+    day = day or utc_today()
+    rows = session.exec(
+        select(LLMUsage, User.username)
+        .join(User, User.id == LLMUsage.user_id)
+        .where(LLMUsage.day == day)
+        .order_by((LLMUsage.prompt_tokens + LLMUsage.completion_tokens).desc())
+    ).all()
+    return [
+        {
+            "user_id": usage.user_id,
+            "username": username,
+            "day": usage.day,
+            "requests": usage.requests,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.prompt_tokens + usage.completion_tokens,
+            "quota": LLM_DAILY_TOKEN_QUOTA or None,
+        }
+        for usage, username in rows
+    ]
@@ -0,0 +1,109 @@
+"""
+Накопительные итоги пользователя для инкрементального анализа.
+
+Состояние хранится JSON-строкой в SpendingAggregate.state:
+    {"monthly": {"2024-01": {"Кафе": 1500.0, ...}, ...},
+     "undated": {"Кафе": 200.0},          # операции без распознанной даты
+     "transactions_count": 120, "total_amount": 350000.0, "files_count": 3}
+
+Новая выписка превращается в такую же дельту (analysis.period_delta) и
+прибавляется к состоянию — история заново не пересчитывается. ИИ получает
+только разницу нового периода с предыдущими месяцами (period_diff), поэтому
+стоимость запроса не растет вместе с историей.
+"""
+
+import os
+
+# Сколько предыдущих месяцев берется в скользящее среднее
+ROLLING_WINDOW = int(os.getenv("ROLLING_WINDOW_MONTHS", "3"))
+# Сколько категорий с наибольшим изменением попадает в промпт
+DIFF_CATEGORIES = 15
+
+
+def empty_state() -> dict:
+    return {"monthly": {}, "undated": {}, "transactions_count": 0, "total_amount": 0.0, "files_count": 0}
+
+
+def _add(target: dict, source: dict):
+    for category, amount in source.items():
+        target[category] = target.get(category, 0.0) + amount
+
+
+def merge_delta(state: dict, delta: dict) -> dict:
+    """Прибавляет дельту новой выписки к накопленному состоянию (возвращает новый словарь)"""
+    monthly = {month: dict(categories) for month, categories in state["monthly"].items()}
+    for month, categories in delta["monthly"].items():
+        _add(monthly.setdefault(month, {}), categories)
+    undated = dict(state["undated"])
+    _add(undated, delta["undated"])
+    return {
+        "monthly": dict(sorted(monthly.items())),
+        "undated": undated,
+        "transactions_count": state["transactions_count"] + delta["transactions_count"],
+        "total_amount": state["total_amount"] + delta["total_amount"],
+        "files_count": state["files_count"] + delta.get("files_count", 1),
+    }
+
+
+def category_totals(state: dict) -> list:
+    """Суммы по категориям за всю историю, формат как by_category"""
+    totals = dict(state["undated"])
+    for categories in state["monthly"].values():
+        _add(totals, categories)
+    return [{"category": c, "amount": a} for c, a in sorted(totals.items())]
+
+
+def monthly_series(state: dict, window: int = ROLLING_WINDOW) -> list:
+    """Помесячные суммы и скользящее среднее за window месяцев"""
+    months = sorted(state["monthly"])
+    totals = [sum(state["monthly"][m].values()) for m in months]
+    series = []
+    for i, month in enumerate(months):
+        recent = totals[max(0, i - window + 1): i + 1]
+        series.append({"month": month, "amount": totals[i], "rolling_avg": sum(recent) / len(recent)})
+    return series
+
+
+def summary(state: dict) -> dict:
+    return {
+        "category_totals": category_totals(state),
+        "monthly": monthly_series(state),
+        "transactions_count": state["transactions_count"],
+        "total_amount": state["total_amount"],
+        "files_count": state["files_count"],
+    }
+
+
+def period_diff(state: dict, delta: dict, window: int = ROLLING_WINDOW, limit: int = DIFF_CATEGORIES) -> dict:
+    """Сравнивает новую выписку с предыдущими месяцами состояния.
+
+    Предыдущий период — до window месяцев перед первым месяцем выписки
+    (если в выписке нет дат — последние window месяцев). Для каждой категории:
+    среднемесячная сумма в новой выписке, сумма за последний предыдущий месяц
+    и скользящее среднее; в ответ попадают limit категорий с наибольшим изменением.
+    """
+    new_months = sorted(delta["monthly"])
+    previous = sorted(m for m in state["monthly"] if not new_months or m < new_months[0])[-window:]
+
+    new_totals = dict(delta["undated"])
+    for categories in delta["monthly"].values():
+        _add(new_totals, categories)
+    previous_totals = {}
+    for month in previous:
+        _add(previous_totals, state["monthly"][month])
+    last_month = state["monthly"][previous[-1]] if previous else {}
+
+    rows = []
+    for category in set(new_totals) | set(previous_totals):
+        amount = new_totals.get(category, 0.0) / max(len(new_months), 1)
+        rolling_avg = previous_totals.get(category, 0.0) / len(previous) if previous else 0.0
+        rows.append({
+            "category": category,
+            "amount": amount,
+            "previous": last_month.get(category, 0.0),
+            "rolling_avg": rolling_avg,
+            "change": amount - rolling_avg,
+        })
+    rows.sort(key=lambda r: abs(r["change"]), reverse=True)
+
+    return {"new_months": new_months, "previous_months": previous, "categories": rows[:limit]}
@@ -0,0 +1,79 @@
+"""
+Создание и дообновление схемы базы — общее для database.py (PostgreSQL)
+и database_sqlite.py: каждый модуль передает сюда свой engine.
+"""
+
+import json
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+
+from search import create_search_index
+
+
+def create_db_and_tables(engine):
+    """Создает недостающие таблицы в базе данных.
+
+    Вызывается при старте каждого воркера, поэтому сначала одним запросом
+    сверяем список таблиц и вызываем create_all только если чего-то нет.
+    Новые nullable-колонки моделей добавляются в уже существующие таблицы,
+    индекс полнотекстового поиска (search.py) — если его еще нет.
+    """
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    if not set(SQLModel.metadata.tables) <= existing:
+        # Воркеры стартуют одновременно: таблицу мог создать соседний — повторяем с проверкой
+        for attempt in range(5):
+            try:
+                SQLModel.metadata.create_all(engine)
+                break
+            except DBAPIError:
+                if attempt == 4:
+                    raise
+    add_missing_columns(engine, inspector, existing)
+    migrate_category_stats(engine, inspector, existing)
+    create_search_index(engine)
+
+
+def add_missing_columns(engine, inspector, existing_tables):
+    """ALTER TABLE ADD COLUMN для nullable-колонок и CREATE INDEX для индексов,
+    которых нет в старой базе (create_all их не добавляет)"""
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
+
+def migrate_category_stats(engine, inspector, existing_tables):
+    """Один раз переносит JSON из старой колонки uploadedfile.category_stats в таблицу categorystat"""
+    if "categorystat" in existing_tables or "uploadedfile" not in existing_tables:
+        return
+    if "category_stats" not in {c["name"] for c in inspector.get_columns("uploadedfile")}:
+        return
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, user_id, category_stats FROM uploadedfile WHERE category_stats IS NOT NULL"
+        )).all()
+        values = []
+        for file_id, user_id, raw in rows:
+            try:
+                items = json.loads(raw)
+            except ValueError:
+                continue
+            values += [
+                {"file_id": file_id, "user_id": user_id, "category": str(item["category"]), "amount": float(item["amount"])}
+                for item in items
+            ]
+        if values:
+            conn.execute(SQLModel.metadata.tables["categorystat"].insert(), values)
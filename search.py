@@ -0,0 +1,212 @@
+"""
+Полнотекстовый поиск для админов: по анализам (имя файла и ответ ИИ) и по
+описаниям сохраненных транзакций.
+
+SQLite — таблицы FTS5 с внешним содержимым (content=...): индекс хранит только
+токены, текст читается из исходных таблиц. uploadedfile_fts обновляют триггеры
+(в том числе при дописывании позднего ответа ИИ). Транзакции вставляются
+тысячами, а триггер FTS5 на каждую строку замедляет вставку в 20 раз, поэтому
+их индексирует один INSERT ... SELECT на файл — index_transactions в той же
+транзакции, что и вставка строк. Удаление и правку описания транзакции
+отслеживают триггеры: на вставку они не влияют.
+PostgreSQL — генерируемые колонки tsvector с GIN-индексами, их пересчитывает сама база.
+
+Индекс создается при старте (create_search_index из create_db_and_tables), для
+существующей базы FTS5 один раз заполняется из таблиц (rebuild).
+"""
+
+import os
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+SCOPES = ("files", "transactions")
+MAX_LIMIT = 100
+MAX_TERMS = 8
+# Конфигурация to_tsvector в PostgreSQL: simple — без стемминга, выписки смешивают русский и английский
+TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+# Слово запроса; "рестор*" — начало слова
+_WORD = re.compile(r"\w+\*?")
+
+# FTS5-таблица -> (исходная таблица, индексируемые колонки, вставку индексирует триггер).
+# Без триггера на вставку строки индексирует index_transactions — только с текстом,
+# поэтому триггеры удаления и правки трогают индекс только для таких строк.
+FTS_TABLES = {
+    "uploadedfile_fts": ("uploadedfile", ("filename", "ai_analysis"), True),
+    "transaction_fts": ("transaction", ("description",), False),
+}
+
+
+def query_terms(query: str) -> list:
+    """Слова запроса в нижнем регистре; операторы и кавычки FTS отбрасываются"""
+    return [w.lower() for w in _WORD.findall(query)][:MAX_TERMS]
+
+
+# === СОЗДАНИЕ ИНДЕКСА ===
+def _sqlite_statements(fts: str, table: str, columns: tuple, insert_trigger: bool) -> list:
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) SELECT 'delete', old.id, {old}"
+    insert = f"INSERT INTO {fts}(rowid, {names}) SELECT new.id, {new}"
+    if not insert_trigger:
+        delete += " WHERE " + " OR ".join(f"old.{c} IS NOT NULL" for c in columns)
+        insert += " WHERE " + " OR ".join(f"new.{c} IS NOT NULL" for c in columns)
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+    ]
+    if insert_trigger:
+        statements.append(f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{table}" BEGIN {insert}; END')
+    return statements + [
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{table}" BEGIN {delete}; END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON "{table}" BEGIN {delete}; {insert}; END',
+    ]
+
+
+def _postgres_statements(table: str, columns: tuple) -> list:
+    document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return [
+        f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+        f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}'::regconfig, {document})) STORED",
+        f'CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON "{table}" USING GIN (search_vector)',
+    ]
+
+
+def create_search_index(engine):
+    """Создает индекс поиска, если его еще нет (вызывается при старте каждого воркера)"""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table, columns, _ in FTS_TABLES.values():
+                for statement in _postgres_statements(table, columns):
+                    conn.execute(text(statement))
+        return
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+            for fts, (table, columns, insert_trigger) in FTS_TABLES.items():
+                for statement in _sqlite_statements(fts, table, columns, insert_trigger):
+                    conn.execute(text(statement))
+                if fts not in existing:
+                    # Строки, загруженные до появления индекса
+                    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    except OperationalError:  # SQLite без FTS5: поиск недоступен, остальное работает
+        pass
+
+
+def available(conn) -> bool:
+    """Есть ли индекс поиска в этой базе (conn — Connection, например session.connection())"""
+    if conn.dialect.name == "postgresql":
+        return True
+    if conn.dialect.name != "sqlite":
+        return False
+    found = conn.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('uploadedfile_fts', 'transaction_fts')")
+    ).scalar()
+    return found == len(FTS_TABLES)
+
+
+def index_transactions(conn, first_file_id: int, last_file_id: Optional[int] = None):
+    """Добавляет в transaction_fts описания транзакций файлов first_file_id..last_file_id
+    одним INSERT ... SELECT; вызывается после вставки строк, в той же транзакции
+    (удаление и правку описаний индекс получает от триггеров)"""
+    if conn.dialect.name != "sqlite" or not available(conn):
+        return
+    conn.execute(
+        text(
+            'INSERT INTO transaction_fts(rowid, description) SELECT id, description FROM "transaction" '
+            "WHERE file_id BETWEEN :first AND :last AND description IS NOT NULL"
+        ),
+        {"first": first_file_id, "last": first_file_id if last_file_id is None else last_file_id},
+    )
+
+
+# === ЗАПРОСЫ ===
+def _match(dialect: str, terms: list) -> str:
+    """Все слова запроса; слово со звездочкой — как начало слова (рестор* -> рестораны).
+    Целые слова быстрее: FTS5 отдает их совпадения сразу в порядке id"""
+    if dialect == "postgresql":
+        return " & ".join(f"{t[:-1]}:*" if t.endswith("*") else t for t in terms)
+    return " ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in terms)
+
+
+def search_files(conn, terms: list, limit: int, offset: int, user_id: Optional[int] = None) -> list:
+    """Анализы, где слова встречаются в имени файла или ответе ИИ; по релевантности"""
+    dialect = conn.dialect.name
+    user_filter = "AND f.user_id = :user_id" if user_id is not None else ""
+    if dialect == "postgresql":
+        statement = f"""
+            WITH page AS (
+                SELECT f.id, ts_rank(f.search_vector, q) AS score
+                FROM uploadedfile f, to_tsquery('{TS_CONFIG}', :match) q
+                WHERE f.search_vector @@ q {user_filter}
+                ORDER BY score DESC, f.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT f.id, f.user_id, u.username, f.filename, f.upload_date, f.batch_id,
+                   ts_headline('{TS_CONFIG}', coalesce(f.ai_analysis, f.filename), to_tsquery('{TS_CONFIG}', :match),
+                               'StartSel=«, StopSel=», MaxWords=20, MinWords=8') AS snippet
+            FROM page
+            JOIN uploadedfile f ON f.id = page.id
+            JOIN "user" u ON u.id = f.user_id
+            ORDER BY page.score DESC, page.id DESC
+        """
+    else:
+        # Сначала страница по bm25 (совпадение в имени файла весит больше, чем в тексте
+        # анализа), фрагменты — только для ее строк, а не для всех совпадений
+        statement = f"""
+            WITH page AS (
+                SELECT f.id, bm25(uploadedfile_fts, 4.0, 1.0) AS score
+                FROM uploadedfile_fts
+                JOIN uploadedfile f ON f.id = uploadedfile_fts.rowid
+                WHERE uploadedfile_fts MATCH :match {user_filter}
+                ORDER BY score, f.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT f.id, f.user_id, u.username, f.filename, f.upload_date, f.batch_id,
+                   snippet(uploadedfile_fts, -1, '«', '»', '…', 16) AS snippet
+            FROM page
+            JOIN uploadedfile_fts ON uploadedfile_fts.rowid = page.id
+            JOIN uploadedfile f ON f.id = page.id
+            JOIN "user" u ON u.id = f.user_id
+            WHERE uploadedfile_fts MATCH :match
+            ORDER BY page.score, page.id DESC
+        """
+    params = {"match": _match(dialect, terms), "limit": limit, "offset": offset, "user_id": user_id}
+    return [dict(row) for row in conn.execute(text(statement), params).mappings()]
+
+
+def search_transactions(conn, terms: list, limit: int, offset: int, user_id: Optional[int] = None) -> list:
+    """Транзакции, в описании которых есть слова; новые первыми.
+
+    Порядок по id, а не по релевантности: частое слово ("Kaspi") совпадает с
+    миллионами строк, а по id индекс отдает первую страницу, не сортируя все совпадения.
+    """
+    dialect = conn.dialect.name
+    user_filter = "AND t.user_id = :user_id" if user_id is not None else ""
+    if dialect == "postgresql":
+        statement = f"""
+            SELECT t.id, t.file_id, t.user_id, u.username, t.operation_date, t.description, t.category, t.amount
+            FROM "transaction" t
+            JOIN "user" u ON u.id = t.user_id
+            WHERE t.search_vector @@ to_tsquery('{TS_CONFIG}', :match) {user_filter}
+            ORDER BY t.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        statement = f"""
+            SELECT t.id, t.file_id, t.user_id, u.username, t.operation_date, t.description, t.category, t.amount
+            FROM transaction_fts
+            JOIN "transaction" t ON t.id = transaction_fts.rowid
+            JOIN "user" u ON u.id = t.user_id
+            WHERE transaction_fts MATCH :match {user_filter}
+            ORDER BY transaction_fts.rowid DESC
+            LIMIT :limit OFFSET :offset
+        """
+    params = {"match": _match(dialect, terms), "limit": limit, "offset": offset, "user_id": user_id}
+    return [dict(row) for row in conn.execute(text(statement), params).mappings()]
@@ -5,9 +5,8 @@ Seed данные для автоматического заполнения б
 
 from sqlmodel import Session, select
 from auth import get_password_hash
-from models import User, UploadedFile, UserRole
+from models import User, UploadedFile, CategoryStat, UserRole
 from database_sqlite import engine
-import json
 from datetime import datetime, timedelta
 import random
 
@@ -78,41 +77,41 @@ def create_seed_data():
                 "ai_analysis": "Анализ ваших расходов за январь показывает перерасход в категории 'Развлечения' на 15%. Рекомендуем сократить походы в рестораны и кино. Общая экономия может составить 8,000 тенге в месяц.",
                 "total_amount": 125000.0,
                 "transactions_count": 45,
-                "category_stats": json.dumps([
+                "category_stats": [
                     {"category": "Продукты", "amount": 45000},
                     {"category": "Транспорт", "amount": 18000},
                     {"category": "Развлечения", "amount": 35000},
                     {"category": "Услуги", "amount": 12000},
                     {"category": "Одежда", "amount": 15000}
-                ])
+                ]
             },
             {
                 "filename": "bank_statement_february.pdf",
                 "ai_analysis": "В феврале наблюдается рост расходов на 12% по сравнению с январем. Основной рост в категории 'Транспорт' из-за повышения цен на топливо. Рекомендуем использовать общественный транспорт чаще.",
                 "total_amount": 140000.0,
                 "transactions_count": 52,
-                "category_stats": json.dumps([
+                "category_stats": [
                     {"category": "Продукты", "amount": 48000},
                     {"category": "Транспорт", "amount": 25000},
                     {"category": "Развлечения", "amount": 28000},
                     {"category": "Услуги", "amount": 15000},
                     {"category": "Одежда", "amount": 12000},
                     {"category": "Медицина", "amount": 12000}
-                ])
+                ]
             },
             {
                 "filename": "expenses_march_2024.xlsx",
                 "ai_analysis": "Отличный месяц! Расходы сократились на 8%. Экономия достигнута за счет сокращения развлечений и более разумных покупок продуктов. Продолжайте в том же духе!",
                 "total_amount": 128000.0,
                 "transactions_count": 38,
-                "category_stats": json.dumps([
+                "category_stats": [
                     {"category": "Продукты", "amount": 42000},
                     {"category": "Транспорт", "amount": 20000},
                     {"category": "Развлечения", "amount": 25000},
                     {"category": "Услуги", "amount": 18000},
                     {"category": "Одежда", "amount": 13000},
                     {"category": "Образование", "amount": 10000}
-                ])
+                ]
             }
         ]
         
@@ -129,10 +128,14 @@ def create_seed_data():
                     upload_date=upload_date,
                     ai_analysis=file_data["ai_analysis"],
                     total_amount=file_data["total_amount"],
-                    transactions_count=file_data["transactions_count"],
-                    category_stats=file_data["category_stats"]
+                    transactions_count=file_data["transactions_count"]
                 )
                 session.add(uploaded_file)
+                session.flush()
+                session.add_all(
+                    CategoryStat(file_id=uploaded_file.id, user_id=user.id, **item)
+                    for item in file_data["category_stats"]
+                )
         
         session.commit()
         
@@ -0,0 +1,176 @@
+"""
+Общее состояние воркеров: ключ-значение с TTL.
+
+SHARED_STORE=memory (по умолчанию) — словарь в памяти процесса, подходит для
+одного воркера. SHARED_STORE=sqlite — файл SHARED_STORE_PATH в режиме WAL:
+несколько процессов uvicorn/gunicorn видят одни и те же кэш ответов LLM,
+счетчики и состояние задач. Чтение идет без блокировок (WAL), изменение
+(update/incr) — в транзакции BEGIN IMMEDIATE, поэтому read-modify-write
+атомарен между процессами.
+
+Значения сериализуются в JSON. Ключи разделены по пространствам имен (ns).
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SHARED_STORE = os.getenv("SHARED_STORE", "memory")  # memory | sqlite
+SHARED_STORE_PATH = os.getenv("SHARED_STORE_PATH", "./shared_state.db")
+
+
+class MemoryStore:
+    """Состояние в памяти одного процесса"""
+
+    # Раз в PRUNE_EVERY изменений удаляются просроченные ключи
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._data: Dict[tuple, tuple] = {}  # (ns, key) -> (value, expires | None)
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def _prune(self, now: float):
+        """Вызывается под блокировкой"""
+        if next(self._counter) % self.PRUNE_EVERY == 0:
+            for key in [k for k, item in self._data.items() if not self._alive(item, now)]:
+                del self._data[key]
+
+    def _alive(self, item, now: float) -> bool:
+        return item is not None and (item[1] is None or item[1] > now)
+
+    def get(self, ns: str, key: str, default=None):
+        item = self._data.get((ns, key))
+        return item[0] if self._alive(item, time.time()) else default
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            now = time.time()
+            self._data[(ns, key)] = (value, now + ttl if ttl else None)
+            self._prune(now)
+
+    def delete(self, ns: str, key: str):
+        with self._lock:
+            self._data.pop((ns, key), None)
+
+    def update(self, ns: str, key: str, func: Callable[[Any], Any], ttl: Optional[float] = None):
+        """Атомарно заменяет значение на func(старое или None); возвращает новое"""
+        with self._lock:
+            now = time.time()
+            item = self._data.get((ns, key))
+            value = func(item[0] if self._alive(item, now) else None)
+            self._data[(ns, key)] = (value, now + ttl if ttl else None)
+            self._prune(now)
+            return value
+
+    def incr(self, ns: str, key: str, amount: float = 1, ttl: Optional[float] = None):
+        return self.update(ns, key, lambda v: (v or 0) + amount, ttl)
+
+    def items(self, ns: str) -> dict:
+        now = time.time()
+        return {k: item[0] for (n, k), item in list(self._data.items()) if n == ns and self._alive(item, now)}
+
+
+class SQLiteStore:
+    """Состояние в общем SQLite файле (WAL) для нескольких процессов"""
+
+    # Раз в PRUNE_EVERY изменений удаляются просроченные ключи
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._counter = itertools.count(1)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL, "
+            "PRIMARY KEY (ns, key))"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение на поток: sqlite3 не разрешает делить его между потоками"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None — транзакциями управляем сами (BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        if next(self._counter) % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (now,))
+
+    def get(self, ns: str, key: str, default=None):
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires IS NULL OR expires > ?)",
+            (ns, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+            (ns, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None),
+        )
+        self._prune(conn, now)
+
+    def delete(self, ns: str, key: str):
+        self._connect().execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+
+    def update(self, ns: str, key: str, func: Callable[[Any], Any], ttl: Optional[float] = None):
+        """Атомарно между процессами заменяет значение на func(старое или None)"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires IS NULL OR expires > ?)",
+                (ns, key, now),
+            ).fetchone()
+            value = func(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                (ns, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None),
+            )
+            self._prune(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def incr(self, ns: str, key: str, amount: float = 1, ttl: Optional[float] = None):
+        return self.update(ns, key, lambda v: (v or 0) + amount, ttl)
+
+    def items(self, ns: str) -> dict:
+        rows = self._connect().execute(
+            "SELECT key, value FROM kv WHERE ns = ? AND (expires IS NULL OR expires > ?)",
+            (ns, time.time()),
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Хранилище процесса; создается при первом обращении (после fork воркера)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(SHARED_STORE_PATH) if SHARED_STORE == "sqlite" else MemoryStore()
+    return _store
@@ -19,6 +19,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Схема безопасности
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -82,6 +83,19 @@ async def get_current_user(
     return user
 
 
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    session: Session = Depends(get_session)
+) -> Optional[User]:
+    """Текущий пользователь, если передан валидный токен, иначе None (для публичных эндпоинтов)"""
+    if credentials is None:
+        return None
+    try:
+        return await get_current_user(credentials, session)
+    except HTTPException:
+        return None
+
+
 async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Проверка, что текущий пользователь - администратор"""
     if current_user.role != "admin":
@@ -0,0 +1,183 @@
+"""
+Шаблоны PDF-выписок конкретных банков.
+
+Шаблон узнает выписку по тексту первой страницы и разбирает таблицу по
+координатам слов (pdfplumber extract_words): границы колонок берутся из
+позиций заголовков, каждое слово попадает в колонку по x0. Строки без даты
+считаются продолжением описания предыдущей операции. Если ни один шаблон
+не подошел (или подошел, но не нашел ни одной строки), parse_pdf
+использует общий построчный разбор.
+
+Новый банк добавляется вызовом register_template(BankTemplate(...)).
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from shared_store import get_store
+
+# Допуск по вертикали при сборке слов в строку (pt)
+LINE_TOLERANCE = 3
+# Слово может начинаться чуть левее заголовка своей колонки (pt)
+COLUMN_TOLERANCE = 4
+
+
+class BankTemplate:
+    """Описание выписки банка: отпечаток первой страницы и заголовки колонок.
+
+    fingerprints — подстроки (в нижнем регистре), хотя бы одна из которых
+    должна быть на первой странице; columns — поле -> варианты заголовка (начало слова
+    в нижнем регистре). Обязательные поля: date, amount; description и
+    operation (тип операции) необязательны и склеиваются в описание.
+    """
+
+    def __init__(self, name: str, fingerprints: Tuple[str, ...], columns: Dict[str, Tuple[str, ...]]):
+        self.name = name
+        self.fingerprints = fingerprints
+        self.columns = columns
+
+    def matches(self, first_page_text: str) -> bool:
+        """Есть отпечаток банка и строка со всеми заголовками колонок"""
+        text = first_page_text.lower()
+        if not any(f in text for f in self.fingerprints):
+            return False
+        for line in text.split("\n"):
+            words = line.split()
+            if all(any(w.startswith(labels) for w in words) for labels in self.columns.values()):
+                return True
+        return False
+
+    def _find_header(self, lines) -> Optional[Tuple[int, List[Tuple[float, str]]]]:
+        """Индекс строки заголовка и отсортированные (x0, поле) колонок"""
+        for i, words in enumerate(lines):
+            found = {}
+            for w in words:
+                text = w["text"].lower()
+                for field, labels in self.columns.items():
+                    if field not in found and text.startswith(labels):
+                        found[field] = w["x0"]
+                        break
+            if "date" in found and "amount" in found:
+                return i, sorted((x0, field) for field, x0 in found.items())
+        return None
+
+    def parse(self, pdf, deadline=None) -> List[dict]:
+        """Сырые ячейки {date, amount, description} со всех страниц (текст, без разбора значений);
+        истекший deadline (deadline.Deadline) останавливает разбор на границе страницы"""
+        rows = []
+        for i, page in enumerate(pdf.pages):
+            if i and deadline is not None and deadline.expired():
+                deadline.cut("parse", pages_parsed=i, pages_total=len(pdf.pages))
+                break
+            lines = group_lines(page.extract_words())
+            header = self._find_header(lines)
+            if header is None:
+                continue
+            header_index, columns = header
+
+            for words in lines[header_index + 1:]:
+                cells = {field: [] for _, field in columns}
+                for w in words:
+                    field = columns[0][1]
+                    for x0, name in columns:
+                        if w["x0"] >= x0 - COLUMN_TOLERANCE:
+                            field = name
+                    cells[field].append(w["text"])
+
+                date = " ".join(cells["date"])
+                amount = " ".join(cells["amount"])
+                description = " ".join(cells.get("operation", []) + cells.get("description", []))
+                if not date and not amount:
+                    # Перенос длинного описания на следующую строку
+                    if rows and description:
+                        rows[-1]["description"] += " " + description
+                    continue
+                rows.append({"date": date, "amount": amount, "description": description})
+        return rows
+
+
+def group_lines(words) -> List[List[dict]]:
+    """Собирает слова в строки по координате top"""
+    lines = []
+    current, current_top = [], None
+    for w in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if current_top is not None and abs(w["top"] - current_top) > LINE_TOLERANCE:
+            lines.append(sorted(current, key=lambda w: w["x0"]))
+            current = []
+        if not current:
+            current_top = w["top"]
+        current.append(w)
+    if current:
+        lines.append(sorted(current, key=lambda w: w["x0"]))
+    return lines
+
+
+# === Реестр шаблонов ===
+_templates: List[BankTemplate] = []
+
+
+def register_template(template: BankTemplate):
+    _templates.append(template)
+
+
+def detect_template(first_page_text: str) -> Optional[BankTemplate]:
+    for template in _templates:
+        if template.matches(first_page_text):
+            return template
+    return None
+
+
+register_template(BankTemplate(
+    "kaspi_gold",
+    fingerprints=("kaspi gold",),
+    columns={
+        "date": ("дата", "date"),
+        "amount": ("сумма", "amount"),
+        "operation": ("операция", "transaction"),
+        "description": ("детали", "details"),
+    },
+))
+
+register_template(BankTemplate(
+    "halyk",
+    fingerprints=("halyk bank", "народный банк"),
+    columns={
+        "date": ("дата", "date"),
+        "description": ("описание", "description"),
+        "amount": ("сумма", "amount"),
+    },
+))
+
+
+# === Статистика форматов (видна админам в /admin/parser-stats) ===
+# Счетчики лежат в shared_store, поэтому при SHARED_STORE=sqlite видны всем воркерам
+_collecting = threading.local()
+
+
+def record_format(name: str):
+    """Учитывает, каким парсером разобран PDF: имя шаблона, generic или <шаблон>:fallback"""
+    pending = getattr(_collecting, "formats", None)
+    if pending is not None:
+        pending.append(name)
+        return
+    get_store().incr("parser_formats", name)
+
+
+@contextmanager
+def collect_formats():
+    """Внутри блока форматы не учитываются, а собираются в список.
+
+    Нужно пулу процессов: воркер возвращает список вместе с результатом,
+    а учитывает его основной процесс.
+    """
+    formats = []
+    _collecting.formats = formats
+    try:
+        yield formats
+    finally:
+        _collecting.formats = None
+
+
+def format_stats() -> dict:
+    return {name: int(count) for name, count in sorted(get_store().items("parser_formats").items())}
@@ -0,0 +1,73 @@
+"""Общие фикстуры: main.app на временной SQLite базе без Ollama"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Настройки читаются при импорте модулей, поэтому задаются до импорта main
+_tmp = tempfile.mkdtemp(prefix="ai_bank_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["LLM_PROBE_INTERVAL"] = "0"
+os.environ["SHARED_STORE"] = "memory"
+os.environ["PROFILE_DIR"] = os.path.join(_tmp, "profiles")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import database_sqlite
+    import main
+
+    database_sqlite.engine.echo = False
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def _register(client, role=None) -> dict:
+    from sqlmodel import Session, select
+
+    import database_sqlite
+    from models import User, UserRole
+
+    name = f"user_{uuid.uuid4().hex[:8]}"
+    r = client.post("/register", json={"username": name, "email": f"{name}@test.kz", "password": "secret123"})
+    assert r.status_code == 200, r.text
+    if role is not None:
+        with Session(database_sqlite.engine) as session:
+            user = session.exec(select(User).where(User.username == name)).one()
+            user.role = UserRole(role)
+            session.add(user)
+            session.commit()
+    token = client.post("/login", json={"username": name, "password": "secret123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def user_headers(client):
+    """Заголовки нового пользователя"""
+    return _register(client)
+
+
+@pytest.fixture
+def admin_headers(client):
+    """Заголовки нового администратора"""
+    return _register(client, role="admin")
+
+
+@pytest.fixture
+def upload(client, monkeypatch):
+    """Загружает CSV через /analyze-expenses; ИИ отвечает сразу"""
+    import llm
+
+    usage = {"prompt_tokens": 1, "completion_tokens": 1, "prompt_eval_ms": 0.0, "context": None}
+    monkeypatch.setattr(llm, "generate_with_usage", lambda prompt, context=None: ("совет", usage))
+
+    def _upload(headers: dict, content: str, name: str = "statement.csv") -> dict:
+        r = client.post("/analyze-expenses", headers=headers, files={"file": (name, content, "text/csv")})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return _upload
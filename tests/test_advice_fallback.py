@@ -0,0 +1,89 @@
+"""Совет по правилам, когда ИИ медленный или недоступен; размыкатель цепи"""
+
+import asyncio
+import time
+
+import pytest
+
+import llm
+import main
+from deadline import Deadline
+
+
+def rules():
+    return "совет по правилам"
+
+
+def run_advise(deadline=None):
+    return asyncio.run(main.advise(None, 1, "prompt", rules, deadline))
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    def generate(prompt, context=None):
+        # asyncio.run дожидается потоков пула, поэтому «медленный» ИИ отвечает за 0.5 с
+        time.sleep(0.5)
+        return "ответ ИИ", {}
+
+    monkeypatch.setattr(llm, "generate_with_usage", generate)
+
+
+@pytest.mark.parametrize("deadline", [None, Deadline(60)])
+def test_zero_budget_is_config_not_partial(monkeypatch, deadline):
+    monkeypatch.setattr(main, "LLM_ADVICE_BUDGET", 0.0)
+    text, source, future = run_advise(deadline)
+    assert (text, source, future) == ("совет по правилам", main.ADVICE_RULES, None)
+    if deadline is not None:
+        assert deadline.report() == {"partial": False}
+
+
+def test_expired_deadline_skips_llm(monkeypatch):
+    monkeypatch.setattr(main, "LLM_ADVICE_BUDGET", 5.0)
+    deadline = Deadline(0.01, reserve=0.005)
+    time.sleep(0.02)
+    _, source, _ = run_advise(deadline)
+    assert source == main.ADVICE_RULES
+    assert deadline.partial == {"advice": {"llm": "skipped"}}
+
+
+def test_slow_llm_within_budget_is_not_partial(monkeypatch, slow_llm):
+    monkeypatch.setattr(main, "LLM_ADVICE_BUDGET", 0.05)
+    deadline = Deadline(60)
+    _, source, future = run_advise(deadline)
+    assert source == main.ADVICE_PENDING
+    assert future is not None
+    assert deadline.report() == {"partial": False}
+
+
+def test_slow_llm_cut_by_deadline_is_partial(monkeypatch, slow_llm):
+    monkeypatch.setattr(main, "LLM_ADVICE_BUDGET", 5.0)
+    deadline = Deadline(0.2, reserve=0.1)
+    _, source, _ = run_advise(deadline)
+    assert source == main.ADVICE_PENDING
+    assert deadline.partial == {"advice": {"llm": "pending"}}
+
+
+def test_breaker_opens_after_failures_and_probes_after_cooldown():
+    breaker = llm.CircuitBreaker(failures=2, cooldown=0.05, slow_call=1.0)
+    breaker.record(False)
+    breaker.before_call()  # одна ошибка — еще закрыт
+    breaker.record(False)
+    with pytest.raises(llm.CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # пробный вызов
+    assert breaker.state == llm.HALF_OPEN
+    breaker.record(True, 0.1)
+    assert breaker.status() == {"state": llm.CLOSED, "failures": 0, "retry_after": 0}
+
+
+def test_breaker_counts_slow_calls_and_failed_probe():
+    breaker = llm.CircuitBreaker(failures=1, cooldown=0.05, slow_call=1.0)
+    breaker.record(True, 2.0)  # медленный ответ — тоже неудача
+    assert breaker.state == llm.OPEN
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == llm.OPEN
+    assert breaker.retry_after() > 0
@@ -0,0 +1,17 @@
+"""bench_hot_paths: --only не готовит данные для остальных кейсов"""
+
+import bench_data
+import bench_hot_paths
+
+
+def test_only_builds_data_for_selected_cases(monkeypatch):
+    built = []
+    monkeypatch.setattr(bench_data, "cached", lambda name, make, *args: built.append(name) or b"")
+
+    cases = bench_hot_paths.build_cases(full=False, only="load_csv")
+    assert [name for name, _, _ in cases] == ["load_csv[1000]", "load_csv[100000]"]
+    assert built == []  # данные готовятся только при вызове setup
+
+    cases[0][1]()
+    assert built == ["statement_1000.csv"]
+
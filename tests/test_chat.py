@@ -0,0 +1,58 @@
+"""/chat: ожидание ИИ не блокирует event loop, сессии продолжаются"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import llm
+
+USAGE = {"prompt_tokens": 3, "completion_tokens": 2, "prompt_eval_ms": 1.0, "context": [1, 2, 3]}
+
+
+def test_chat_does_not_block_event_loop(client, user_headers, monkeypatch):
+    started, other_served = threading.Event(), threading.Event()
+
+    def slow_generate(prompt, context=None):
+        # пока ИИ «думает», loop должен успеть ответить на другой запрос
+        started.set()
+        if not other_served.wait(5):
+            raise RuntimeError("event loop заблокирован ожиданием ИИ")
+        return "ответ", USAGE
+
+    monkeypatch.setattr(llm, "generate_with_usage", slow_generate)
+    with ThreadPoolExecutor(1) as pool:
+        chat = pool.submit(client.post, "/chat", json={"message": "привет"}, headers=user_headers)
+        assert started.wait(5)
+        assert client.get("/health").status_code == 200
+        other_served.set()
+        r = chat.result(10)
+
+    assert r.status_code == 200, r.text
+    assert r.json()["reply"] == "ответ"
+
+
+def test_chat_session_continues_with_context(client, user_headers, monkeypatch):
+    contexts = []
+
+    def generate(prompt, context=None):
+        contexts.append(context)
+        return f"ответ {len(contexts)}", USAGE
+
+    monkeypatch.setattr(llm, "generate_with_usage", generate)
+    first = client.post("/chat", json={"message": "привет"}, headers=user_headers).json()
+    second = client.post("/chat", json={"message": "еще", "session_id": first["session_id"]},
+                         headers=user_headers).json()
+
+    assert second["reply"] == "ответ 2"
+    assert second["turn"] == 2
+    assert contexts == [None, [1, 2, 3]]
+    sessions = client.get("/chat/sessions", headers=user_headers).json()
+    assert [s["session_id"] for s in sessions] == [first["session_id"]]
+
+
+def test_anonymous_chat_is_stateless(client, monkeypatch):
+    monkeypatch.setattr(llm, "generate_with_usage", lambda prompt, context=None: ("ответ", USAGE))
+    r = client.post("/chat", json={"message": "привет"})
+
+    assert r.status_code == 200, r.text
+    assert r.json() == {"reply": "ответ"}
+    assert client.post("/chat", json={"message": "еще", "session_id": "x"}).status_code == 401
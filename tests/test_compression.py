@@ -0,0 +1,86 @@
+"""Сжатие ответов: выбор кодировки, порог размера, потоковые ответы"""
+
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware
+
+BIG = "строка выписки " * 200
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/binary")
+    def binary():
+        return Response(BIG.encode(), media_type="application/octet-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((BIG for _ in range(3)), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def raw_get(client, path, accept):
+    # httpx сам распаковывает gzip/br — берем тело как есть
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_accepted_encodings_ignores_q_zero():
+    assert compression.accepted_encodings("gzip;q=0, br;q=0.5, deflate") == {"br", "deflate"}
+
+
+def test_brotli_preferred_over_gzip(client):
+    r, body = raw_get(client, "/big", "gzip, br")
+    assert r.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert brotli.decompress(body).decode() == BIG
+
+
+def test_gzip_when_brotli_not_accepted(client):
+    r, body = raw_get(client, "/big", "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert int(r.headers["content-length"]) == len(body)
+    assert gzip.decompress(body).decode() == BIG
+
+
+def test_gzip_when_brotli_missing(client, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    r, body = raw_get(client, "/big", "br, gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).decode() == BIG
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/small", "gzip, br"),
+    ("/binary", "gzip, br"),
+    ("/big", "identity"),
+])
+def test_not_compressed(client, path, accept):
+    r, _ = raw_get(client, path, accept)
+    assert "content-encoding" not in r.headers
+
+
+def test_streaming_response_compressed_in_chunks(client):
+    r, body = raw_get(client, "/stream", "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert gzip.decompress(body).decode() == BIG * 3
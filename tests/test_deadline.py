@@ -0,0 +1,126 @@
+"""Дедлайн запроса: остаток времени, резерв, заголовок X-Request-Deadline, частичный ответ"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+import analysis
+import database_sqlite
+import deadline as deadline_module
+import llm
+from deadline import DEADLINE_HEADER, Deadline, request_deadline
+from models import UploadedFile
+
+
+def test_without_deadline():
+    deadline = Deadline(None)
+    assert deadline.remaining() == math.inf
+    assert not deadline.expired() and not deadline.passed()
+    assert deadline.report() == {"partial": False}
+
+
+def test_reserve_is_at_most_half_and_expires_before_deadline():
+    assert Deadline(2, reserve=5).reserve == 1
+    deadline = Deadline(0.2, reserve=0.1)
+    assert 0 < deadline.remaining() <= 0.1
+    time.sleep(0.12)
+    assert deadline.expired() and not deadline.passed()
+    time.sleep(0.1)
+    assert deadline.passed()
+
+
+def test_cut_merges_details():
+    deadline = Deadline(10)
+    deadline.cut("parse", pages=3)
+    deadline.cut("parse", total_pages=10)
+    deadline.cut("insights", skipped=True)
+    assert deadline.report() == {
+        "partial": True,
+        "partial_details": {"parse": {"pages": 3, "total_pages": 10}, "insights": {"skipped": True}},
+        "deadline_seconds": 10,
+    }
+
+
+@pytest.fixture
+def deadline_client(monkeypatch):
+    monkeypatch.setattr(deadline_module, "REQUEST_DEADLINE", 30.0)
+    app = FastAPI()
+
+    @app.get("/")
+    def seconds(deadline: Deadline = Depends(request_deadline)):
+        return {"seconds": deadline.seconds}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [(None, 30.0), ("5", 5.0), ("120", 30.0)])
+def test_header_can_only_shorten(deadline_client, header, expected):
+    headers = {DEADLINE_HEADER: header} if header is not None else {}
+    assert deadline_client.get("/", headers=headers).json() == {"seconds": expected}
+
+
+@pytest.mark.parametrize("header", ["0", "-1", "abc", "nan"])
+def test_bad_header(deadline_client, header):
+    assert deadline_client.get("/", headers={DEADLINE_HEADER: header}).status_code == 400
+
+
+def test_slow_llm_gives_partial_answer_and_late_advice(client, user_headers, monkeypatch):
+    def slow_generate(prompt, context=None):
+        time.sleep(2.5)
+        return "поздний совет", {"prompt_tokens": 1, "completion_tokens": 1, "prompt_eval_ms": 0.0, "context": None}
+
+    monkeypatch.setattr(llm, "generate_with_usage", slow_generate)
+    csv = "date,category,amount\n2024-03-01,Продукты,-5000\n2024-03-02,Транспорт,-1200\n"
+    r = client.post("/analyze-expenses", headers={**user_headers, DEADLINE_HEADER: "3"},
+                    files={"file": ("s.csv", csv, "text/csv")})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["partial"] is True
+    assert body["partial_details"] == {"advice": {"llm": "pending"}}
+    assert body["advice_source"] == "pending"
+    assert body["transactions_count"] == 2
+
+    # ответ ИИ дописывается в файл, когда придет
+    for _ in range(60):
+        with Session(database_sqlite.engine) as session:
+            uploaded = session.get(UploadedFile, body["file_id"])
+        if uploaded.advice_source == "llm":
+            break
+        time.sleep(0.05)
+    assert (uploaded.ai_analysis, uploaded.advice_source) == ("поздний совет", "llm")
+
+
+def test_slow_upload_does_not_delay_short_deadline_request(client, user_headers, monkeypatch):
+    started, short_done = threading.Event(), threading.Event()
+    usage = {"prompt_tokens": 1, "completion_tokens": 1, "prompt_eval_ms": 0.0, "context": None}
+    monkeypatch.setattr(llm, "generate_with_usage", lambda prompt, context=None: ("совет", usage))
+    load_statement = analysis.load_statement
+
+    def slow_load(filename, content, deadline=None):
+        # большой файл разбирается долго; короткий запрос рядом должен уложиться в свой дедлайн
+        if filename == "slow.csv":
+            started.set()
+            short_done.wait(5)
+        return load_statement(filename, content, deadline)
+
+    monkeypatch.setattr(analysis, "load_statement", slow_load)
+    csv = "date,category,amount\n2024-03-01,Продукты,-5000\n2024-03-02,Транспорт,-1200\n"
+    with ThreadPoolExecutor(1) as pool:
+        slow = pool.submit(client.post, "/analyze-expenses", headers=user_headers,
+                           files={"file": ("slow.csv", csv, "text/csv")})
+        assert started.wait(5)
+        began = time.monotonic()
+        r = client.post("/analyze-expenses", headers={**user_headers, DEADLINE_HEADER: "2"},
+                        files={"file": ("short.csv", csv, "text/csv")})
+        elapsed = time.monotonic() - began
+        short_done.set()
+        assert slow.result(10).status_code == 200
+
+    assert r.status_code == 200, r.text
+    assert elapsed < 2
@@ -0,0 +1,58 @@
+"""Выгрузка транзакций пользователя в Parquet и Arrow IPC"""
+
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import export
+
+CSV = (
+    "date,description,category,amount\n"
+    "2024-03-01,Magnum,Продукты,-5000\n"
+    "2024-03-02,Yandex Go,Транспорт,-1200.5\n"
+)
+
+
+def read_table(fmt: str, body: bytes) -> pa.Table:
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(body))
+    return pa.ipc.open_stream(body).read_all()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_own_transactions(client, user_headers, upload, fmt):
+    upload(user_headers, CSV)
+    other = client.post("/register", json={"username": f"other_{fmt}", "email": f"other_{fmt}@test.kz",
+                                           "password": "secret123"})
+    assert other.status_code == 200
+
+    r = client.get(f"/my-transactions/export?format={fmt}", headers=user_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == export.FORMATS[fmt][0]
+    table = read_table(fmt, r.content)
+    assert table.schema == export.schema()
+    rows = sorted(table.to_pylist(), key=lambda row: row["amount"])
+    assert [(row["description"], row["amount"]) for row in rows] == [("Magnum", -5000.0), ("Yandex Go", -1200.5)]
+    assert str(rows[0]["operation_date"]) == "2024-03-01"
+
+
+def test_small_batches_keep_every_row(client, user_headers, upload):
+    upload(user_headers, CSV)
+    user_id = client.get("/me", headers=user_headers).json()["id"]
+    body = b"".join(export.iter_export("arrow", user_id, batch_rows=1))
+    table = read_table("arrow", body)
+    assert table.num_rows == 2
+    assert sorted(table.column("description").to_pylist()) == ["Magnum", "Yandex Go"]
+
+
+def test_unknown_format(client, user_headers):
+    r = client.get("/my-transactions/export?format=csv", headers=user_headers)
+    assert r.status_code == 400
+
+
+def test_without_pyarrow(client, user_headers, monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+    r = client.get("/my-transactions/export", headers=user_headers)
+    assert r.status_code == 503
@@ -0,0 +1,46 @@
+"""Регулярные платежи: продавец — описание операции, а не категория"""
+
+from datetime import date
+
+import analysis
+import bench_data
+import insights
+from transaction_batch import TransactionBatch
+
+MONTHS = (1, 2, 3, 4)
+
+
+def monthly_rows():
+    # два продавца с одинаковой суммой; по ключевому слову "shop" оба попадают в категорию purchase
+    rows = []
+    for month in MONTHS:
+        rows.append((date(2024, month, 5), "Pokupka shop Netflix", -4990.0))
+        rows.append((date(2024, month, 20), "Pokupka shop Spotify", -4990.0))
+    return rows
+
+
+def test_template_pdf_merchants_with_same_amount():
+    batch = analysis.load_statement("kaspi.pdf", bench_data.kaspi_pdf_from_rows(monthly_rows()))
+    found, monthly_total = insights.recurring_payments(batch)
+    assert sorted((f["merchant"], f["period"], f["count"]) for f in found) == [
+        ("Purchase shop Netflix", "month", 4),
+        ("Purchase shop Spotify", "month", 4),
+    ]
+    assert {f["category"] for f in found} == {"purchase"}
+    assert monthly_total < 0
+
+
+def test_generic_pdf_merchants_with_same_amount():
+    lines = [f"{day:%d.%m.%Y} {desc} -4 990,00 KZT" for day, desc, _ in monthly_rows()]
+    batch = analysis.load_statement("s.pdf", bench_data.pdf_from_lines(lines))
+    found, _ = insights.recurring_payments(batch)
+    assert sorted(f["merchant"] for f in found) == ["Pokupka shop Netflix", "Pokupka shop Spotify"]
+
+
+def test_statement_without_descriptions_uses_category_in_concat():
+    described = TransactionBatch.from_columns(
+        [f"2024-0{m}-05" for m in MONTHS], ["purchase"] * 4, [-4990.0] * 4, ["Netflix"] * 4,
+    )
+    plain = TransactionBatch.from_columns([f"2024-0{m}-10" for m in MONTHS], ["Аренда"] * 4, [-150000.0] * 4)
+    found, _ = insights.recurring_payments(TransactionBatch.concat([described, plain]))
+    assert sorted(f["merchant"] for f in found) == ["Netflix", "Аренда"]
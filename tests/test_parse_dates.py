@@ -0,0 +1,37 @@
+"""parse_dates: формат определяется для каждой колонки, форматы в колонке могут смешиваться"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from transaction_batch import parse_dates
+
+
+def iso(values) -> list:
+    return [None if pd.isna(d) else d.strftime("%Y-%m-%d") for d in parse_dates(pd.Series(values, dtype=object))]
+
+
+def test_us_file_does_not_change_next_file():
+    assert iso(["03/20/2024", "03/05/2024", "12/31/2024"]) == ["2024-03-20", "2024-03-05", "2024-12-31"]
+    # следующая выписка того же вида, но день впереди
+    assert iso(["05/03/2024", "20/03/2024", "07/03/2024"]) == ["2024-03-05", "2024-03-20", "2024-03-07"]
+    assert iso(["05/03/2024", "07/03/2024"]) == ["2024-03-05", "2024-03-07"]
+
+
+def test_month_first_found_after_ambiguous_head():
+    ambiguous = [f"{month:02d}/{day:02d}/2024" for month in (1, 2) for day in range(1, 13)]
+    dates = iso(ambiguous + ["02/20/2024"])
+    assert dates[:2] == ["2024-01-01", "2024-01-02"]  # 01/02 — 2 января, как и вся колонка
+    assert dates[-1] == "2024-02-20"
+
+
+def test_mixed_formats_in_one_column():
+    assert iso(["01.03.2024", "2024-03-02", "03.03.2024 10:15", "04.03.2024 10:15:00", "2024-03-05T10:00:00+05:00"]) == [
+        "2024-03-01", "2024-03-02", "2024-03-03", "2024-03-04", "2024-03-05",
+    ]
+
+
+def test_excel_dates_and_garbage():
+    assert iso([datetime(2024, 3, 1, 12, 0), "02.03.2024", 45000, "не дата", None]) == [
+        "2024-03-01", "2024-03-02", None, None, None,
+    ]
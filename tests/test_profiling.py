@@ -0,0 +1,79 @@
+"""ProfilingMiddleware: в профиль попадает только работа профилируемого запроса"""
+
+import asyncio
+import pstats
+
+import profiling
+
+
+def profiled_work():
+    return sum(range(1000))
+
+
+def other_request_work():
+    return sum(range(1000))
+
+
+async def app(scope, receive, send):
+    if scope["path"] == "/profiled":
+        profiled_work()
+        await asyncio.sleep(0.05)  # в это время loop обслуживает второй запрос
+        profiled_work()
+    else:
+        other_request_work()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def function_names(path) -> set:
+    return {name for _, _, name in pstats.Stats(str(path)).stats}
+
+
+def call(middleware, path: str, headers: list):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        sent.append(message)
+
+    return middleware(scope, receive, send), sent
+
+
+def test_concurrent_request_is_not_in_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_DEBUG", True)
+    middleware = profiling.ProfilingMiddleware(app)
+
+    async def main():
+        profiled, sent = call(middleware, "/profiled", [(b"x-profile", b"1"), (b"x-request-id", b"req1")])
+        task = asyncio.ensure_future(profiled)
+        await asyncio.sleep(0.01)
+        other, _ = call(middleware, "/other", [])
+        await other
+        await task
+        return sent
+
+    sent = asyncio.run(main())
+    assert (b"x-profile-id", b"req1") in sent[0]["headers"]
+    names = function_names(tmp_path / "req1.prof")
+    assert "profiled_work" in names
+    assert "other_request_work" not in names
+    assert profiling.list_profiles()[0]["status_code"] == 200
+
+
+def test_profile_not_saved_without_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    middleware = profiling.ProfilingMiddleware(app)
+    coro, sent = call(middleware, "/other", [])
+    asyncio.run(coro)
+    assert sent[0]["status"] == 200
+    assert profiling.list_profiles() == []
+
+
+def test_request_id_validation():
+    assert profiling.is_valid_request_id("abc-123_X")
+    assert not profiling.is_valid_request_id("../etc/passwd")
+    assert profiling.profile_path("../x") is None
@@ -0,0 +1,45 @@
+"""Корзины rate limit в shared_store: в памяти и в общем SQLite файле"""
+
+import time
+
+import pytest
+
+from rate_limit import take
+from shared_store import MemoryStore, SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "shared.db"))
+
+
+def test_capacity_then_retry_after(store):
+    assert [take("chat:1", 3, 60, store) for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = take("chat:1", 3, 60, store)
+    assert 19 < retry_after <= 20  # один токен пополняется за 60 / 3 секунд
+
+
+def test_keys_are_independent(store):
+    assert take("chat:1", 1, 60, store) == 0.0
+    assert take("chat:1", 1, 60, store) > 0
+    assert take("chat:2", 1, 60, store) == 0.0
+
+
+def test_refilled_bucket_expires(store, monkeypatch):
+    assert take("chat:1", 1, 60, store) == 0.0
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 61)
+    # за period корзина пополнилась целиком и истекла по ttl — снова полная
+    assert "chat:1" not in store.items("rate_limit")
+    assert take("chat:1", 1, 60, store) == 0.0
+
+
+def test_sqlite_buckets_shared_between_workers(tmp_path):
+    # как два воркера с одним SHARED_STORE_PATH
+    path = str(tmp_path / "shared.db")
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    assert take("analyze:1", 2, 60, first) == 0.0
+    assert take("analyze:1", 2, 60, second) == 0.0
+    assert take("analyze:1", 2, 60, first) > 0
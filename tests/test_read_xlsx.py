@@ -0,0 +1,68 @@
+"""Потоковое чтение XLSX: заголовок, нестандартные и русские имена колонок"""
+
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+
+import analysis
+
+
+def make_xlsx(*rows) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Выписка")
+    for row in rows:
+        ws.append(list(row))
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def test_unknown_amount_column_is_guessed():
+    content = make_xlsx(
+        ("date", "description", "value"),
+        ("01.03.2024", "Magnum", -5000),
+        ("02.03.2024", "Yandex Go", -1200.5),
+    )
+    batch = analysis.load_statement("s.xlsx", content)
+    assert batch.amount.tolist() == [-5000.0, -1200.5]
+    assert batch.records()[0]["category"] == "Magnum"
+
+
+def test_russian_headers_are_mapped():
+    content = make_xlsx(
+        ("Дата", "Категория", "Описание", "Сумма, KZT"),
+        ("01.03.2024", "Продукты", "Magnum", -5000),
+        ("05.03.2024", "Транспорт", "Yandex Go", -1200),
+    )
+    stats = analysis.aggregate(analysis.load_statement("s.xlsx", content))
+    assert [c["category"] for c in stats["by_category"]] == ["Продукты", "Транспорт"]
+    assert [d["date"] for d in stats["by_date"]] == ["2024-03-01", "2024-03-05"]
+
+
+def test_title_row_with_one_keyword_is_not_header():
+    content = make_xlsx(
+        ("Дата формирования: 01.04.2024",),
+        ("АО «Kaspi Bank»", None, None),
+        (),
+        ("Дата операции", "Описание", "Сумма"),
+        ("01.03.2024", "Magnum", -5000),
+    )
+    df = analysis.read_xlsx(content)
+    assert list(df.columns) == ["Дата операции", "Описание", "Сумма"]
+    assert analysis.load_statement("s.xlsx", content).amount.tolist() == [-5000.0]
+
+
+def test_same_data_as_csv():
+    rows = [("date", "category", "amount"), ("01.03.2024", "Кафе", -700), ("02.03.2024", "Кафе", -300)]
+    csv = "\n".join(",".join(map(str, r)) for r in rows).encode()
+    from_xlsx = analysis.aggregate(analysis.load_statement("s.xlsx", make_xlsx(*rows)))
+    from_csv = analysis.aggregate(analysis.load_statement("s.csv", csv))
+    assert from_xlsx == from_csv
+
+
+def test_without_known_headers_first_row_is_header():
+    df = analysis.read_xlsx(make_xlsx((None,), ("when", "what", "how much"), ("01.03.2024", "x", 1)))
+    assert list(df.columns) == ["when", "what", "how much"]
+    with pytest.raises(ValueError):
+        analysis.normalize_columns(analysis.read_xlsx(make_xlsx(("when", "what"), ("01.03.2024", "x"))))
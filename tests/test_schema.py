@@ -0,0 +1,37 @@
+"""schema.create_db_and_tables: дообновление старой базы"""
+
+import json
+
+from sqlalchemy import inspect, text
+from sqlmodel import create_engine
+
+import models  # noqa: F401 — регистрирует таблицы в SQLModel.metadata
+import schema
+
+
+def test_old_database_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE "user" (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR NOT NULL, '
+            'password_hash VARCHAR NOT NULL, role VARCHAR NOT NULL, created_at DATETIME NOT NULL)'
+        ))
+        conn.execute(text(
+            "CREATE TABLE uploadedfile (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, filename VARCHAR NOT NULL, "
+            "upload_date DATETIME NOT NULL, ai_analysis VARCHAR, total_amount FLOAT, transactions_count INTEGER, "
+            "category_stats VARCHAR)"
+        ))
+        stats = json.dumps([{"category": "Продукты", "amount": 5100}, {"category": "Транспорт", "amount": 2000}])
+        conn.execute(text(
+            "INSERT INTO uploadedfile (id, user_id, filename, upload_date, category_stats) "
+            "VALUES (1, 7, 'a.csv', '2024-03-01', :stats), (2, 7, 'b.csv', '2024-03-02', 'не json')"
+        ), {"stats": stats})
+
+    schema.create_db_and_tables(engine)
+    schema.create_db_and_tables(engine)  # повторный старт воркера ничего не ломает
+
+    columns = {c["name"] for c in inspect(engine).get_columns("uploadedfile")}
+    assert {"advice_source", "batch_id"} <= columns
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT file_id, user_id, category, amount FROM categorystat ORDER BY category")).all()
+    assert [tuple(r) for r in rows] == [(1, 7, "Продукты", 5100.0), (1, 7, "Транспорт", 2000.0)]
@@ -0,0 +1,82 @@
+"""/admin/search: индекс FTS5 следует за вставкой, правкой и удалением транзакций"""
+
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+import bench_data
+import database_sqlite
+
+
+def unique_word() -> str:
+    return "shop" + uuid.uuid4().hex[:8]
+
+
+def find(client, headers, word, scope="transactions") -> list:
+    r = client.get("/admin/search", params={"q": word, "scope": scope}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()["items"]
+
+
+def execute(sql: str, **params):
+    with Session(database_sqlite.engine) as session:
+        session.execute(text(sql), params)
+        session.commit()
+
+
+def indexed_rowids(word: str) -> list:
+    # MATCH прямо по transaction_fts, без join: видны и устаревшие записи индекса
+    with Session(database_sqlite.engine) as session:
+        return session.execute(text("SELECT rowid FROM transaction_fts WHERE transaction_fts MATCH :w"),
+                               {"w": f'"{word}"'}).scalars().all()
+
+
+def test_uploaded_transaction_is_found(client, user_headers, admin_headers, upload):
+    word = unique_word()
+    upload(user_headers, f"date,description,category,amount\n2024-03-01,{word} Almaty,Кафе,-2500\n", name=f"{word}.csv")
+
+    items = find(client, admin_headers, word)
+    assert [(i["description"], i["amount"]) for i in items] == [(f"{word} Almaty", -2500.0)]
+    assert [i["filename"] for i in find(client, admin_headers, word, scope="files")] == [f"{word}.csv"]
+
+
+@pytest.mark.parametrize("kind", ["pdf", "kaspi_pdf", "csv_description_only"])
+def test_description_is_stored_and_indexed(client, user_headers, admin_headers, upload, kind):
+    # у PDF и у CSV без колонки category описание — единственный текст операции
+    # без цифр: в строке PDF они читались бы как сумма
+    word = "Merchant" + uuid.uuid4().hex[:8].translate(str.maketrans("0123456789", "ghijklmnop"))
+    if kind == "pdf":
+        name, content = "s.pdf", bench_data.pdf_from_lines([f"01.03.2024 Pokupka {word} -2 500,00 KZT"])
+    elif kind == "kaspi_pdf":
+        name, content = "s.pdf", bench_data.kaspi_pdf_from_rows([(date(2024, 3, 1), f"Pokupka {word}", -2500.0)])
+    else:
+        name, content = "s.csv", f"date,description,value\n01.03.2024,{word} Almaty,-2500\n"
+    upload(user_headers, content, name=name)
+
+    [item] = find(client, admin_headers, word)
+    assert word in item["description"]
+    assert item["amount"] == -2500.0
+
+
+def test_index_follows_update_and_delete(client, user_headers, admin_headers, upload):
+    old, new = unique_word(), unique_word()
+    upload(user_headers, f"date,description,category,amount\n2024-03-01,{old},Кафе,-100\n2024-03-02,,Кафе,-50\n")
+    [item] = find(client, admin_headers, old)
+
+    execute('UPDATE "transaction" SET description = :d WHERE id = :id', d=new, id=item["id"])
+    assert find(client, admin_headers, old) == []
+    assert indexed_rowids(old) == []
+    assert [i["id"] for i in find(client, admin_headers, new)] == [item["id"]]
+
+    execute('DELETE FROM "transaction" WHERE file_id = :file_id', file_id=item["file_id"])
+    assert find(client, admin_headers, new) == []
+    assert indexed_rowids(new) == []
+
+
+def test_search_requires_admin_and_query(client, user_headers, admin_headers):
+    assert client.get("/admin/search", params={"q": "kaspi"}, headers=user_headers).status_code == 403
+    assert client.get("/admin/search", params={"q": "***"}, headers=admin_headers).status_code == 400
+    assert client.get("/admin/search", params={"q": "kaspi", "scope": "users"}, headers=admin_headers).status_code == 400
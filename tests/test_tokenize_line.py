@@ -0,0 +1,46 @@
+"""Разбор строки PDF-выписки: совпадение с прежней реализацией и линейное время"""
+
+import random
+import time
+
+import pytest
+
+from analysis import tokenize_line
+from bench_tokenizer import legacy_tokenize, random_line
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("01.03.2024 Magnum Cash&Carry -5 000,50 ₸", ("01.03.2024", -5000.5, "Magnum Cash&Carry")),
+    ("1.3.24 перевод Kaspi + 12 500 KZT", ("1.3.24", 12500.0, "перевод Kaspi")),
+    ("05.03.2024 -1200.00 Yandex Go", ("05.03.2024", -1200.0, "Yandex Go")),
+    ("Итого -5 000,50 ₸", None),
+    # как и прежде: сумма может начинаться в последнем символе даты
+    ("01.03.2024 без суммы", ("01.03.2024", 2024.0, "без суммы")),
+])
+def test_examples(line, expected):
+    assert tokenize_line(line) == expected
+
+
+def test_matches_legacy_on_random_lines():
+    rng = random.Random(42)
+    mismatches = []
+    for _ in range(20_000):
+        line = random_line(rng)
+        expected, actual = legacy_tokenize(line), tokenize_line(line)
+        if expected != actual:
+            mismatches.append((line, expected, actual))
+    assert mismatches[:5] == []
+
+
+@pytest.mark.parametrize("tail", [
+    "1 " * 20_000 + "x",
+    "12  " * 10_000 + "x",
+    "- " * 20_000 + "1",
+    "1" + " " * 40_000 + "x",
+    "1." * 20_000,
+])
+def test_long_lines_are_linear(tail):
+    # при квадратичном откате строка в 40k символов разбиралась бы секундами
+    started = time.perf_counter()
+    tokenize_line("01.03.2024 " + tail)
+    assert time.perf_counter() - started < 0.5
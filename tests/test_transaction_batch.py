@@ -0,0 +1,59 @@
+"""TransactionBatch: колонки выписки, склейка и выборка строк"""
+
+import numpy as np
+import pandas as pd
+
+from transaction_batch import MISSING_CATEGORY, TransactionBatch
+
+
+def test_rows_without_amount_are_dropped_and_categories_filled():
+    batch = TransactionBatch.from_columns(
+        ["01.03.2024", "02.03.2024", "03.03.2024", "не дата"],
+        ["Продукты", None, "Транспорт", "Кафе"],
+        ["-5000", "-1200,5", "-300", None],
+        ["Magnum", "Yandex Go", "Bus", "Coffee"],
+    )
+    assert len(batch) == 2
+    assert batch.amount.dtype == np.float64
+    assert batch.records() == [
+        {"date": "2024-03-01", "category": "Продукты", "amount": -5000.0, "description": "Magnum"},
+        {"date": "2024-03-03", "category": "Транспорт", "amount": -300.0, "description": "Bus"},
+    ]
+
+
+def test_missing_category_and_unparsed_date():
+    batch = TransactionBatch.from_columns(["мусор", None], [None, "Кафе"], [1, 2])
+    assert batch.iso_dates() == [None, None]
+    assert batch.records()[0]["category"] == MISSING_CATEGORY
+    assert batch.description is None
+
+
+def test_numeric_categories_become_strings():
+    frame = pd.DataFrame({"category": pd.Series([1, "1", 2], dtype=object), "amount": [10, 20, 30]})
+    batch = TransactionBatch.from_frame(frame)
+    assert [r["category"] for r in batch.records()] == ["1", "1", "2"]
+
+
+def test_concat_merges_dictionaries_and_descriptions():
+    first = TransactionBatch.from_columns(["01.03.2024"], ["Продукты"], [-10.0], ["Magnum"])
+    second = TransactionBatch.from_columns(["2024-04-01", "2024-04-02"], ["Кафе", "Продукты"], [-5.0, -7.0])
+    empty = TransactionBatch.from_columns([], [], [])
+
+    batch = TransactionBatch.concat([first, empty, second])
+    assert len(batch) == 3
+    assert sorted(batch.category.categories) == ["Кафе", "Продукты"]
+    assert [r["category"] for r in batch.records()] == ["Продукты", "Кафе", "Продукты"]
+    assert [r["description"] for r in batch.records()] == ["Magnum", None, None]
+    assert batch.iso_dates() == ["2024-03-01", "2024-04-01", "2024-04-02"]
+
+
+def test_take_head_and_frame():
+    batch = TransactionBatch.from_columns(
+        ["2024-03-01", "2024-03-02", "2024-03-03"], ["a", "b", "a"], [1.0, 2.0, 3.0],
+    )
+    assert batch.head(2).amount.tolist() == [1.0, 2.0]
+    assert batch.take(batch.amount > 1).category.tolist() == ["b", "a"]
+    frame = batch.to_frame()
+    assert list(frame.columns) == ["date", "category", "amount"]
+    assert frame["date"].dtype.kind == "M"
+    assert batch.nbytes > 0
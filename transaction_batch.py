@@ -0,0 +1,294 @@
+"""
+Компактное колоночное представление разобранной выписки.
+
+Раньше выписка жила DataFrame с object-колонками (каждая дата, категория и
+сумма — отдельный Python объект), а PDF собирался из списка словарей по
+строке. TransactionBatch хранит колонки массивами:
+
+    date        — datetime64 (NaT, если дату не удалось распознать)
+    category    — pd.Categorical: коды int8/int16 + словарь категорий
+    amount      — float64
+    description — pd.Categorical или None, если описаний в выписке нет
+
+Строки без суммы отбрасываются при создании. Все парсеры analysis.py
+возвращают TransactionBatch, а агрегации принимают его.
+"""
+
+import re
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+MISSING_CATEGORY = "Не указано"
+
+
+# === Нормализация дат ===
+# Форматы дат выписок в порядке предпочтения: при неоднозначности (01/02/2024)
+# день раньше месяца, как в банках РК/РФ. ISO8601 — последний, самый медленный вариант.
+DATE_FORMATS = (
+    "%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y", "%d/%m/%Y", "%m/%d/%Y", "%d/%m/%y", "%d-%m-%Y",
+    "%Y.%m.%d", "%Y/%m/%d", "%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "ISO8601",
+)
+DATE_SAMPLE_SIZE = 20
+# Смещение часового пояса после времени ("10:00:00+05:00", "10:00Z") — отбрасывается,
+# в выписке остается местное время операции
+_OFFSET = re.compile(r"(\d\d:\d\d(?::\d\d(?:\.\d+)?)?)(?:Z|[+-]\d\d:?\d\d)$")
+
+
+def _parse(values: pd.Series, fmt: str) -> pd.Series:
+    return pd.to_datetime(values, errors="coerce", format=fmt)
+
+
+def detect_date_format(samples: pd.Series) -> Optional[str]:
+    """Первый из DATE_FORMATS, который разбирает все образцы (иначе — больше всего образцов)"""
+    best, best_parsed = None, 0
+    for fmt in DATE_FORMATS:
+        parsed = int(_parse(samples, fmt).notna().sum())
+        if parsed == len(samples):
+            return fmt
+        if parsed > best_parsed:
+            best, best_parsed = fmt, parsed
+    return best
+
+
+def _better_format(samples: pd.Series, misread: pd.Series, fmt: str) -> Optional[str]:
+    """Другой формат, который разбирает и образцы, и строки того же вида, не подошедшие fmt.
+    По 05/03/2024 порядок дня и месяца не виден, по 03/20/2024 — виден: если такая строка
+    встретилась дальше в колонке, вся колонка разбирается месяцем вперед."""
+    combined = pd.concat([samples, misread.iloc[:DATE_SAMPLE_SIZE]])
+    better = detect_date_format(combined)
+    if better not in (None, fmt) and _parse(combined, better).notna().all():
+        return better
+    return None
+
+
+def _parse_shape(values: pd.Series) -> pd.Series:
+    """Строки одного вида: формат по образцам и один векторный разбор"""
+    samples = values.iloc[:DATE_SAMPLE_SIZE]
+    fmt = detect_date_format(samples)
+    if fmt is None:
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    parsed = _parse(values, fmt)
+    failed = parsed.isna()
+    if failed.any():
+        better = _better_format(samples, values[failed], fmt)
+        if better is not None:
+            return _parse(values, better)
+        retry_fmt = detect_date_format(values[failed].iloc[:DATE_SAMPLE_SIZE])
+        if retry_fmt is not None and retry_fmt != fmt:
+            parsed[failed] = _parse(values[failed], retry_fmt)
+    return parsed
+
+
+def _shapes(texts: pd.Series) -> pd.Series:
+    return texts.str.replace(r"\d", "9", regex=True)
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Даты выписки в datetime64; остальное — NaT.
+
+    Формат определяется заново для каждой колонки по первым значениям вида
+    "99.99.9999" (порядок дня и месяца уточняется по строкам того же вида, которые
+    формат не разобрал), и вся колонка разбирается одним векторным вызовом. Не
+    подошедшие строки группируются по виду, и каждая группа разбирается своим
+    форматом — так форматы в одной колонке могут быть смешаны. Даты Excel (datetime) и Timestamp
+    переводятся напрямую, числа и прочее — NaT.
+    """
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    present = values.notna()
+    if not present.any():
+        return parsed
+    values = values[present].astype(object)
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        texts = values
+    else:
+        is_text = values.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+        is_datetime = values.map(lambda v: isinstance(v, (datetime, date, np.datetime64))).to_numpy(dtype=bool)
+        if is_datetime.any():
+            objects = values[is_datetime]
+            parsed[objects.index] = pd.to_datetime(objects, errors="coerce")
+        texts = values[is_text]
+    if not len(texts):
+        return parsed
+    texts = texts.astype("str").str.strip()
+
+    # Обычно вся колонка одного вида: разбор без вычисления вида каждой строки
+    head = texts.iloc[:DATE_SAMPLE_SIZE]
+    head_shapes = _shapes(head)
+    shape = head_shapes.iloc[0]
+    if not _OFFSET.search(shape):
+        samples = head[head_shapes == shape]
+        fmt = detect_date_format(samples)
+        if fmt is not None:
+            first = _parse(texts, fmt)
+            failed = texts[first.isna()]
+            if len(failed):
+                better = _better_format(samples, failed[_shapes(failed) == shape], fmt)
+                if better is not None:
+                    first = _parse(texts, better)
+            parsed[texts.index] = first
+            texts = texts[first.isna()]
+
+    if len(texts):
+        for shape, group in texts.groupby(_shapes(texts), sort=False):
+            if _OFFSET.search(shape):
+                group = group.str.replace(_OFFSET, r"\1", regex=True)
+            parsed[group.index] = _parse_shape(group)
+    return parsed
+
+
+def _dates(values) -> np.ndarray:
+    """Колонка дат -> datetime64; каждое уникальное значение разбирается один раз
+    (в выписке на миллион строк обычно лишь сотни разных дат)"""
+    if isinstance(values, list):
+        values = np.array(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    if not len(uniques):
+        return np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+    parsed = parse_dates(pd.Series(np.asarray(uniques, dtype=object))).to_numpy()
+    dates = parsed[codes]
+    dates[codes == -1] = np.datetime64("NaT")
+    return dates
+
+
+def _categorical(values, missing: Optional[str] = None) -> pd.Categorical:
+    """Текстовая колонка -> Categorical со строковыми категориями; пропуски — missing (или NaN)"""
+    cat = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+    if cat.categories.inferred_type not in ("string", "empty"):
+        names = cat.categories.astype(str)
+        if names.is_unique:
+            cat = cat.rename_categories(names)
+        else:  # 1 и "1" в одной колонке
+            cat = pd.Categorical(np.asarray(cat, dtype=object).astype(str))
+    if missing is not None and (cat.codes == -1).any():
+        if missing not in cat.categories:
+            cat = cat.add_categories([missing])
+        cat = cat.fillna(missing)
+    return cat
+
+
+def labels(cat: pd.Categorical) -> list:
+    """Значения Categorical списком строк (None вместо пропусков) без поэлементного astype"""
+    values = np.asarray(cat.categories, dtype=object)[cat.codes]
+    values[cat.codes == -1] = None
+    return values.tolist()
+
+
+def map_dates(dates: np.ndarray, func) -> list:
+    """func(datetime64[D]) для каждой даты списком (None вместо NaT); func вызывается
+    один раз на уникальную дату"""
+    codes, uniques = pd.factorize(dates.astype("datetime64[D]"))
+    mapped = np.array([func(d) for d in np.asarray(uniques, dtype="datetime64[D]")] + [None], dtype=object)
+    return mapped[codes].tolist()
+
+
+class TransactionBatch:
+    """Колонки выписки (см. модуль); создается from_frame / from_columns / concat"""
+
+    __slots__ = ("date", "category", "amount", "description")
+
+    def __init__(self, date: np.ndarray, category: pd.Categorical, amount: np.ndarray,
+                 description: Optional[pd.Categorical] = None):
+        self.date = date
+        self.category = category
+        self.amount = amount
+        self.description = description
+
+    @classmethod
+    def _build(cls, dates, categories, amounts, descriptions=None) -> "TransactionBatch":
+        amount = pd.to_numeric(pd.Series(amounts), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        keep = ~np.isnan(amount)
+        if keep.all():
+            keep = slice(None)
+        n = len(amount)
+        date = _dates(dates) if dates is not None else np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+        category = _categorical(categories, MISSING_CATEGORY)
+        description = _categorical(descriptions) if descriptions is not None else None
+        return cls(
+            date[keep],
+            category[keep],
+            amount[keep],
+            description[keep] if description is not None else None,
+        )
+
+    @classmethod
+    def from_columns(cls, dates: list, categories: list, amounts: list,
+                     descriptions: Optional[list] = None) -> "TransactionBatch":
+        """Из списков значений, собранных парсером (PDF) — без промежуточных словарей по строке"""
+        return cls._build(dates, categories, amounts, descriptions)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TransactionBatch":
+        """Из DataFrame после normalize_columns (колонки category, amount и, если есть, date/description)"""
+        return cls._build(
+            df["date"] if "date" in df.columns else None,
+            df["category"].array,
+            df["amount"],
+            df["description"].array if "description" in df.columns else None,
+        )
+
+    @classmethod
+    def concat(cls, batches: list) -> "TransactionBatch":
+        """Склейка выписок; словари категорий объединяются, коды пересчитываются"""
+        batches = [b for b in batches if len(b)] or batches[:1]
+        if len(batches) == 1:
+            return batches[0]
+        description = None
+        described = [b.description for b in batches if b.description is not None]
+        if described:
+            # У выписки без описаний — пустые коды с тем же типом категорий
+            description = union_categoricals([
+                b.description if b.description is not None
+                else pd.Categorical.from_codes(np.full(len(b), -1, dtype=np.int8), dtype=described[0].dtype)
+                for b in batches
+            ])
+        return cls(
+            np.concatenate([b.date for b in batches]),
+            union_categoricals([b.category for b in batches]),
+            np.concatenate([b.amount for b in batches]),
+            description,
+        )
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def take(self, rows) -> "TransactionBatch":
+        """Подмножество строк: булева маска, индексы или срез"""
+        return TransactionBatch(
+            self.date[rows],
+            self.category[rows],
+            self.amount[rows],
+            self.description[rows] if self.description is not None else None,
+        )
+
+    def head(self, n: int) -> "TransactionBatch":
+        return self.take(slice(0, n))
+
+    @property
+    def nbytes(self) -> int:
+        """Память колонок (коды, словари категорий и массивы), байт"""
+        total = self.date.nbytes + self.amount.nbytes + self.category.memory_usage(deep=True)
+        if self.description is not None:
+            total += self.description.memory_usage(deep=True)
+        return total
+
+    def iso_dates(self) -> list:
+        """Даты строками YYYY-MM-DD (None вместо NaT)"""
+        return map_dates(self.date, str)
+
+    def records(self) -> list:
+        """Строки словарями date/category/amount(/description) — для превью и промптов"""
+        columns = {"date": self.iso_dates(), "category": labels(self.category), "amount": self.amount.tolist()}
+        if self.description is not None:
+            columns["description"] = labels(self.description)
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({"date": self.date, "category": self.category, "amount": self.amount})
+        if self.description is not None:
+            frame["description"] = self.description
+        return frame